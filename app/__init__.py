@@ -3,13 +3,14 @@ from dotenv import load_dotenv
 
 from .config import Config
 from .extensions import db, login_manager
-from .models import User
+from .models import User, full_hash_method
 
 def create_app():
     load_dotenv()
 
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config["PASSWORD_HASH_METHOD"] = full_hash_method(app.config["PASSWORD_HASH_METHOD"])
 
     db.init_app(app)
     login_manager.init_app(app)
@@ -23,13 +24,48 @@ def create_app():
     from .auth.routes import bp as auth_bp
     from .admin.routes import bp as admin_bp
     from .teacher.routes import bp as teacher_bp
+    from .api.routes import bp as api_bp
+    from .parent.routes import bp as parent_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(teacher_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(parent_bp)
 
     from .utils import register_error_handlers
     register_error_handlers(app)
 
+    from . import ratelimit, parallel, invoice_pdfs
+    ratelimit.init_app(app)
+    parallel.init_app(app)
+    invoice_pdfs.init_app(app)
+
+    from . import meals, versioning, changelog, audit, capacity, kitchen, alerts, summaries, fragment_cache, roster
+    meals.init_app(app)
+    versioning.init_app(app)
+    changelog.init_app(app)
+    audit.init_app(app)
+    capacity.init_app(app)
+    kitchen.init_app(app)
+    alerts.init_app(app)
+    summaries.init_app(app)
+    fragment_cache.init_app(app)
+    roster.init_app(app)
+
+    from . import compression, static_cache, profiler
+    static_cache.init_app(app)
+    compression.init_app(app)
+    profiler.init_app(app)
+
+    from . import jobs, partitions, cli
+    jobs.init_app(app)
+    partitions.init_app(app)
+    cli.init_app(app)
+
+    # Last, so warm-up compiles templates with every global and filter registered.
+    from . import template_cache
+    template_cache.init_app(app)
+
     return app
@@ -1,34 +1,18 @@
-import calendar
 import datetime as dt
-from io import BytesIO
 from sqlalchemy import func
-from flask import render_template, request, redirect, url_for, flash, send_file
+from flask import (render_template, request, redirect, url_for, flash, send_file, Response, stream_with_context, jsonify,
+                   current_app)
 
 from . import bp
 from ..extensions import db
-from ..models import User, Class, Student, Settings, Invoice
+from ..models import User, Class, Student, Settings, Invoice, AuditLog
 from ..utils import role_required
-
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-def register_fonts():
-    try:
-        import os
-        from flask import current_app
-        font_dir = os.path.join(current_app.root_path, 'static', 'fonts')
-        pdfmetrics.registerFont(TTFont('DejaVuSans', os.path.join(font_dir, 'DejaVuSans.ttf')))
-        pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', os.path.join(font_dir, 'DejaVuSans-Bold.ttf')))
-        return 'DejaVuSans', 'DejaVuSans-Bold'
-    except Exception as e:
-        print(f"Font registration failed: {e}")
-        return 'Helvetica', 'Helvetica-Bold'
+from ..versioning import conditional, bump_all_classes
+from ..roster_import import RosterImport
+from ..parallel import gather
+from ..billing import month_range
+from ..kitchen import headcount
+from ..profiler import top as profile_top, collapsed as collapsed_stacks, pstats_bytes
 
 @bp.route("/")
 @role_required("ADMIN")
@@ -111,7 +95,21 @@ def classes_edit(class_id):
     else:
         classroom.teacher_id = None
 
+    try:
+        tuition_override = request.form.get("tuition_fee_override", "").strip()
+        meal_override = request.form.get("meal_price_override", "").strip()
+        tuition_override = int(tuition_override) if tuition_override else None
+        meal_override = int(meal_override) if meal_override else None
+        if (tuition_override is not None and tuition_override <= 0) or (meal_override is not None and meal_override < 0):
+            raise ValueError()
+    except ValueError:
+        db.session.rollback()
+        flash("Học phí riêng của lớp không hợp lệ.", "danger")
+        return redirect(url_for("admin.classes_list"))
+
     classroom.name = name
+    classroom.tuition_fee_override = tuition_override
+    classroom.meal_price_override = meal_override
     try:
         db.session.commit()
         flash("Cập nhật lớp thành công.", "success")
@@ -134,6 +132,31 @@ def classes_delete(class_id):
         flash("Không thể xóa lớp (có thể lớp vẫn còn học sinh).", "danger")
     return redirect(url_for("admin.classes_list"))
 
+@bp.route("/students/import", methods=["GET", "POST"])
+@role_required("ADMIN")
+def students_import():
+    result = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("Vui lòng chọn tệp CSV.", "danger")
+            return render_template("admin/students/import.html", result=None)
+
+        result = RosterImport().run(upload.stream)
+        if result.failed:
+            db.session.rollback()
+        else:
+            try:
+                db.session.commit()
+                if result.created:
+                    flash(f"Đã nhập {result.created} học sinh.", "success")
+            except Exception:
+                db.session.rollback()
+                result.created = 0
+                flash("Không thể nhập danh sách học sinh.", "danger")
+
+    return render_template("admin/students/import.html", result=result)
+
 @bp.route("/teachers")
 @role_required("ADMIN")
 def teachers_list():
@@ -230,6 +253,11 @@ def teachers_edit(teacher_id):
 def teachers_delete(teacher_id):
     teacher = User.query.filter_by(id=teacher_id, role="TEACHER").first_or_404()
     try:
+        # invoices is partitioned and cannot keep its ON DELETE SET NULL key.
+        cleared = Invoice.query.filter(Invoice.collected_by == teacher.id)\
+            .update({Invoice.collected_by: None}, synchronize_session=False)
+        if cleared:
+            bump_all_classes()
         db.session.delete(teacher)
         db.session.commit()
         flash("Xóa tài khoản giáo viên thành công.", "success")
@@ -243,7 +271,8 @@ def teachers_delete(teacher_id):
 def settings_page():
     settings = Settings.get_current()
     if not settings:
-        settings = Settings(id=1, tuition_fee_monthly=1500000, meal_price_per_day=25000, max_students_per_class=25)
+        settings = Settings(id=1, tuition_fee_monthly=1500000, meal_price_per_day=25000, max_students_per_class=25,
+                            sibling_discount_percent=0)
         db.session.add(settings)
         db.session.commit()
 
@@ -254,12 +283,14 @@ def settings_page():
             if form_type == "tuition":
                 tuition = int(request.form.get("tuition_fee_monthly", "0"))
                 meal = int(request.form.get("meal_price_per_day", "0"))
+                sibling = int(request.form.get("sibling_discount_percent", "0") or 0)
                 
-                if tuition <= 0 or meal < 0:
+                if tuition <= 0 or meal < 0 or not 0 <= sibling <= 100:
                     raise ValueError()
                 
                 settings.tuition_fee_monthly = tuition
                 settings.meal_price_per_day = meal
+                settings.sibling_discount_percent = sibling
                 db.session.commit()
                 flash("Cập nhật học phí thành công.", "success")
                 
@@ -285,212 +316,62 @@ def settings_page():
 
     return render_template("admin/settings.html", settings=settings)
 
-@bp.route("/reports")
-@role_required("ADMIN")
-def reports():
-    total_students = Student.query.count()
-    total_classes = Class.query.count()
-    
+def _school_report(revenue_months=None):
     current_month = dt.date.today().strftime('%Y-%m')
-    current_month_revenue = db.session.query(func.sum(Invoice.total_amount))\
-        .filter(Invoice.status == "PAID", Invoice.billing_month == current_month)\
-        .scalar() or 0
-    
-    class_sizes = (
-        db.session.query(Class.id, Class.name, func.count(Student.id).label("student_count"))
-        .outerjoin(Student, Student.class_id == Class.id)
-        .group_by(Class.id, Class.name)
-        .order_by(Class.name)
+    revenue_q = lambda s: (
+        s.query(Invoice.billing_month, func.sum(Invoice.total_amount))
+        .filter(Invoice.status == "PAID")
+        .group_by(Invoice.billing_month)
+        .order_by(Invoice.billing_month.desc())
+        .limit(revenue_months)
         .all()
     )
-
-    gender_counts = (
-        db.session.query(Student.gender, func.count(Student.id))
-        .group_by(Student.gender)
-        .all()
+    r = gather(
+        total_students=lambda s: s.query(func.count(Student.id)).scalar(),
+        total_classes=lambda s: s.query(func.count(Class.id)).scalar(),
+        current_month_revenue=lambda s: s.query(func.sum(Invoice.total_amount))
+            .filter(Invoice.status == "PAID", Invoice.billing_month == current_month)
+            .scalar(),
+        class_sizes=lambda s: (
+            s.query(Class.id, Class.name, func.count(Student.id).label("student_count"))
+            .outerjoin(Student, Student.class_id == Class.id)
+            .group_by(Class.id, Class.name)
+            .order_by(Class.name)
+            .all()
+        ),
+        gender_counts=lambda s: s.query(Student.gender, func.count(Student.id)).group_by(Student.gender).all(),
+        revenue_rows=revenue_q,
     )
     gender = {"M": 0, "F": 0}
-    for g, c in gender_counts:
+    for g, c in r.pop("gender_counts"):
         gender[g] = int(c)
+    r["gender"] = gender
+    r["current_month_revenue"] = int(r["current_month_revenue"] or 0)
+    return r
 
-    revenue_rows = (
-        db.session.query(Invoice.billing_month, func.sum(Invoice.total_amount))
-        .filter(Invoice.status == "PAID")
-        .group_by(Invoice.billing_month)
-        .order_by(Invoice.billing_month.desc())
-        .all()
-    )
-    revenue = [{"month": m, "total": int(t or 0)} for m, t in revenue_rows]
+@bp.route("/reports")
+@role_required("ADMIN")
+@conditional(lambda: "school")
+def reports():
+    r = _school_report()
+    revenue = [{"month": m, "total": int(t or 0)} for m, t in r["revenue_rows"]]
 
     return render_template("admin/reports.html",
-                           total_students=total_students,
-                           total_classes=total_classes,
-                           current_month_revenue=int(current_month_revenue),
-                           class_sizes=class_sizes,
+                           total_students=r["total_students"],
+                           total_classes=r["total_classes"],
+                           current_month_revenue=r["current_month_revenue"],
+                           class_sizes=r["class_sizes"],
                            revenue=revenue,
-                           gender=gender)
+                           gender=r["gender"])
 
 @bp.route("/reports/export-pdf")
 @role_required("ADMIN")
 def export_reports_pdf():
-    total_students = Student.query.count()
-    total_classes = Class.query.count()
-    
-    current_month = dt.date.today().strftime('%Y-%m')
-    current_month_revenue = db.session.query(func.sum(Invoice.total_amount))\
-        .filter(Invoice.status == "PAID", Invoice.billing_month == current_month)\
-        .scalar() or 0
-    
-    class_sizes = (
-        db.session.query(Class.id, Class.name, func.count(Student.id).label("student_count"))
-        .outerjoin(Student, Student.class_id == Class.id)
-        .group_by(Class.id, Class.name)
-        .order_by(Class.name)
-        .all()
-    )
+    r = _school_report(revenue_months=6)
 
-    gender_counts = (
-        db.session.query(Student.gender, func.count(Student.id))
-        .group_by(Student.gender)
-        .all()
-    )
-    gender = {"M": 0, "F": 0}
-    for g, c in gender_counts:
-        gender[g] = int(c)
-
-    revenue_rows = (
-        db.session.query(Invoice.billing_month, func.sum(Invoice.total_amount))
-        .filter(Invoice.status == "PAID")
-        .group_by(Invoice.billing_month)
-        .order_by(Invoice.billing_month.desc())
-        .limit(6)
-        .all()
-    )
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    font_name, font_bold = register_fonts()
-    
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#0066cc'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName=font_bold
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#333333'),
-        spaceAfter=12,
-        spaceBefore=20,
-        fontName=font_bold
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontName=font_name,
-        fontSize=10
-    )
-    
-    elements.append(Paragraph("BÁO CÁO THỐNG KÊ HỆ THỐNG", title_style))
-    elements.append(Paragraph(f"Ngày xuất: {dt.date.today().strftime('%d/%m/%Y')}", normal_style))
-    elements.append(Spacer(1, 20))
-    
-    elements.append(Paragraph("TỔNG QUAN HỆ THỐNG", heading_style))
-    overview_data = [
-        ['Chỉ tiêu', 'Giá trị'],
-        ['Tổng số học sinh', str(total_students)],
-        ['Tổng số lớp học', str(total_classes)],
-        ['Doanh thu tháng này', f"{current_month_revenue:,} VND"],
-    ]
-    overview_table = Table(overview_data, colWidths=[10*cm, 6*cm])
-    overview_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), font_bold),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), font_name),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-    ]))
-    elements.append(overview_table)
-    elements.append(Spacer(1, 20))
-    
-    elements.append(Paragraph("TỶ LỆ GIỚI TÍNH", heading_style))
-    gender_data = [
-        ['Giới tính', 'Số lượng', 'Tỷ lệ %'],
-        ['Nam', str(gender['M']), f"{(gender['M']/total_students*100) if total_students > 0 else 0:.1f}%"],
-        ['Nữ', str(gender['F']), f"{(gender['F']/total_students*100) if total_students > 0 else 0:.1f}%"],
-    ]
-    gender_table = Table(gender_data, colWidths=[5*cm, 5*cm, 6*cm])
-    gender_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), font_bold),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), font_name),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-    ]))
-    elements.append(gender_table)
-    elements.append(Spacer(1, 20))
-    
-    elements.append(Paragraph("SĨ SỐ TỪNG LỚP", heading_style))
-    class_data = [['Lớp', 'Sĩ số']]
-    for cls_id, cls_name, count in class_sizes:
-        class_data.append([cls_name, str(count)])
-    class_table = Table(class_data, colWidths=[10*cm, 6*cm])
-    class_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), font_bold),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), font_name),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-    ]))
-    elements.append(class_table)
-    elements.append(Spacer(1, 20))
-    
-    elements.append(Paragraph("DOANH THU CÁC THÁNG", heading_style))
-    revenue_data = [['Tháng', 'Doanh thu (VND)']]
-    for month, total in revenue_rows:
-        revenue_data.append([month, f"{int(total or 0):,}"])
-    revenue_table = Table(revenue_data, colWidths=[8*cm, 8*cm])
-    revenue_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), font_bold),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), font_name),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-    ]))
-    elements.append(revenue_table)
-    
-    doc.build(elements)
-    buffer.seek(0)
+    from ..pdf import build_admin_report
+    buffer = build_admin_report(r["total_students"], r["total_classes"], r["current_month_revenue"],
+                                r["gender"], r["class_sizes"], r["revenue_rows"])
     
     return send_file(
         buffer,
@@ -498,3 +379,131 @@ def export_reports_pdf():
         as_attachment=True,
         download_name=f'bao_cao_admin_{dt.date.today().strftime("%Y%m%d")}.pdf'
     )
+
+@bp.route("/invoices/export-pdf")
+@role_required("ADMIN")
+def invoices_export_pdf():
+    month = request.args.get("month") or dt.date.today().strftime("%Y-%m")
+    class_id = request.args.get("class_id", type=int)
+    try:
+        month_range(month)
+    except Exception:
+        flash("Tháng không hợp lệ.", "danger")
+        return redirect(url_for("admin.reports"))
+
+    from ..invoice_pdfs import count_invoices, export_zip
+    if not count_invoices(month, class_id):
+        flash(f"Chưa có hóa đơn tháng {month}.", "warning")
+        return redirect(url_for("admin.reports"))
+
+    scope = f"lop{class_id}" if class_id else "toan_truong"
+    return Response(
+        stream_with_context(export_zip(month, class_id=class_id)),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=hoa_don_{scope}_{month}.zip"},
+    )
+
+@bp.route("/kitchen")
+@role_required("ADMIN")
+@conditional(lambda: "school")
+def kitchen():
+    today = dt.date.today()
+    classes, totals = headcount(today)
+    return render_template("admin/kitchen.html", today=today, classes=classes, totals=totals)
+
+@bp.route("/kitchen.json")
+@role_required("ADMIN")
+@conditional(lambda: "school")
+def kitchen_json():
+    # Polled by the kitchen page; unchanged counts cost one query and a 304.
+    today = dt.date.today()
+    classes, totals = headcount(today)
+    return jsonify(date=today.isoformat(), classes=classes, totals=totals)
+
+@bp.route("/profiler", methods=["GET", "POST"])
+@role_required("ADMIN")
+def profiler_page():
+    profiler = current_app.extensions["profiler"]
+    if request.method == "POST":
+        endpoints = [e.strip() for e in request.form.get("endpoints", "").split(",") if e.strip()]
+        unknown = [e for e in endpoints if e not in current_app.view_functions]
+        try:
+            sample_every = int(request.form.get("sample_every", "0"))
+            if sample_every <= 0:
+                raise ValueError()
+        except ValueError:
+            flash("Tần suất lấy mẫu phải là số nguyên dương.", "danger")
+            return redirect(url_for("admin.profiler_page"))
+        if unknown:
+            flash(f"Không có endpoint: {', '.join(unknown)}.", "danger")
+            return redirect(url_for("admin.profiler_page"))
+
+        try:
+            profiler.set_control(request.form.get("enabled") == "1", sample_every, endpoints)
+        except OSError as e:
+            current_app.logger.warning("Cannot write profiler control file in %s: %s", profiler.directory, e)
+            flash("Không thể ghi thư mục lưu dữ liệu đo (PROFILER_DIR).", "danger")
+            return redirect(url_for("admin.profiler_page"))
+        flash("Đã cập nhật trình đo hiệu năng. Các worker áp dụng trong vài giây.", "success")
+        return redirect(url_for("admin.profiler_page"))
+
+    view = request.args.get("view") or None
+    entries = profiler.entries()
+    by_endpoint = {}
+    for entry in entries:
+        files, samples = by_endpoint.get(entry["endpoint"], (0, 0))
+        by_endpoint[entry["endpoint"]] = (files + 1, samples + entry["samples"])
+    stats = profiler.merged(view)
+    return render_template("admin/profiler.html", control=profiler.control(), view=view,
+                           by_endpoint=sorted(by_endpoint.items()), entries=entries[:20],
+                           top=profile_top(stats) if stats else [],
+                           endpoints=sorted(e for e in current_app.view_functions if e != "static"))
+
+@bp.route("/profiler/download")
+@role_required("ADMIN")
+def profiler_download():
+    view = request.args.get("view") or None
+    fmt = request.args.get("format", "pstats")
+    stats = current_app.extensions["profiler"].merged(view)
+    if stats is None:
+        flash("Chưa có dữ liệu đo.", "warning")
+        return redirect(url_for("admin.profiler_page", view=view))
+
+    name = f"profile_{view or 'all'}_{dt.datetime.now():%Y%m%d_%H%M}"
+    if fmt == "collapsed":
+        return Response(collapsed_stacks(stats), mimetype="text/plain",
+                        headers={"Content-Disposition": f"attachment; filename={name}.folded"})
+    return Response(pstats_bytes(stats), mimetype="application/octet-stream",
+                    headers={"Content-Disposition": f"attachment; filename={name}.prof"})
+
+@bp.route("/profiler/clear", methods=["POST"])
+@role_required("ADMIN")
+def profiler_clear():
+    current_app.extensions["profiler"].clear()
+    flash("Đã xóa dữ liệu đo.", "success")
+    return redirect(url_for("admin.profiler_page"))
+
+AUDIT_PAGE_SIZE = 50
+
+@bp.route("/audit")
+@role_required("ADMIN")
+def audit_log():
+    actor = request.args.get("actor", "").strip()
+    entity = request.args.get("entity", "").strip()
+    action = request.args.get("action", "").strip()
+    before = request.args.get("before", type=int)
+
+    q = AuditLog.query
+    if actor:
+        q = q.filter(AuditLog.actor == actor)
+    if entity:
+        q = q.filter(AuditLog.entity == entity)
+    if action:
+        q = q.filter(AuditLog.action == action)
+    if before:
+        q = q.filter(AuditLog.id < before)
+    # Keyset pagination: the table only grows, OFFSET would scan it.
+    events = q.order_by(AuditLog.id.desc()).limit(AUDIT_PAGE_SIZE + 1).all()
+    next_before = events[AUDIT_PAGE_SIZE - 1].id if len(events) > AUDIT_PAGE_SIZE else None
+    return render_template("admin/audit.html", events=events[:AUDIT_PAGE_SIZE], next_before=next_before,
+                           actor=actor, entity=entity, action=action)
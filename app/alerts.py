@@ -0,0 +1,285 @@
+"""Fever alerts through a transactional outbox.
+
+Saving a HealthRecord at or above FEVER_THRESHOLD_C inserts a ``fever_alerts``
+row in the same transaction, so an alert exists if and only if the reading
+was committed, and the teacher's save never waits on SMS or mail. The
+unique (student, day) key makes a second high reading that day a no-op.
+
+A dispatcher outside gunicorn drains the outbox in batches:
+
+    flask --app wsgi alerts dispatch --loop     # long-running, e.g. under systemd
+    flask --app wsgi alerts dispatch            # one pass, e.g. from cron every minute
+    flask --app wsgi alerts status
+
+Rows are claimed with ``FOR UPDATE SKIP LOCKED`` so several dispatchers can
+run at once. A failed send is retried with exponential backoff until
+ALERT_MAX_ATTEMPTS, then left as FAILED for ``alerts status`` to show.
+"""
+import json
+import time
+import smtplib
+import datetime as dt
+import urllib.request
+from email.message import EmailMessage
+
+import click
+from flask import current_app, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, select, func
+
+from .extensions import db
+from .models import Class, Student, HealthRecord, FeverAlert
+
+DEFAULT_THRESHOLD_C = 38.0
+
+def threshold():
+    if has_app_context():
+        return float(current_app.config.get("FEVER_THRESHOLD_C", DEFAULT_THRESHOLD_C))
+    return DEFAULT_THRESHOLD_C
+
+# --- outbox -----------------------------------------------------------------
+
+def _new_fevers(session):
+    limit = threshold()
+    fevers = {}
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, HealthRecord) or obj.temperature_c is None:
+            continue
+        if float(obj.temperature_c) < limit:
+            continue
+        if obj not in session.new:
+            hist = inspect(obj).attrs.temperature_c.history
+            if not hist.deleted or (hist.deleted[0] is not None and float(hist.deleted[0]) >= limit):
+                continue  # unchanged, or already a fever before this edit
+        key = (obj.student_id, obj.record_date)
+        fevers[key] = max(fevers.get(key, 0), float(obj.temperature_c))
+    return fevers
+
+def _enqueue_on_flush(session, flush_context):
+    fevers = _new_fevers(session)
+    if not fevers:
+        return
+    conn = session.connection()
+    table = FeverAlert.__table__
+    now = dt.datetime.now()
+    rows = [{"student_id": sid, "alert_date": day, "temperature_c": temp, "status": "PENDING",
+             "attempts": 0, "next_attempt_at": now, "created_at": now}
+            for (sid, day), temp in sorted(fevers.items())]
+    if conn.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows).prefix_with("IGNORE")
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows).on_conflict_do_nothing()
+    conn.execute(stmt)
+
+# --- notifiers --------------------------------------------------------------
+
+def message(alert):
+    return (f"Bé {alert['student_name']} (lớp {alert['class_name']}) sốt {alert['temperature_c']}°C "
+            f"ngày {alert['alert_date'].strftime('%d/%m/%Y')}. Phụ huynh vui lòng liên hệ nhà trường.")
+
+class Notifier:
+    """Send a batch of alerts; return ``{alert_id: error message or None}``.
+
+    Subclasses override ``send_batch`` to use one request per batch, or
+    ``send`` to deliver alerts one at a time.
+    """
+
+    def send(self, alert):
+        raise NotImplementedError
+
+    def send_batch(self, alerts):
+        results = {}
+        for alert in alerts:
+            try:
+                self.send(alert)
+                results[alert["id"]] = None
+            except Exception as e:
+                results[alert["id"]] = f"{type(e).__name__}: {e}"
+        return results
+
+class ConsoleNotifier(Notifier):
+    def send(self, alert):
+        click.echo(f"[fever] {alert['parent_phone']}: {message(alert)}")
+
+class FileNotifier(Notifier):
+    """Appends JSON lines; a stand-in for SMS when testing."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send_batch(self, alerts):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for alert in alerts:
+                f.write(json.dumps({"to": alert["parent_phone"], "text": message(alert), "id": alert["id"]},
+                                   ensure_ascii=False) + "\n")
+        return {alert["id"]: None for alert in alerts}
+
+class WebhookNotifier(Notifier):
+    """POSTs the whole batch as JSON to an SMS gateway: {"messages": [{"id", "to", "text"}]}."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send_batch(self, alerts):
+        body = json.dumps({"messages": [{"id": a["id"], "to": a["parent_phone"], "text": message(a)}
+                                        for a in alerts]}, ensure_ascii=False).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout):
+                pass
+        except Exception as e:
+            return {a["id"]: f"{type(e).__name__}: {e}" for a in alerts}
+        return {a["id"]: None for a in alerts}
+
+class EmailNotifier(Notifier):
+    """One summary mail per batch to the school nurse / office."""
+
+    def __init__(self, host, port, sender, recipients):
+        self.host, self.port, self.sender, self.recipients = host, port, sender, recipients
+
+    def send_batch(self, alerts):
+        msg = EmailMessage()
+        msg["Subject"] = f"Cảnh báo sốt: {len(alerts)} trẻ"
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.recipients)
+        msg.set_content("\n".join(f"- {message(a)} SĐT phụ huynh: {a['parent_phone']}" for a in alerts))
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+                smtp.send_message(msg)
+        except Exception as e:
+            return {a["id"]: f"{type(e).__name__}: {e}" for a in alerts}
+        return {a["id"]: None for a in alerts}
+
+def get_notifier():
+    config = current_app.config
+    kind = config["ALERT_NOTIFIER"]
+    if kind == "file":
+        return FileNotifier(config["ALERT_FILE_PATH"])
+    if kind == "webhook":
+        return WebhookNotifier(config["ALERT_WEBHOOK_URL"])
+    if kind == "email":
+        return EmailNotifier(config["ALERT_SMTP_HOST"], config["ALERT_SMTP_PORT"], config["ALERT_EMAIL_FROM"],
+                             [r.strip() for r in config["ALERT_EMAIL_TO"].split(",") if r.strip()])
+    return ConsoleNotifier()
+
+# --- dispatcher -------------------------------------------------------------
+
+def _backoff(attempts):
+    # 1, 2, 4, 8 ... minutes, capped at an hour.
+    return dt.timedelta(minutes=min(60, 2 ** (attempts - 1)))
+
+def dispatch(notifier=None, batch=None, now=None):
+    """Send one batch of due alerts and commit. Returns ``(sent, failed)``."""
+    notifier = notifier or get_notifier()
+    batch = batch or current_app.config["ALERT_BATCH_SIZE"]
+    now = now or dt.datetime.now()
+
+    alerts = db.session.scalars(
+        select(FeverAlert)
+        .where(FeverAlert.status == "PENDING", FeverAlert.next_attempt_at <= now)
+        .order_by(FeverAlert.next_attempt_at, FeverAlert.id)
+        .limit(batch)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not alerts:
+        db.session.commit()
+        return 0, 0
+
+    students = {
+        row.id: row for row in db.session.execute(
+            select(Student.id, Student.full_name, Student.parent_name, Student.parent_phone,
+                   Class.name.label("class_name"))
+            .join(Class, Class.id == Student.class_id)
+            .where(Student.id.in_({a.student_id for a in alerts}))
+        )
+    }
+    payload = []
+    for a in alerts:
+        st = students.get(a.student_id)
+        if st is None:
+            # Student deleted since the reading; nothing to send.
+            a.status, a.last_error = "FAILED", "student no longer exists"
+            continue
+        payload.append({"id": a.id, "student_id": a.student_id, "alert_date": a.alert_date,
+                        "temperature_c": a.temperature_c, "student_name": st.full_name,
+                        "class_name": st.class_name, "parent_name": st.parent_name,
+                        "parent_phone": st.parent_phone})
+
+    try:
+        results = notifier.send_batch(payload) if payload else {}
+    except Exception as e:
+        results = {p["id"]: f"{type(e).__name__}: {e}" for p in payload}
+
+    sent = failed = 0
+    max_attempts = current_app.config["ALERT_MAX_ATTEMPTS"]
+    for a in alerts:
+        if a.id not in results:
+            continue
+        error = results[a.id]
+        a.attempts += 1
+        if error is None:
+            a.status, a.sent_at, a.last_error = "SENT", now, None
+            sent += 1
+        else:
+            a.last_error = error[:255]
+            if a.attempts >= max_attempts:
+                a.status = "FAILED"
+            else:
+                a.next_attempt_at = now + _backoff(a.attempts)
+            failed += 1
+    db.session.commit()
+    return sent, failed
+
+# --- CLI --------------------------------------------------------------------
+
+cli = AppGroup("alerts", help="Fever alert outbox.")
+
+@cli.command("dispatch")
+@click.option("--loop", is_flag=True, help="Keep polling instead of exiting when the outbox is empty.")
+@click.option("--interval", default=5.0, show_default=True, help="Seconds between polls with --loop.")
+@click.option("--batch", type=int, help="Alerts per batch (default: ALERT_BATCH_SIZE).")
+def dispatch_command(loop, interval, batch):
+    """Send pending fever alerts."""
+    notifier = get_notifier()
+    while True:
+        try:
+            sent, failed = dispatch(notifier, batch)
+        except Exception as e:
+            db.session.rollback()
+            if not loop:
+                raise
+            click.echo(f"dispatch failed: {type(e).__name__}: {e}", err=True)
+            sent = failed = 0
+        if sent or failed:
+            click.echo(f"{sent} sent, {failed} failed")
+            continue  # drain the backlog before sleeping
+        if not loop:
+            return
+        db.session.remove()
+        time.sleep(interval)
+
+@cli.command("status")
+def status_command():
+    """Count alerts by status and list the failed ones."""
+    for status, n in db.session.query(FeverAlert.status, func.count(FeverAlert.id)).group_by(FeverAlert.status):
+        click.echo(f"{status:<8} {n}")
+    for a in FeverAlert.query.filter(FeverAlert.status == "FAILED").order_by(FeverAlert.id.desc()).limit(20):
+        click.echo(f"  #{a.id} student {a.student_id} {a.alert_date} {a.temperature_c}°C: {a.last_error}")
+
+def init_app(app):
+    app.config.setdefault("FEVER_THRESHOLD_C", DEFAULT_THRESHOLD_C)
+    app.config.setdefault("ALERT_NOTIFIER", "console")
+    app.config.setdefault("ALERT_FILE_PATH", "fever_alerts.jsonl")
+    app.config.setdefault("ALERT_WEBHOOK_URL", "")
+    app.config.setdefault("ALERT_SMTP_HOST", "localhost")
+    app.config.setdefault("ALERT_SMTP_PORT", 25)
+    app.config.setdefault("ALERT_EMAIL_FROM", "")
+    app.config.setdefault("ALERT_EMAIL_TO", "")
+    app.config.setdefault("ALERT_BATCH_SIZE", 50)
+    app.config.setdefault("ALERT_MAX_ATTEMPTS", 6)
+    if not event.contains(db.session, "after_flush", _enqueue_on_flush):
+        event.listen(db.session, "after_flush", _enqueue_on_flush)
+    app.cli.add_command(cli)
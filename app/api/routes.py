@@ -0,0 +1,600 @@
+import datetime as dt
+from functools import wraps
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from flask import request, jsonify, g
+from flask_login import current_user, login_user
+
+from . import bp
+from ..extensions import db
+from ..models import User, Class, Student, HealthRecord, MealLog, MealDay, Invoice, ChangeLog
+from .. import meals as meals_storage
+from ..versioning import conditional, class_scope, SETTINGS_SCOPE
+from ..search import search_students
+from ..changelog import settled_id, SETTLE
+from ..ratelimit import login_retry_after, login_succeeded
+
+# Tables are sent as {"fields": [...], "rows": [[...], ...]} instead of a list
+# of objects: tablets on school Wi-Fi pay for every repeated key.
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+STUDENT_FIELDS = {
+    "id": lambda s: s.id,
+    "full_name": lambda s: s.full_name,
+    "dob": lambda s: _iso(s.dob),
+    "gender": lambda s: s.gender,
+    "parent_name": lambda s: s.parent_name,
+    "parent_phone": lambda s: s.parent_phone,
+    "enrolled_on": lambda s: _iso(s.enrolled_on),
+    "updated_at": lambda s: _iso(s.updated_at),
+}
+
+MEAL_FIELDS = {
+    "id": lambda m: m.id,
+    "student_id": lambda m: m.student_id,
+    "log_date": lambda m: _iso(m.log_date),
+    "ate": lambda m: 1 if m.ate else 0,
+    "updated_at": lambda m: _iso(m.updated_at),
+}
+
+HEALTH_FIELDS = {
+    "id": lambda r: r.id,
+    "student_id": lambda r: r.student_id,
+    "record_date": lambda r: _iso(r.record_date),
+    "weight_kg": lambda r: float(r.weight_kg) if r.weight_kg is not None else None,
+    "temperature_c": lambda r: float(r.temperature_c),
+    "note": lambda r: r.note,
+    "updated_at": lambda r: _iso(r.updated_at),
+}
+
+INVOICE_FIELDS = {
+    "id": lambda i: i.id,
+    "student_id": lambda i: i.student_id,
+    "billing_month": lambda i: i.billing_month,
+    "tuition_fee": lambda i: i.tuition_fee,
+    "meal_unit_price": lambda i: i.meal_unit_price,
+    "meal_days": lambda i: i.meal_days,
+    "discount_amount": lambda i: i.discount_amount,
+    "total_amount": lambda i: i.total_amount,
+    "status": lambda i: i.status,
+    "paid_at": lambda i: _iso(i.paid_at),
+    "updated_at": lambda i: _iso(i.updated_at),
+}
+
+class ApiError(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.extra = extra
+
+@bp.errorhandler(ApiError)
+def handle_api_error(e):
+    response = jsonify(error=e.message, **e.extra)
+    if "retry_after" in e.extra:
+        response.headers["Retry-After"] = str(e.extra["retry_after"])
+    return response, e.status
+
+def _get_teacher_class():
+    if "teacher_class" not in g:
+        g.teacher_class = Class.query.filter_by(teacher_id=current_user.id).first()
+    return g.teacher_class
+
+def _class_scopes():
+    return [class_scope(_get_teacher_class().id), SETTINGS_SCOPE]
+
+def teacher_required(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            raise ApiError(401, "authentication required")
+        if current_user.role != "TEACHER":
+            raise ApiError(403, "teacher account required")
+        if not _get_teacher_class():
+            raise ApiError(403, "no class assigned")
+        return f(*args, **kwargs)
+    return wrapper
+
+def _table(objs, available, selectable=True):
+    raw = request.args.get("fields") if selectable else None
+    if raw:
+        fields = [f.strip() for f in raw.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in available]
+        if unknown:
+            raise ApiError(400, "unknown fields", fields=unknown)
+    else:
+        fields = list(available)
+    getters = [available[f] for f in fields]
+    return {"fields": fields, "rows": [[get(o) for get in getters] for o in objs]}
+
+def _parse_date(value, name="date"):
+    try:
+        return dt.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"invalid {name}")
+
+# A row stamped before server_time may commit after the request read the
+# table; delta requests reach back this far, and clients upsert duplicates.
+SINCE_OVERLAP = dt.timedelta(seconds=10)
+
+@bp.before_request
+def _stamp_server_time():
+    # Taken before any query, so nothing written after it is missed.
+    g.server_time = dt.datetime.now()
+
+def _since():
+    """Lower bound for ``updated_at >= since``, SINCE_OVERLAP before the client's cursor."""
+    value = request.args.get("since")
+    if not value:
+        return None
+    try:
+        return dt.datetime.fromisoformat(value) - SINCE_OVERLAP
+    except ValueError:
+        raise ApiError(400, "invalid since")
+
+def _parse_ate(value):
+    # bool("0") and bool("false") are True; only take real booleans or 0/1.
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    raise ValueError("ate must be true/false or 0/1")
+
+def _json_body():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ApiError(400, "JSON object body required")
+    return data
+
+def _envelope(**payload):
+    # server_time is the cursor for the next ?since= delta request.
+    return jsonify(server_time=g.server_time.isoformat(timespec="seconds"), **payload)
+
+@bp.route("/login", methods=["POST"])
+def login():
+    data = _json_body()
+    username = str(data.get("username", "")).strip()
+    password = str(data.get("password", ""))
+    retry_after = login_retry_after(username)
+    if retry_after:
+        raise ApiError(429, "too many login attempts", retry_after=retry_after)
+    user = User.query.filter_by(username=username).first()
+    if not user or not user.check_password(password):
+        raise ApiError(401, "invalid credentials")
+    login_succeeded(username)
+    if user.rehash_password(password):
+        db.session.commit()
+    login_user(user, remember=bool(data.get("remember")))
+    return jsonify(id=user.id, username=user.username, full_name=user.full_name, role=user.role)
+
+@bp.route("/students")
+@teacher_required
+@conditional(_class_scopes)
+def students():
+    classroom = _get_teacher_class()
+    q = Student.query.filter(Student.class_id == classroom.id)
+    since = _since()
+    if since:
+        q = q.filter(Student.updated_at >= since)
+    return _envelope(class_id=classroom.id, class_name=classroom.name,
+                     students=_table(q.order_by(Student.full_name).all(), STUDENT_FIELDS))
+
+@bp.route("/students/search")
+@teacher_required
+def students_search():
+    q = request.args.get("q", "").strip()
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 100))
+    except ValueError:
+        raise ApiError(400, "invalid limit")
+    results = search_students(q, class_id=_get_teacher_class().id, limit=limit) if q else []
+    table = _table([st for _, st in results], STUDENT_FIELDS)
+    table["scores"] = [score for score, _ in results]
+    return jsonify(q=q, students=table)
+
+@bp.route("/meals")
+@teacher_required
+@conditional(_class_scopes)
+def meals():
+    classroom = _get_teacher_class()
+    q = MealLog.query.join(Student, Student.id == MealLog.student_id).filter(Student.class_id == classroom.id)
+    days = MealDay.query.filter(MealDay.class_id == classroom.id)
+    since = _since()
+    if since:
+        q = q.filter(MealLog.updated_at >= since)
+        days = days.filter(MealDay.recorded_at >= since)
+    if request.args.get("date") or not since:
+        log_date = _parse_date(request.args.get("date") or dt.date.today().isoformat())
+        q = q.filter(MealLog.log_date == log_date)
+        days = days.filter(MealDay.log_date == log_date)
+    payload = {"meals": _table(q.order_by(MealLog.log_date, MealLog.student_id).all(), MEAL_FIELDS)}
+    if since:
+        # Sparse mode deletes the row of a child switched back to "ate";
+        # deltas carry the same tombstones as GET /sync (of any date).
+        deleted = (db.session.query(ChangeLog.entity_id).distinct()
+                   .filter(ChangeLog.class_id == classroom.id, ChangeLog.entity == "meal",
+                           ChangeLog.op == "D", ChangeLog.changed_at >= since))
+        payload["deleted"] = {"meals": sorted(eid for (eid,) in deleted)}
+    if meals_storage.sparse():
+        # Only the missed meals are rows; every other child of a recorded day ate.
+        payload["recorded_days"] = [d.log_date.isoformat() for d in days.order_by(MealDay.log_date)]
+    return _envelope(**payload)
+
+def _locked_student_ids(classroom, billing_month):
+    rows = (
+        db.session.query(Invoice.student_id)
+        .join(Student, Student.id == Invoice.student_id)
+        .filter(Student.class_id == classroom.id, Invoice.billing_month == billing_month, Invoice.status == "PAID")
+        .all()
+    )
+    return {sid for (sid,) in rows}
+
+@bp.route("/meals", methods=["PUT"])
+@teacher_required
+def meals_save():
+    """Save a whole class's meals for one day.
+
+    Body: ``{"date": "YYYY-MM-DD", "meals": [[student_id, 0|1], ...]}``.
+    Students whose invoice for the month is already PAID are skipped.
+    """
+    classroom = _get_teacher_class()
+    data = _json_body()
+    log_date = _parse_date(data.get("date"))
+    try:
+        pairs = {int(sid): _parse_ate(ate) for sid, ate in data.get("meals") or []}
+    except (TypeError, ValueError):
+        raise ApiError(400, "meals must be a list of [student_id, 0|1] pairs")
+
+    class_ids = {sid for (sid,) in db.session.query(Student.id).filter(Student.class_id == classroom.id).all()}
+    rejected = sorted(sid for sid in pairs if sid not in class_ids)
+    locked = _locked_student_ids(classroom, log_date.strftime("%Y-%m"))
+
+    saved = meals_storage.save_day(classroom.id, log_date, {
+        sid: ate for sid, ate in pairs.items() if sid in class_ids and sid not in locked
+    })
+
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise ApiError(500, "could not save meals")
+    return jsonify(saved=saved, locked=sorted(locked & set(pairs)), rejected=rejected)
+
+@bp.route("/health")
+@teacher_required
+@conditional(_class_scopes)
+def health():
+    classroom = _get_teacher_class()
+    q = HealthRecord.query.join(Student, Student.id == HealthRecord.student_id).filter(Student.class_id == classroom.id)
+    since = _since()
+    if since:
+        q = q.filter(HealthRecord.updated_at >= since)
+    if request.args.get("date") or not since:
+        q = q.filter(HealthRecord.record_date == _parse_date(request.args.get("date") or dt.date.today().isoformat()))
+    return _envelope(health=_table(q.order_by(HealthRecord.record_date, HealthRecord.student_id).all(), HEALTH_FIELDS))
+
+def _parse_health_item(item):
+    try:
+        sid = int(item["student_id"])
+        temp = float(item["temperature_c"])
+        weight = item.get("weight_kg")
+        weight = float(weight) if weight not in (None, "") else None
+    except (KeyError, TypeError, ValueError):
+        return None
+    note = (item.get("note") or "").strip() or None
+    return sid, weight, temp, note
+
+@bp.route("/health", methods=["PUT"])
+@teacher_required
+def health_save():
+    """Save temperatures (and optional weight/note) for many students at once.
+
+    Body: ``{"date": "YYYY-MM-DD", "records": [{"student_id", "temperature_c",
+    "weight_kg", "note"}, ...]}``. Nothing is saved if any record is invalid.
+    """
+    classroom = _get_teacher_class()
+    data = _json_body()
+    record_date = _parse_date(data.get("date"))
+    items = data.get("records")
+    if not isinstance(items, list):
+        raise ApiError(400, "records must be a list")
+
+    class_ids = {sid for (sid,) in db.session.query(Student.id).filter(Student.class_id == classroom.id).all()}
+    parsed, errors = [], []
+    for idx, item in enumerate(items):
+        values = _parse_health_item(item) if isinstance(item, dict) else None
+        if values is None:
+            errors.append({"index": idx, "error": "invalid record"})
+        elif values[0] not in class_ids:
+            errors.append({"index": idx, "error": "student not in class"})
+        else:
+            parsed.append(values)
+    if errors:
+        raise ApiError(400, "invalid records", errors=errors)
+
+    existing = {
+        r.student_id: r
+        for r in HealthRecord.query.join(Student, Student.id == HealthRecord.student_id)
+        .filter(Student.class_id == classroom.id, HealthRecord.record_date == record_date).all()
+    }
+    for sid, weight, temp, note in parsed:
+        rec = existing.get(sid)
+        if rec:
+            rec.weight_kg = weight
+            rec.temperature_c = temp
+            rec.note = note
+        else:
+            rec = HealthRecord(student_id=sid, record_date=record_date, weight_kg=weight, temperature_c=temp, note=note)
+            db.session.add(rec)
+            existing[sid] = rec
+
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise ApiError(500, "could not save health records")
+    return jsonify(saved=len(parsed))
+
+@bp.route("/invoices")
+@teacher_required
+@conditional(_class_scopes)
+def invoices():
+    classroom = _get_teacher_class()
+    q = Invoice.query.join(Student, Student.id == Invoice.student_id).filter(Student.class_id == classroom.id)
+    since = _since()
+    if since:
+        q = q.filter(Invoice.updated_at >= since)
+    if request.args.get("month") or not since:
+        q = q.filter(Invoice.billing_month == (request.args.get("month") or dt.date.today().strftime("%Y-%m")))
+    return _envelope(invoices=_table(q.order_by(Invoice.billing_month, Invoice.student_id).all(), INVOICE_FIELDS))
+
+@bp.route("/invoices/<int:invoice_id>/confirm", methods=["POST"])
+@teacher_required
+def invoice_confirm(invoice_id):
+    classroom = _get_teacher_class()
+    inv = db.session.get(Invoice, invoice_id)
+    if not inv or inv.student.class_id != classroom.id:
+        raise ApiError(404, "invoice not found")
+    if inv.status != "PAID":
+        inv.status = "PAID"
+        inv.paid_at = dt.datetime.now()
+        inv.collected_by = current_user.id
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise ApiError(500, "could not confirm invoice")
+    return jsonify(id=inv.id, status=inv.status, paid_at=_iso(inv.paid_at))
+
+# --- Offline sync -----------------------------------------------------------
+#
+# Clients keep the change_log id they last saw as an opaque cursor. GET /sync
+# returns rows changed since that cursor (current state, or a tombstone for
+# deletes); POST /sync applies queued offline writes and reports conflicts
+# instead of overwriting rows someone else changed after the client's cursor.
+# Deleting a student bulk-deletes its meals, health records and invoices;
+# each gets its own tombstone (changelog.log_bulk_deletes) next to the
+# student's.
+
+SYNC_ENTITIES = {
+    "student": (Student, STUDENT_FIELDS, "students"),
+    "meal": (MealLog, MEAL_FIELDS, "meals"),
+    "health": (HealthRecord, HEALTH_FIELDS, "health"),
+    "invoice": (Invoice, INVOICE_FIELDS, "invoices"),
+}
+SNAPSHOT_DAYS = 31
+SYNC_MAX_LIMIT = 5000
+# The cursor only moves past settled entries (changelog.settled_id); later
+# ones are sent again on the next pull, which clients apply idempotently.
+
+def _snapshot(classroom):
+    since_day = dt.date.today() - dt.timedelta(days=SNAPSHOT_DAYS)
+    since_month = since_day.strftime("%Y-%m")
+    students = Student.query.filter(Student.class_id == classroom.id).order_by(Student.id).all()
+    meals = (MealLog.query.join(Student, Student.id == MealLog.student_id)
+             .filter(Student.class_id == classroom.id, MealLog.log_date >= since_day).all())
+    health = (HealthRecord.query.join(Student, Student.id == HealthRecord.student_id)
+              .filter(Student.class_id == classroom.id, HealthRecord.record_date >= since_day).all())
+    invoices = (Invoice.query.join(Student, Student.id == Invoice.student_id)
+                .filter(Student.class_id == classroom.id, Invoice.billing_month >= since_month).all())
+    payload = {
+        "students": _table(students, STUDENT_FIELDS, selectable=False),
+        "meals": _table(meals, MEAL_FIELDS, selectable=False),
+        "health": _table(health, HEALTH_FIELDS, selectable=False),
+        "invoices": _table(invoices, INVOICE_FIELDS, selectable=False),
+        "deleted": {key: [] for _, _, key in SYNC_ENTITIES.values()},
+    }
+    if meals_storage.sparse():
+        payload["recorded_days"] = _recorded_days(classroom, MealDay.log_date >= since_day)
+    return payload
+
+def _recorded_days(classroom, *criteria):
+    """Sparse mode: days the class's meals were taken; meals only lists the missed ones."""
+    days = MealDay.query.filter(MealDay.class_id == classroom.id, *criteria).order_by(MealDay.log_date)
+    return [d.log_date.isoformat() for d in days]
+
+@bp.route("/sync")
+@teacher_required
+def sync_pull():
+    classroom = _get_teacher_class()
+    try:
+        cursor = int(request.args.get("cursor", 0))
+        limit = max(1, min(int(request.args.get("limit", 1000)), SYNC_MAX_LIMIT))
+    except ValueError:
+        raise ApiError(400, "invalid cursor or limit")
+
+    min_id = db.session.query(func.min(ChangeLog.id)).scalar()
+    settled = settled_id()
+    # Cursor 0 is a fresh client; a cursor older than the retained log means
+    # entries were purged, so both get a full snapshot. Its cursor is the
+    # settled one, so entries still committing are replayed afterwards.
+    if cursor <= 0 or (min_id is not None and cursor < min_id - 1):
+        return jsonify(cursor=settled, more=False, reset=True, **_snapshot(classroom))
+
+    entries = (
+        db.session.query(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+        .filter(ChangeLog.class_id == classroom.id, ChangeLog.id > cursor)
+        .order_by(ChangeLog.id)
+        .limit(limit + 1)
+        .all()
+    )
+    more = len(entries) > limit
+    entries = entries[:limit]
+    if more and entries[-1][0] <= settled:
+        new_cursor = entries[-1][0]
+    else:
+        # Whatever is past the settled id is sent now and again next time.
+        new_cursor, more = max(cursor, settled), False
+
+    latest = {}
+    for _, entity, entity_id, op in entries:
+        latest[(entity, entity_id)] = op
+
+    payload = {"deleted": {}}
+    for entity, (model, fields, key) in SYNC_ENTITIES.items():
+        upserts = [eid for (e, eid), op in latest.items() if e == entity and op == "U"]
+        rows = model.query.filter(model.id.in_(upserts)).order_by(model.id).all() if upserts else []
+        payload[key] = _table(rows, fields, selectable=False)
+        payload["deleted"][key] = sorted(eid for (e, eid), op in latest.items() if e == entity and op == "D")
+
+    if meals_storage.sparse():
+        # Day markers are not in the change log: send those recorded since the
+        # client's cursor entry, with the same settle window as the cursor.
+        since = (db.session.query(ChangeLog.changed_at).filter(ChangeLog.id <= cursor)
+                 .order_by(ChangeLog.id.desc()).limit(1).scalar())
+        criteria = [MealDay.recorded_at >= since - SETTLE] if since else []
+        payload["recorded_days"] = _recorded_days(classroom, *criteria)
+
+    return jsonify(cursor=new_cursor, more=more, reset=False, **payload)
+
+def _parse_sync_op(op):
+    kind = op.get("type")
+    sid = int(op["student_id"])
+    day = dt.date.fromisoformat(op["date"])
+    if kind == "meal":
+        return kind, sid, day, {"ate": _parse_ate(op["ate"])}
+    if kind == "health":
+        values = _parse_health_item(op)
+        if values is None:
+            raise ValueError("invalid health op")
+        _, weight, temp, note = values
+        return kind, sid, day, {"weight_kg": weight, "temperature_c": temp, "note": note}
+    raise ValueError("unknown op type")
+
+@bp.route("/sync", methods=["POST"])
+@teacher_required
+def sync_push():
+    """Apply queued offline writes.
+
+    Body: ``{"cursor": N, "force": false, "ops": [{"type": "meal", "student_id",
+    "date", "ate"}, {"type": "health", "student_id", "date", "temperature_c",
+    "weight_kg", "note"}, ...]}``. An op conflicts when its (student, date) row
+    was changed by someone else after ``cursor``; conflicting ops are not
+    applied unless ``force`` is set, and the server row is returned instead.
+    """
+    classroom = _get_teacher_class()
+    data = _json_body()
+    try:
+        cursor = int(data.get("cursor") or 0)
+    except (TypeError, ValueError):
+        raise ApiError(400, "invalid cursor")
+    force = bool(data.get("force"))
+    ops = data.get("ops")
+    if not isinstance(ops, list):
+        raise ApiError(400, "ops must be a list")
+
+    parsed, rejected = [], []
+    for idx, op in enumerate(ops):
+        try:
+            parsed.append((idx,) + _parse_sync_op(op))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            rejected.append({"index": idx, "error": "invalid op"})
+    if not parsed:
+        return jsonify(applied=[], conflicts=[], rejected=rejected)
+
+    class_ids = {sid for (sid,) in db.session.query(Student.id).filter(Student.class_id == classroom.id).all()}
+    days = {day for _, _, _, day, _ in parsed}
+    months = {day.strftime("%Y-%m") for day in days}
+
+    existing = {}
+    for model, date_col, kind in ((MealLog, MealLog.log_date, "meal"), (HealthRecord, HealthRecord.record_date, "health")):
+        rows = (model.query.join(Student, Student.id == model.student_id)
+                .filter(Student.class_id == classroom.id, date_col.in_(days)).all())
+        for r in rows:
+            existing[(kind, r.student_id, getattr(r, date_col.key))] = r
+
+    changed = set()
+    if existing:
+        changed = set(
+            db.session.query(ChangeLog.entity, ChangeLog.entity_id)
+            .filter(ChangeLog.class_id == classroom.id, ChangeLog.id > cursor,
+                    ChangeLog.entity.in_(["meal", "health"]),
+                    ChangeLog.entity_id.in_([r.id for r in existing.values()]))
+            .all()
+        )
+
+    paid = set(
+        db.session.query(Invoice.student_id, Invoice.billing_month)
+        .join(Student, Student.id == Invoice.student_id)
+        .filter(Student.class_id == classroom.id, Invoice.billing_month.in_(months), Invoice.status == "PAID")
+        .all()
+    )
+
+    sparse, marked = meals_storage.sparse(), set()
+    applied, conflicts = [], []
+    for idx, kind, sid, day, values in parsed:
+        if sid not in class_ids:
+            rejected.append({"index": idx, "error": "student not in class"})
+            continue
+        if kind == "meal" and (sid, day.strftime("%Y-%m")) in paid:
+            rejected.append({"index": idx, "error": "month already paid"})
+            continue
+        row = existing.get((kind, sid, day))
+        if row is not None and (kind, row.id) in changed and not force:
+            fields = MEAL_FIELDS if kind == "meal" else HEALTH_FIELDS
+            conflicts.append({"index": idx, "server": _table([row], fields, selectable=False)})
+            continue
+        if kind == "meal" and sparse:
+            if day not in marked:
+                meals_storage.mark_day(classroom.id, day)
+                marked.add(day)
+            if values["ate"]:
+                # Eating is implied by the day's marker; drop a missed-meal row instead.
+                if row is not None:
+                    db.session.delete(row)
+                    del existing[(kind, sid, day)]
+                applied.append(idx)
+                continue
+        if row is None:
+            model, date_col = (MealLog, MealLog.log_date) if kind == "meal" else (HealthRecord, HealthRecord.record_date)
+            try:
+                # A savepoint per insert: another device may add the same
+                # (student, day) concurrently, which must not fail the batch.
+                with db.session.begin_nested():
+                    row = model(student_id=sid, **{date_col.key: day}, **values)
+                    db.session.add(row)
+            except IntegrityError:
+                # A locking read sees the other transaction's committed row.
+                row = (model.query.populate_existing().with_for_update()
+                       .filter(model.student_id == sid, date_col == day).one())
+                existing[(kind, sid, day)] = row
+                if not force:
+                    fields = MEAL_FIELDS if kind == "meal" else HEALTH_FIELDS
+                    conflicts.append({"index": idx, "server": _table([row], fields, selectable=False)})
+                    continue
+            else:
+                existing[(kind, sid, day)] = row
+                applied.append(idx)
+                continue
+        for name, value in values.items():
+            setattr(row, name, value)
+        applied.append(idx)
+
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise ApiError(500, "could not apply ops")
+    return jsonify(applied=applied, conflicts=conflicts, rejected=rejected)
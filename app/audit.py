@@ -0,0 +1,240 @@
+"""Audit log: who changed what, off the request path.
+
+Every row the ORM inserts, updates or deletes becomes an ``audit_log`` event
+(actor, action, entity, id and a ``{"column": [old, new]}`` diff). Events
+are collected at flush, handed over only when the transaction commits (a
+rolled-back write leaves no trace), and go through a bounded in-process
+queue to a background thread that inserts them in batches on its own
+connection. A write request pays for building a few dicts, not for an
+INSERT. Bulk writes that skip the flush hooks call ``note`` with a summary.
+
+If the queue is full (the database is down for a long time), new events are
+dropped and counted rather than blocking requests; batches that still fail
+after retries are written to the application log as JSON. Events waiting in
+the queue when a worker exits are flushed at exit.
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import decimal
+import datetime as dt
+import threading
+
+from flask import current_app, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.engine import make_url
+
+from .extensions import db
+from .models import (AuditLog, ChangeLog, DataVersion, MealCount, StudentSummary, FeverAlert, JobRun,
+                     MealLogArchive, HealthRecordArchive)
+
+# Derived or bookkeeping tables, rewritten by hooks and jobs rather than people.
+SKIP = {AuditLog, ChangeLog, DataVersion, MealCount, StudentSummary, FeverAlert, JobRun,
+        MealLogArchive, HealthRecordArchive}
+REDACTED = {"password_hash"}
+IGNORED = {"updated_at"}
+
+def _value(value):
+    if isinstance(value, (dt.date, dt.datetime, dt.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+def _context():
+    if not has_request_context():
+        return {"actor_id": None, "actor": "cli", "endpoint": None, "ip": None}
+    user = current_user
+    authenticated = user is not None and user.is_authenticated
+    return {"actor_id": user.id if authenticated else None,
+            "actor": user.username if authenticated else None,
+            "endpoint": (request.endpoint or "")[:64] or None,
+            "ip": request.remote_addr}
+
+def _diff(state, kind):
+    diff = {}
+    for attr in state.mapper.column_attrs:
+        key = attr.key
+        if key in IGNORED:
+            continue
+        if kind == "create":
+            old, new = None, state.dict.get(key)
+        elif kind == "delete":
+            old, new = state.dict.get(key), None
+        else:
+            hist = state.attrs[key].history
+            if not hist.has_changes():
+                continue
+            old = hist.deleted[0] if hist.deleted else None
+            new = hist.added[0] if hist.added else None
+        if old is None and new is None:
+            continue
+        if key in REDACTED:
+            diff[key] = ["***" if old is not None else None, "***" if new is not None else None]
+        else:
+            diff[key] = [_value(old), _value(new)]
+    return diff
+
+def _collect(session):
+    events = []
+    for kind, objs in (("create", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objs:
+            if type(obj) in SKIP:
+                continue
+            if kind == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            state = inspect(obj)
+            diff = _diff(state, kind)
+            if kind == "update" and not diff:
+                continue
+            # New rows get their identity key after this hook; read the columns.
+            key = state.mapper.primary_key_from_instance(obj)
+            events.append({"action": kind, "entity": state.mapper.local_table.name,
+                           "entity_id": key[0] if len(key) == 1 else None, "diff": diff})
+    return events
+
+def _stamp(events):
+    context = _context()
+    now = dt.datetime.now()
+    return [dict(context, created_at=now, **e) for e in events]
+
+def note(action, entity, entity_id=None, diff=None):
+    """Add an event to the current transaction; written only if it commits."""
+    db.session.info.setdefault("audit", []).extend(
+        _stamp([{"action": action, "entity": entity, "entity_id": entity_id, "diff": diff}]))
+
+def record(action, entity=None, entity_id=None, diff=None):
+    """Queue an event now, outside any transaction (e.g. a failed request)."""
+    _writer().submit(_stamp([{"action": action, "entity": entity, "entity_id": entity_id, "diff": diff}]))
+
+def _collect_on_flush(session, flush_context):
+    events = _collect(session)
+    if events:
+        session.info.setdefault("audit", []).extend(_stamp(events))
+
+def _submit_on_commit(session):
+    events = session.info.pop("audit", None)
+    if events:
+        _writer().submit(events)
+
+def _discard_on_rollback(session):
+    session.info.pop("audit", None)
+
+# --- writer -----------------------------------------------------------------
+
+_STOP = object()
+
+class Writer:
+    """One daemon thread per process draining a bounded queue into batched INSERTs."""
+
+    def __init__(self, app, maxsize, batch_size, flush_seconds):
+        self.app = app
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        # A thread does not survive gunicorn's fork; start one per process.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.maxsize)
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, events):
+        self._ensure_started()
+        for e in events:
+            try:
+                self._queue.put_nowait(e)
+            except queue.Full:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    self.app.logger.warning("audit queue full, %d events dropped so far", self.dropped)
+
+    def _run(self):
+        with self.app.app_context():
+            engine = db.engine
+        q = self._queue
+        stopping = False
+        while not stopping:
+            item = q.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    item = q.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            write(engine, batch, self.app.logger)
+
+    def close(self, timeout=5):
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+def write(engine, batch, logger, attempts=3):
+    for attempt in range(attempts):
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(AuditLog.__table__), batch)
+            return True
+        except Exception:
+            logger.exception("audit: writing %d events failed (attempt %d)", len(batch), attempt + 1)
+            time.sleep(0.5 * 2 ** attempt)
+    logger.error("audit: dropped batch %s", json.dumps(batch, default=str, ensure_ascii=False))
+    return False
+
+class _SyncWriter:
+    """In-memory SQLite has one connection per process; write in the caller's thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.dropped = 0
+
+    def submit(self, events):
+        write(db.engine, events, self.app.logger, attempts=1)
+
+    def close(self, timeout=None):
+        pass
+
+def _writer():
+    return current_app.extensions["audit"]
+
+def init_app(app):
+    app.config.setdefault("AUDIT_QUEUE_SIZE", 10000)
+    app.config.setdefault("AUDIT_BATCH_SIZE", 200)
+    app.config.setdefault("AUDIT_FLUSH_SECONDS", 1.0)
+
+    if make_url(app.config["SQLALCHEMY_DATABASE_URI"]).database in (None, "", ":memory:"):
+        writer = _SyncWriter(app)
+    else:
+        writer = Writer(app, app.config["AUDIT_QUEUE_SIZE"], app.config["AUDIT_BATCH_SIZE"],
+                        app.config["AUDIT_FLUSH_SECONDS"])
+        atexit.register(writer.close)
+    app.extensions["audit"] = writer
+
+    for name, fn in (("after_flush", _collect_on_flush), ("after_commit", _submit_on_commit),
+                     ("after_rollback", _discard_on_rollback)):
+        if not event.contains(db.session, name, fn):
+            event.listen(db.session, name, fn)
@@ -1,33 +1,43 @@
 import datetime as dt
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, make_response
 from flask_login import login_user, logout_user, login_required, current_user
 
 from . import bp
 from ..extensions import db
 from ..models import User
+from ..ratelimit import login_retry_after, login_succeeded
+from ..utils import HOME_ENDPOINTS
 
 @bp.route("/login", methods=["GET", "POST"])
 def login():
     if current_user.is_authenticated:
-        if current_user.role == "ADMIN":
-            return redirect(url_for("admin.dashboard"))
-        return redirect(url_for("teacher.dashboard"))
+        return redirect(url_for(HOME_ENDPOINTS[current_user.role]))
 
     if request.method == "POST":
         username = request.form.get("username", "").strip()
         password = request.form.get("password", "")
 
+        retry_after = login_retry_after(username)
+        if retry_after:
+            flash(f"Đăng nhập sai quá nhiều lần. Vui lòng thử lại sau {retry_after} giây.", "danger")
+            response = make_response(render_template("auth/login.html", username=username), 429)
+            response.headers["Retry-After"] = str(retry_after)
+            return response
+
         user = User.query.filter_by(username=username).first()
         if not user or not user.check_password(password):
             flash("Sai tài khoản hoặc mật khẩu.", "danger")
             return render_template("auth/login.html", username=username)
 
+        login_succeeded(username)
+        if user.rehash_password(password):
+            db.session.commit()
         login_user(user)
         flash("Đăng nhập thành công.", "success")
         next_url = request.args.get("next")
         if next_url:
             return redirect(next_url)
-        return redirect(url_for("admin.dashboard" if user.role == "ADMIN" else "teacher.dashboard"))
+        return redirect(url_for(HOME_ENDPOINTS[user.role]))
 
     return render_template("auth/login.html")
 
@@ -0,0 +1,90 @@
+from sqlalchemy import event, inspect, update, select, func
+
+from .extensions import db
+from .models import Class, Student, Settings
+
+DEFAULT_MAX_STUDENTS = 25
+
+class CapacityError(Exception):
+    def __init__(self, class_id, max_students):
+        super().__init__(f"class {class_id} is full ({max_students})")
+        self.class_id = class_id
+        self.max_students = max_students
+
+def max_students():
+    settings = Settings.get_current()
+    return settings.max_students_per_class if settings else DEFAULT_MAX_STUDENTS
+
+def reserve(conn, class_id, n=1, limit=None):
+    """Take ``n`` seats in a class, or raise CapacityError.
+
+    A single conditional UPDATE: the row lock it takes serialises concurrent
+    enrollments, so two requests can never both take the last seat.
+    """
+    limit = max_students() if limit is None else limit
+    table = Class.__table__
+    result = conn.execute(
+        update(table)
+        .where(table.c.id == class_id, table.c.student_count + n <= limit)
+        .values(student_count=table.c.student_count + n)
+    )
+    if result.rowcount != 1:
+        raise CapacityError(class_id, limit)
+
+def release(conn, class_id, n=1):
+    table = Class.__table__
+    conn.execute(
+        update(table)
+        .where(table.c.id == class_id, table.c.student_count >= n)
+        .values(student_count=table.c.student_count - n)
+    )
+
+def recount(class_ids=None):
+    """Rebuild ``classes.student_count`` from the students table."""
+    table = Class.__table__
+    count = (
+        select(func.count(Student.id))
+        .where(Student.class_id == table.c.id)
+        .scalar_subquery()
+    )
+    stmt = update(table).values(student_count=count)
+    if class_ids is not None:
+        stmt = stmt.where(table.c.id.in_(list(class_ids)))
+    db.session.execute(stmt)
+
+def _seat_changes(session):
+    """{class_id: delta} for every student added, removed or moved in this flush."""
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Student):
+            deltas[obj.class_id] = deltas.get(obj.class_id, 0) + 1
+    for obj in session.deleted:
+        if isinstance(obj, Student):
+            deltas[obj.class_id] = deltas.get(obj.class_id, 0) - 1
+    for obj in session.dirty:
+        if isinstance(obj, Student):
+            hist = inspect(obj).attrs.class_id.history
+            for old in hist.deleted or ():
+                if old is not None and old != obj.class_id:
+                    deltas[old] = deltas.get(old, 0) - 1
+                    deltas[obj.class_id] = deltas.get(obj.class_id, 0) + 1
+    return {cid: d for cid, d in deltas.items() if d}
+
+def _check_on_flush(session, flush_context, instances):
+    # before_flush so a full class aborts the flush before any INSERT.
+    deltas = _seat_changes(session)
+    if not deltas:
+        return
+    conn = session.connection()
+    limit = max_students() if any(d > 0 for d in deltas.values()) else None
+    # Releases first, and classes in id order, so concurrent moves lock rows
+    # in the same order.
+    for cid, d in sorted(deltas.items(), key=lambda kv: (kv[1] > 0, kv[0])):
+        if d > 0:
+            reserve(conn, cid, d, limit)
+        else:
+            release(conn, cid, -d)
+
+def init_app(app):
+    if not event.contains(db.session, "before_flush", _check_on_flush):
+        event.listen(db.session, "before_flush", _check_on_flush)
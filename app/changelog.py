@@ -0,0 +1,105 @@
+import datetime as dt
+
+from sqlalchemy import event, inspect, insert, select, literal, func
+
+from .extensions import db
+from .models import Student, HealthRecord, MealLog, Invoice, ChangeLog
+
+ENTITY_NAMES = {Student: "student", MealLog: "meal", HealthRecord: "health", Invoice: "invoice"}
+# Auto-increment ids are taken at flush but become visible at commit, so a
+# lower id can appear after a higher one. Readers that keep a cursor only
+# move it past entries older than this and re-read the newer tail.
+SETTLE = dt.timedelta(seconds=60)
+
+def settled_id():
+    """Highest change_log id at or below which every entry is settled (or purged)."""
+    row = (db.session.query(ChangeLog.id)
+           .filter(ChangeLog.changed_at <= dt.datetime.now() - SETTLE)
+           .order_by(ChangeLog.id.desc())
+           .first())
+    if row:
+        return int(row[0])
+    oldest = db.session.query(func.min(ChangeLog.id)).scalar()
+    return int(oldest) - 1 if oldest else 0
+
+def _collect(session):
+    """(entity, entity_id, class_id, op) for every tracked row in this flush."""
+    entries = []
+    pending = []  # child rows whose class is looked up in one query below
+    for kind, objs in (("new", session.new), ("dirty", session.dirty), ("deleted", session.deleted)):
+        for obj in objs:
+            name = ENTITY_NAMES.get(type(obj))
+            if name is None or obj.id is None:
+                continue
+            if kind == "dirty" and not session.is_modified(obj, include_collections=False):
+                continue
+            op = "D" if kind == "deleted" else "U"
+            if isinstance(obj, Student):
+                entries.append((name, obj.id, obj.class_id, op))
+                # A class move is a delete for the old class's clients.
+                for old in inspect(obj).attrs.class_id.history.deleted or ():
+                    if old is not None and old != obj.class_id:
+                        entries.append((name, obj.id, old, "D"))
+            else:
+                pending.append((name, obj.id, obj.student_id, op))
+
+    if pending:
+        student_ids = {sid for _, _, sid, _ in pending}
+        classes = dict(session.connection().execute(
+            select(Student.id, Student.class_id).where(Student.id.in_(student_ids))
+        ).all())
+        for name, eid, sid, op in pending:
+            if sid in classes:
+                entries.append((name, eid, classes[sid], op))
+    return entries
+
+def _log_on_flush(session, flush_context):
+    entries = _collect(session)
+    if entries:
+        now = dt.datetime.now()
+        session.connection().execute(insert(ChangeLog.__table__), [
+            {"entity": e, "entity_id": eid, "class_id": cid, "op": op, "changed_at": now}
+            for e, eid, cid, op in entries
+        ])
+
+def log_bulk_invoices(month, class_id=None, student_ids=None):
+    """Record invoices written with bulk_*_mappings, which skip flush events."""
+    q = (
+        select(literal("invoice"), Invoice.id, Student.class_id, literal("U"), literal(dt.datetime.now()))
+        .join(Student, Student.id == Invoice.student_id)
+        .where(Invoice.billing_month == month, Invoice.status == "UNPAID")
+    )
+    if class_id is not None:
+        q = q.where(Student.class_id == class_id)
+    if student_ids is not None:
+        q = q.where(Invoice.student_id.in_(list(student_ids)))
+    table = ChangeLog.__table__
+    db.session.execute(insert(table).from_select(
+        [table.c.entity, table.c.entity_id, table.c.class_id, table.c.op, table.c.changed_at], q
+    ))
+
+def log_bulk_students(class_ids, after_id):
+    """Record students inserted with bulk_insert_mappings (ids above ``after_id``)."""
+    q = (
+        select(literal("student"), Student.id, Student.class_id, literal("U"), literal(dt.datetime.now()))
+        .where(Student.id > after_id, Student.class_id.in_(list(class_ids)))
+    )
+    table = ChangeLog.__table__
+    db.session.execute(insert(table).from_select(
+        [table.c.entity, table.c.entity_id, table.c.class_id, table.c.op, table.c.changed_at], q
+    ))
+
+def log_bulk_deletes(student_id, class_id):
+    """Tombstone a student's meals, health records and invoices before a bulk delete."""
+    table = ChangeLog.__table__
+    now = dt.datetime.now()
+    for model in (MealLog, HealthRecord, Invoice):
+        q = select(literal(ENTITY_NAMES[model]), model.id, literal(class_id), literal("D"), literal(now)).where(
+            model.student_id == student_id)
+        db.session.execute(insert(table).from_select(
+            [table.c.entity, table.c.entity_id, table.c.class_id, table.c.op, table.c.changed_at], q
+        ))
+
+def init_app(app):
+    if not event.contains(db.session, "after_flush", _log_on_flush):
+        event.listen(db.session, "after_flush", _log_on_flush)
@@ -0,0 +1,342 @@
+"""Administrative ``flask`` commands for work too big for a web request.
+
+    flask --app wsgi seed --classes 40 --per-class 25 --months 6
+    flask --app wsgi invoices generate --month 2026-09
+    flask --app wsgi invoices pdf --month 2026-09 --output hoa_don_2026-09.zip
+    flask --app wsgi rollups rebuild
+    flask --app wsgi users reset-passwords --role TEACHER --output teachers.csv
+    flask --app wsgi users create-parents --output parents.csv
+    flask --app wsgi export invoices --month 2026-09 --output invoices.csv
+
+Every command commits in chunks (per class, or every ``--chunk`` rows), so
+a long run holds no lock for long, and an interrupted run keeps the work it
+finished.
+"""
+import csv
+import random
+import secrets
+import datetime as dt
+
+import click
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+
+from .extensions import db
+from .models import (User, Class, Student, Settings, MealLog, MealDay, HealthRecord, Invoice, ParentStudent,
+                     password_hash_method)
+from .billing import generate_invoices, month_range
+from .capacity import recount
+from . import kitchen, summaries, meals
+from .changelog import log_bulk_students
+from .versioning import bump, bump_all_classes, SETTINGS_SCOPE
+from .jobs import previous_month
+from .partitions import add_months
+
+def _month_option(value):
+    try:
+        month_range(value)
+    except (AttributeError, ValueError):
+        raise click.BadParameter("expected YYYY-MM")
+    return value
+
+# --- seed -------------------------------------------------------------------
+
+HO = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ", "Hồ", "Ngô"]
+DEM = ["Văn", "Thị", "Minh", "Ngọc", "Gia", "Bảo", "Thanh", "Hoài", "Đức", "Quỳnh", "Khánh", "Anh"]
+TEN = ["An", "Bình", "Châu", "Dũng", "Giang", "Hà", "Hải", "Hùng", "Khoa", "Linh", "Long", "Mai", "Nam",
+       "Nhi", "Phúc", "Quân", "Sơn", "Tâm", "Thảo", "Trang", "Tú", "Uyên", "Việt", "Vy", "Yến", "Ánh"]
+
+def _name(rnd):
+    return f"{rnd.choice(HO)} {rnd.choice(DEM)} {rnd.choice(TEN)}"
+
+@click.command("seed")
+@click.option("--classes", default=10, show_default=True)
+@click.option("--per-class", default=20, show_default=True)
+@click.option("--months", default=1, show_default=True, help="Months of meal and health history, ending today.")
+@click.option("--password", default="admin", show_default=True, help="Password of the seeded teachers.")
+@click.option("--seed", "seed_value", default=1, show_default=True, help="Random seed.")
+@with_appcontext
+def seed_command(classes, per_class, months, password, seed_value):
+    """Add a synthetic school: teachers, classes, students, meals and health records."""
+    rnd = random.Random(seed_value)
+    if not Settings.get_current():
+        db.session.add(Settings(id=1, tuition_fee_monthly=1500000, meal_price_per_day=25000,
+                                max_students_per_class=max(25, per_class)))
+        db.session.commit()
+    limit = Settings.get_current().max_students_per_class
+    if per_class > limit:
+        raise click.ClickException(f"--per-class exceeds max_students_per_class ({limit})")
+
+    today = dt.date.today()
+    first = add_months(today.replace(day=1), 1 - months)
+    days = [first + dt.timedelta(days=i) for i in range((today - first).days + 1)]
+    days = [d for d in days if d.weekday() < 5]
+
+    prefix = f"seed{db.session.query(func.count(User.id)).scalar()}_"
+    password_hash = generate_password_hash(password, method=password_hash_method())
+
+    with click.progressbar(range(classes), label="Seeding classes") as bar:
+        for i in bar:
+            teacher = User(username=f"{prefix}gv{i + 1}", role="TEACHER", full_name=f"Giáo viên {_name(rnd)}",
+                           password_hash=password_hash)
+            db.session.add(teacher)
+            db.session.flush()
+            classroom = Class(name=f"Lớp {prefix}{i + 1}", teacher_id=teacher.id)
+            db.session.add(classroom)
+            db.session.flush()
+
+            after_id = db.session.query(func.max(Student.id)).scalar() or 0
+            db.session.bulk_insert_mappings(Student, [
+                dict(class_id=classroom.id, full_name=_name(rnd), gender=rnd.choice("MF"),
+                     dob=dt.date(today.year - rnd.randint(3, 5), rnd.randint(1, 12), rnd.randint(1, 28)),
+                     parent_name=_name(rnd), parent_phone=f"09{rnd.randrange(10 ** 8):08d}")
+                for _ in range(per_class)
+            ])
+            ids = [sid for (sid,) in db.session.query(Student.id).filter(
+                Student.class_id == classroom.id, Student.id > after_id)]
+            logs = [dict(student_id=sid, log_date=d, ate=rnd.random() > 0.08) for d in days for sid in ids]
+            if meals.sparse():
+                db.session.bulk_insert_mappings(MealDay, [dict(class_id=classroom.id, log_date=d) for d in days])
+                logs = [row for row in logs if not row["ate"]]
+            db.session.bulk_insert_mappings(MealLog, logs)
+            db.session.bulk_insert_mappings(HealthRecord, [
+                dict(student_id=sid, record_date=d, weight_kg=round(rnd.uniform(12, 22), 1),
+                     temperature_c=round(rnd.gauss(36.8, 0.4), 1))
+                for d in days if d.weekday() == 0 for sid in ids
+            ])
+            # Bulk inserts skip the flush hooks.
+            recount([classroom.id])
+            kitchen.recount(class_ids=[classroom.id])
+            summaries.refresh_classes([classroom.id])
+            log_bulk_students([classroom.id], after_id)
+            bump_all_classes()
+            db.session.commit()
+    click.echo(f"Seeded {classes} classes x {per_class} students, {len(days)} school days "
+               f"(teachers {prefix}gv1..{classes}, password '{password}').")
+
+# --- invoices ---------------------------------------------------------------
+
+invoices_cli = AppGroup("invoices", help="Batch invoice operations.")
+
+@invoices_cli.command("generate")
+@click.option("--month", callback=lambda ctx, p, v: _month_option(v) if v else previous_month(dt.date.today()),
+              help="Billing month YYYY-MM (default: last month).")
+@click.option("--class-id", "class_ids", type=int, multiple=True, help="Only these classes (repeatable).")
+def invoices_generate_command(month, class_ids):
+    """Create or refresh every UNPAID invoice of a month, one class per transaction."""
+    class_ids = list(class_ids) or [cid for (cid,) in db.session.query(Class.id).order_by(Class.id)]
+    created = updated = 0
+    with click.progressbar(class_ids, label=f"Invoices {month}") as bar:
+        for cid in bar:
+            c, u = generate_invoices(month, class_id=cid)
+            db.session.commit()
+            created += c
+            updated += u
+    click.echo(f"{month}: {created} created, {updated} updated across {len(class_ids)} classes.")
+
+@invoices_cli.command("pdf")
+@click.option("--month", callback=lambda ctx, p, v: _month_option(v) if v else previous_month(dt.date.today()),
+              help="Billing month YYYY-MM (default: last month).")
+@click.option("--class-id", type=int, help="Only this class.")
+@click.option("--output", type=click.File("wb"), required=True, help="ZIP file to write.")
+@click.option("--workers", type=int, help="Render processes (default: INVOICE_PDF_WORKERS).")
+def invoices_pdf_command(month, class_id, output, workers):
+    """Write one receipt PDF per invoice of a month into a ZIP."""
+    from .invoice_pdfs import count_invoices, export_zip
+    total = count_invoices(month, class_id)
+    with click.progressbar(length=total, label=f"Receipts {month}", file=click.get_text_stream("stderr")) as bar:
+        for chunk in export_zip(month, class_id=class_id, workers=workers):
+            output.write(chunk)
+            bar.update(1)
+    click.echo(f"{total} receipts written.", err=True)
+
+# --- rollups ----------------------------------------------------------------
+
+def rebuild_student_counts():
+    recount()
+    return "classes.student_count recounted"
+
+def rebuild_meal_counts():
+    kitchen.recount()
+    return "meal_counts rebuilt from meal_logs"
+
+def rebuild_student_summaries():
+    summaries.refresh()
+    return "student_summaries rebuilt"
+
+def rebuild_versions():
+    # Forces every cached page, fragment and ETag to be recomputed.
+    bump_all_classes()
+    bump(SETTINGS_SCOPE)
+    return "data versions bumped"
+
+ROLLUPS = {
+    "student_counts": rebuild_student_counts,
+    "meal_counts": rebuild_meal_counts,
+    "student_summaries": rebuild_student_summaries,
+    "versions": rebuild_versions,
+}
+
+rollups_cli = AppGroup("rollups", help="Derived tables and counters.")
+
+@rollups_cli.command("rebuild")
+@click.argument("names", nargs=-1)
+def rollups_rebuild_command(names):
+    """Rebuild the named rollups (default: all), each in its own transaction."""
+    unknown = [n for n in names if n not in ROLLUPS]
+    if unknown:
+        raise click.BadParameter(", ".join(unknown) + f" (choose from {', '.join(ROLLUPS)})")
+    for name in names or ROLLUPS:
+        click.echo(f"{name}: {ROLLUPS[name]()}")
+        db.session.commit()
+
+# --- users ------------------------------------------------------------------
+
+users_cli = AppGroup("users", help="Account administration.")
+PASSWORD_ALPHABET = "abcdefghjkmnpqrstuvwxyz23456789"
+
+@users_cli.command("reset-passwords")
+@click.option("--role", type=click.Choice(["TEACHER", "ADMIN", "PARENT"]), default="TEACHER", show_default=True)
+@click.option("--username", "usernames", multiple=True, help="Only these accounts (repeatable).")
+@click.option("--length", default=10, show_default=True)
+@click.option("--chunk", default=50, show_default=True, help="Accounts per transaction.")
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-",
+              help="CSV of username,password (default: stdout).")
+@click.confirmation_option(prompt="Reset these passwords?")
+def reset_passwords_command(role, usernames, length, chunk, output):
+    """Give accounts new random passwords and write them out as CSV.
+
+    Hashing is deliberately slow, so accounts are committed ``--chunk`` at a
+    time with progress on stderr.
+    """
+    q = User.query.filter(User.role == role)
+    if usernames:
+        q = q.filter(User.username.in_(usernames))
+    ids = [uid for (uid,) in q.with_entities(User.id).order_by(User.id)]
+    writer = csv.writer(output)
+    writer.writerow(["username", "password"])
+    with click.progressbar(length=len(ids), label="Resetting", file=click.get_text_stream("stderr")) as bar:
+        for start in range(0, len(ids), chunk):
+            rows = []
+            for user in User.query.filter(User.id.in_(ids[start:start + chunk])).order_by(User.id):
+                password = "".join(secrets.choice(PASSWORD_ALPHABET) for _ in range(length))
+                user.set_password(password)
+                rows.append((user.username, password))
+            db.session.commit()
+            writer.writerows(rows)
+            bar.update(len(rows))
+    click.echo(f"{len(ids)} passwords reset.", err=True)
+
+@users_cli.command("create-parents")
+@click.option("--class-id", type=int, help="Only parents of this class.")
+@click.option("--length", default=10, show_default=True)
+@click.option("--chunk", default=50, show_default=True, help="Parents per transaction.")
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-",
+              help="CSV of username,password,full_name for new accounts (default: stdout).")
+def create_parents_command(class_id, length, chunk, output):
+    """Give every parent phone number a PARENT account linked to its children.
+
+    The username is the phone number. Existing accounts keep their password
+    and only gain links to children added since; new accounts are written
+    to the CSV with a random password once their chunk is committed, so
+    every listed account exists. Rerunning after an interruption skips the
+    parents already done.
+    """
+    q = db.session.query(Student.id, Student.parent_phone, Student.parent_name).order_by(Student.id)
+    if class_id is not None:
+        q = q.filter(Student.class_id == class_id)
+    by_phone = {}
+    for sid, phone, name in q:
+        phone = "".join(ch for ch in phone if ch.isdigit())
+        if phone:
+            by_phone.setdefault(phone, (name, []))[1].append(sid)
+
+    users = {u.username: u for u in User.query.filter(User.username.in_(list(by_phone)))}
+    clash = sorted(phone for phone, u in users.items() if u.role != "PARENT")
+    if clash:
+        raise click.ClickException(f"staff accounts already use these usernames: {', '.join(clash)}")
+    linked = {(uid, sid) for uid, sid in db.session.query(ParentStudent.user_id, ParentStudent.student_id)
+              .filter(ParentStudent.user_id.in_([u.id for u in users.values()]))}
+
+    writer = csv.writer(output)
+    writer.writerow(["username", "password", "full_name"])
+    phones = list(by_phone)
+    created = links = 0
+    with click.progressbar(length=len(phones), label="Creating", file=click.get_text_stream("stderr")) as bar:
+        for start in range(0, len(phones), chunk):
+            rows = []
+            for phone in phones[start:start + chunk]:
+                name, student_ids = by_phone[phone]
+                user = users.get(phone)
+                if user is None:
+                    password = "".join(secrets.choice(PASSWORD_ALPHABET) for _ in range(length))
+                    user = User(username=phone, role="PARENT", full_name=name, phone=phone)
+                    user.set_password(password)
+                    db.session.add(user)
+                    db.session.flush()
+                    rows.append((phone, password, name))
+                for sid in student_ids:
+                    if (user.id, sid) not in linked:
+                        db.session.add(ParentStudent(user_id=user.id, student_id=sid))
+                        links += 1
+            db.session.commit()
+            writer.writerows(rows)
+            created += len(rows)
+            bar.update(len(phones[start:start + chunk]))
+    click.echo(f"{created} parent accounts created, {links} children linked.", err=True)
+
+# --- export -----------------------------------------------------------------
+
+EXPORTS = {
+    "students": (Student, (Student.id, Student.class_id, Student.full_name, Student.dob, Student.gender,
+                           Student.parent_name, Student.parent_phone, Student.enrolled_on), None),
+    "meals": (MealLog, (MealLog.id, MealLog.student_id, MealLog.log_date, MealLog.ate), MealLog.log_date),
+    "health": (HealthRecord, (HealthRecord.id, HealthRecord.student_id, HealthRecord.record_date,
+                              HealthRecord.weight_kg, HealthRecord.temperature_c, HealthRecord.note),
+               HealthRecord.record_date),
+    "invoices": (Invoice, (Invoice.id, Invoice.student_id, Invoice.billing_month, Invoice.tuition_fee,
+                           Invoice.meal_unit_price, Invoice.meal_days, Invoice.discount_amount,
+                           Invoice.total_amount, Invoice.status, Invoice.paid_at), Invoice.billing_month),
+}
+
+@click.command("export")
+@click.argument("entity", type=click.Choice(sorted(EXPORTS)))
+@click.option("--month", callback=lambda ctx, p, v: _month_option(v) if v else None,
+              help="Only this month (YYYY-MM).")
+@click.option("--class-id", type=int, help="Only this class.")
+@click.option("--output", type=click.File("w", encoding="utf-8-sig"), default="-",
+              help="CSV file (default: stdout).")
+@click.option("--chunk", default=2000, show_default=True, help="Rows fetched per round trip.")
+@with_appcontext
+def export_command(entity, month, class_id, output, chunk):
+    """Stream a table to CSV without loading it into memory."""
+    model, columns, date_col = EXPORTS[entity]
+    stmt = select(*columns)
+    if class_id is not None:
+        if model is Student:
+            stmt = stmt.where(Student.class_id == class_id)
+        else:
+            stmt = stmt.join(Student, Student.id == model.student_id).where(Student.class_id == class_id)
+    if month and date_col is not None:
+        if date_col is Invoice.billing_month:
+            stmt = stmt.where(Invoice.billing_month == month)
+        else:
+            start, end = month_range(month)
+            stmt = stmt.where(date_col >= start, date_col <= end)
+    stmt = stmt.order_by(columns[0]).execution_options(yield_per=chunk)
+
+    writer = csv.writer(output)
+    writer.writerow([c.key for c in columns])
+    count = 0
+    for partition in db.session.execute(stmt).partitions():
+        writer.writerows(partition)
+        count += len(partition)
+    click.echo(f"{count} {entity} rows exported.", err=True)
+
+def init_app(app):
+    app.cli.add_command(seed_command)
+    app.cli.add_command(invoices_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(export_command)
@@ -0,0 +1,97 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "font/ttf",
+    "application/x-font-ttf",
+    "application/vnd.ms-fontobject",
+)
+
+# Compressed static bodies keyed by (etag, encoding). Static files never
+# change under the same etag, so compressing them once per worker is enough.
+_static_cache = {}
+_STATIC_CACHE_MAX = 64
+
+def _choose_encoding(app):
+    accepted = request.accept_encodings
+    if brotli is not None and app.config["COMPRESS_BROTLI"] and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+def _compress(data, encoding, app):
+    if encoding == "br":
+        return brotli.compress(data, quality=app.config["COMPRESS_BROTLI_LEVEL"])
+    return gzip.compress(data, compresslevel=app.config["COMPRESS_LEVEL"], mtime=0)
+
+def init_app(app):
+    app.config.setdefault("COMPRESS_ENABLED", True)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_BROTLI", True)
+    app.config.setdefault("COMPRESS_BROTLI_LEVEL", 5)
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config["COMPRESS_ENABLED"]:
+            return response
+        if response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+        if response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        if "no-transform" in response.headers.get("Cache-Control", ""):
+            return response
+        if response.is_streamed and not response.direct_passthrough:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = _choose_encoding(app)
+        if encoding is None:
+            return response
+
+        length = response.content_length
+        if length is not None and length < app.config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        etag, weak = response.get_etag()
+        cache_key = (etag, encoding) if response.direct_passthrough and etag else None
+        body = _static_cache.get(cache_key) if cache_key else None
+
+        if body is None:
+            response.direct_passthrough = False
+            data = response.get_data()
+            if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+                return response
+            body = _compress(data, encoding, app)
+            if cache_key:
+                if len(_static_cache) >= _STATIC_CACHE_MAX:
+                    _static_cache.clear()
+                _static_cache[cache_key] = body
+        else:
+            close = getattr(response.response, "close", None)
+            if close is not None:
+                close()
+            response.direct_passthrough = False
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            # The compressed body is a different representation; a weak tag
+            # still matches the plain one for If-None-Match revalidation.
+            response.set_etag(etag, weak=True)
+        return response
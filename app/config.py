@@ -15,3 +15,42 @@ class Config:
 
     SESSION_COOKIE_HTTPONLY = True
     REMEMBER_COOKIE_HTTPONLY = True
+
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "500"))
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))
+
+    FRAGMENT_CACHE_BACKEND = os.environ.get("FRAGMENT_CACHE_BACKEND", "memory")  # memory | sqlite | none
+    FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", "512"))
+    ROSTER_CACHE_SIZE = int(os.environ.get("ROSTER_CACHE_SIZE", "256"))  # class rosters kept per worker
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get("JINJA_BYTECODE_CACHE_DIR")  # unset: instance/jinja_cache, "": off
+    JINJA_WARM_UP = os.environ.get("JINJA_WARM_UP", "0") == "1"  # compile every template in create_app; on under gunicorn
+
+    PROFILER_DIR = os.environ.get("PROFILER_DIR")  # unset: instance/profiles; switched on from /admin/profiler
+    PROFILER_RING_SIZE = int(os.environ.get("PROFILER_RING_SIZE", "200"))  # profile files kept
+    PROFILER_FLUSH_SECONDS = int(os.environ.get("PROFILER_FLUSH_SECONDS", "60"))
+
+    MEAL_STORAGE = os.environ.get("MEAL_STORAGE", "dense")  # dense | sparse (missed meals only), see app.meals
+    ARCHIVE_KEEP_YEARS = int(os.environ.get("ARCHIVE_KEEP_YEARS", "1"))  # closed school years kept hot
+    CHANGE_LOG_RETENTION_DAYS = int(os.environ.get("CHANGE_LOG_RETENTION_DAYS", "90"))
+    AUDIT_RETENTION_DAYS = int(os.environ.get("AUDIT_RETENTION_DAYS", "365"))
+    AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "10000"))  # events held per worker before dropping
+    AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_SECONDS = float(os.environ.get("AUDIT_FLUSH_SECONDS", "1.0"))
+
+    # Werkzeug hash method in full "name:params" form; stored hashes with other
+    # parameters are upgraded on the user's next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    RATELIMIT_BACKEND = os.environ.get("RATELIMIT_BACKEND", "memory")  # memory | sqlite | none
+    RATELIMIT_LOGIN_IP = os.environ.get("RATELIMIT_LOGIN_IP", "30/60")  # attempts / seconds
+    RATELIMIT_LOGIN_USER = os.environ.get("RATELIMIT_LOGIN_USER", "10/300")
+    PARALLEL_QUERY_WORKERS = int(os.environ.get("PARALLEL_QUERY_WORKERS", "4"))  # 1 = run report queries serially
+    INVOICE_PDF_WORKERS = int(os.environ.get("INVOICE_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    FEVER_THRESHOLD_C = float(os.environ.get("FEVER_THRESHOLD_C", "38.0"))
+    ALERT_NOTIFIER = os.environ.get("ALERT_NOTIFIER", "console")  # console | file | webhook | email
+    ALERT_FILE_PATH = os.environ.get("ALERT_FILE_PATH", "fever_alerts.jsonl")
+    ALERT_WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL", "")  # SMS gateway
+    ALERT_SMTP_HOST = os.environ.get("ALERT_SMTP_HOST", "localhost")
+    ALERT_SMTP_PORT = int(os.environ.get("ALERT_SMTP_PORT", "25"))
+    ALERT_EMAIL_FROM = os.environ.get("ALERT_EMAIL_FROM", "")
+    ALERT_EMAIL_TO = os.environ.get("ALERT_EMAIL_TO", "")  # comma-separated
@@ -0,0 +1,135 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app, g
+from markupsafe import Markup
+
+from .local_sqlite import LocalSQLite
+from .versioning import get_versions, class_scope, SETTINGS_SCOPE
+
+class LRUBackend:
+    """Per-worker in-memory cache of rendered fragments."""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class SQLiteBackend(LocalSQLite):
+    """Fragments in a local SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path, maxsize=5000):
+        super().__init__(
+            path, "CREATE TABLE IF NOT EXISTS fragments (key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)"
+        )
+        self.maxsize = maxsize
+        self._writes = 0
+
+    def get(self, key):
+        row = self._conn().execute("SELECT value FROM fragments WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        conn = self._conn()
+        try:
+            conn.execute("INSERT OR REPLACE INTO fragments (key, value, used) VALUES (?, ?, ?)", (key, value, time.time()))
+            self._writes += 1
+            if self._writes % 100 == 0:
+                conn.execute(
+                    "DELETE FROM fragments WHERE key NOT IN (SELECT key FROM fragments ORDER BY used DESC LIMIT ?)",
+                    (self.maxsize,),
+                )
+        except sqlite3.OperationalError:
+            # A busy cache file must never fail the page; the fragment is
+            # simply rendered again next time.
+            pass
+
+    def clear(self):
+        self._conn().execute("DELETE FROM fragments")
+
+def _request_versions(class_id):
+    cache = g.setdefault("fragment_versions", {})
+    if class_id not in cache:
+        scopes = [SETTINGS_SCOPE] if class_id is None else [class_scope(class_id), SETTINGS_SCOPE]
+        cache[class_id] = get_versions(scopes)
+    return cache[class_id]
+
+def _template_fingerprint():
+    """Hash of every template's source, so a deploy that edits one makes the
+    old fragments in the shared SQLite file unreachable. Once per worker."""
+    fingerprint = current_app.extensions.get("fragment_fingerprint")
+    if fingerprint is None:
+        env = current_app.jinja_env
+        digest = hashlib.sha1()
+        for name in sorted(env.list_templates()):
+            digest.update(name.encode("utf-8"))
+            digest.update(env.loader.get_source(env, name)[0].encode("utf-8"))
+        fingerprint = current_app.extensions.setdefault("fragment_fingerprint", digest.hexdigest()[:12])
+    return fingerprint
+
+def cache_fragment(name, class_id=None, *parts, versioned=True, caller=None):
+    """Render the body of a ``{% call %}`` block once per data version.
+
+    Usage in a template::
+
+        {% call cache_fragment("roster", classroom.id, log_date) %}
+          ...
+        {% endcall %}
+
+    The key is built from the fragment name, the class id, any extra parts,
+    a fingerprint of the templates and, unless ``versioned=False``, the class
+    and settings data versions, so any write to the class makes the old
+    entry unreachable.
+    """
+    backend = current_app.extensions.get("fragment_cache")
+    if backend is None:
+        return caller()
+
+    key_parts = [name, class_id, *parts, _template_fingerprint()]
+    if versioned:
+        key_parts.append(_request_versions(class_id))
+    key = hashlib.sha1(repr(key_parts).encode("utf-8")).hexdigest()
+
+    value = backend.get(key)
+    if value is None:
+        value = str(caller())
+        backend.set(key, value)
+    return Markup(value)
+
+def init_app(app):
+    app.config.setdefault("FRAGMENT_CACHE_BACKEND", "memory")
+    app.config.setdefault("FRAGMENT_CACHE_SIZE", 512)
+    app.config.setdefault("FRAGMENT_CACHE_PATH", os.path.join(app.instance_path, "fragments.sqlite3"))
+
+    kind = app.config["FRAGMENT_CACHE_BACKEND"]
+    if kind == "sqlite":
+        backend = SQLiteBackend(app.config["FRAGMENT_CACHE_PATH"], maxsize=app.config["FRAGMENT_CACHE_SIZE"] * 10)
+    elif kind == "memory":
+        backend = LRUBackend(app.config["FRAGMENT_CACHE_SIZE"])
+    else:
+        backend = None
+
+    app.extensions["fragment_cache"] = backend
+    app.jinja_env.globals["cache_fragment"] = cache_fragment
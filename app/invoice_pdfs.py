@@ -0,0 +1,125 @@
+"""Month-end batch of one receipt PDF per invoice, streamed as a ZIP.
+
+ReportLab is pure Python and holds the GIL, so documents are rendered on a
+process pool whose workers load the fonts once at start-up. Rows are read
+with ``yield_per`` and at most a few documents per worker are in flight, so
+memory stays flat however many invoices the month has; the ZIP is written
+to the response as each document comes back, in invoice order.
+"""
+import os
+import zipfile
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from .extensions import db
+from .models import Class, Invoice, Student, User
+
+# Below this many invoices, starting worker processes costs more than it saves.
+PARALLEL_MIN_INVOICES = 50
+IN_FLIGHT_PER_WORKER = 4
+
+def _filter(stmt, month, class_id, invoice_id=None):
+    stmt = stmt.where(Invoice.billing_month == month)
+    if class_id is not None:
+        stmt = stmt.where(Student.class_id == class_id)
+    if invoice_id is not None:
+        stmt = stmt.where(Invoice.id == invoice_id)
+    return stmt
+
+def count_invoices(month, class_id=None):
+    stmt = select(func.count(Invoice.id)).join(Student, Student.id == Invoice.student_id)
+    return db.session.scalar(_filter(stmt, month, class_id))
+
+def invoice_rows(month, class_id=None, invoice_id=None, chunk=500):
+    """Plain dicts, ordered by class then student name, for pdf.build_invoice."""
+    collector = aliased(User)
+    stmt = (
+        select(Invoice.id, Invoice.billing_month, Invoice.tuition_fee, Invoice.meal_unit_price,
+               Invoice.meal_days, Invoice.discount_amount, Invoice.total_amount, Invoice.status,
+               Invoice.paid_at, Student.full_name.label("student_name"), Student.parent_name,
+               Student.parent_phone, Class.name.label("class_name"),
+               collector.full_name.label("collector_name"))
+        .join(Student, Student.id == Invoice.student_id)
+        .join(Class, Class.id == Student.class_id)
+        .outerjoin(collector, collector.id == Invoice.collected_by)
+        .order_by(Class.name, Student.full_name, Invoice.id)
+        .execution_options(yield_per=chunk)
+    )
+    for row in db.session.execute(_filter(stmt, month, class_id, invoice_id)):
+        yield row._asdict()
+
+def filename(data):
+    name = "".join(ch if ch.isalnum() else "_" for ch in data["student_name"])
+    class_name = "".join(ch if ch.isalnum() else "_" for ch in data["class_name"])
+    return f"{class_name}/{data['billing_month']}_{data['id']}_{name}.pdf"
+
+def render(rows, workers=None, total=None):
+    """Yield ``(data, pdf_bytes)`` for each row, in order."""
+    from . import pdf
+
+    workers = workers or current_app.config["INVOICE_PDF_WORKERS"]
+    font_dir = os.path.join(current_app.root_path, "static", "fonts")
+    if workers <= 1 or (total is not None and total < PARALLEL_MIN_INVOICES):
+        pdf.register_fonts(font_dir)
+        for data in rows:
+            yield data, pdf.build_invoice(data)
+        return
+
+    # spawn, not fork: the web worker may hold DB connections and lock-holding threads.
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=pdf.init_worker, initargs=(font_dir,))
+    pending = deque()
+    try:
+        for data in rows:
+            pending.append((data, executor.submit(pdf.build_invoice, data)))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                data, future = pending.popleft()
+                yield data, future.result()
+        while pending:
+            data, future = pending.popleft()
+            yield data, future.result()
+    finally:
+        # Also reached when the client disconnects mid-download.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+class _Sink:
+    """Write-only file for ZipFile; the bytes are drained after every entry."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+def zip_stream(documents):
+    """ZIP archive bytes, chunk by chunk, from ``(name, bytes)`` pairs."""
+    sink = _Sink()
+    # PDF streams are already compressed; level 1 only squeezes the fonts a little.
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for name, content in documents:
+            zf.writestr(name, content)
+            yield sink.drain()
+    yield sink.drain()
+
+def export_zip(month, class_id=None, workers=None):
+    """Byte chunks of a ZIP with one receipt per invoice of ``month``."""
+    total = count_invoices(month, class_id)
+    documents = render(invoice_rows(month, class_id), workers=workers, total=total)
+    return zip_stream((filename(data), content) for data, content in documents)
+
+def init_app(app):
+    app.config.setdefault("INVOICE_PDF_WORKERS", min(4, os.cpu_count() or 1))
@@ -0,0 +1,199 @@
+"""Maintenance jobs, run from cron through the ``flask jobs`` command.
+
+    flask --app wsgi jobs due            # once a day; runs whatever is due
+    flask --app wsgi jobs run monthly_invoices --month 2026-09
+    flask --app wsgi jobs list
+
+Jobs run out of process rather than inside gunicorn so that one schedule
+fires once, not once per worker.
+"""
+import time
+import datetime as dt
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import insert, select, delete, func
+
+from .extensions import db
+from .models import MealLog, HealthRecord, MealLogArchive, HealthRecordArchive, ChangeLog, JobRun, AuditLog
+from .billing import generate_invoices
+from .versioning import bump_all_classes
+from . import partitions
+
+JOBS = {}
+
+def job(name, due):
+    """Register ``fn(today, **options)``; ``due(last_success, today)`` decides when it runs."""
+    def decorator(fn):
+        JOBS[name] = (fn, due)
+        return fn
+    return decorator
+
+def monthly(last, today):
+    return last is None or (last.year, last.month) != (today.year, today.month)
+
+def previous_month(day):
+    return (day.replace(day=1) - dt.timedelta(days=1)).strftime("%Y-%m")
+
+def school_year_start(day):
+    """School years run from 1 September."""
+    return dt.date(day.year if day.month >= 9 else day.year - 1, 9, 1)
+
+@job("monthly_invoices", due=monthly)
+def monthly_invoices(today, month=None):
+    """Bill the month that just closed; runs on the 1st (or the first day after)."""
+    month = month or previous_month(today)
+    created, updated = generate_invoices(month)
+    db.session.commit()
+    return f"{month}: {created} created, {updated} updated"
+
+def _move(model, archive, date_col, cutoff, chunk):
+    src, dst = model.__table__, archive.__table__
+    cols = [c.name for c in dst.columns]
+    moved = 0
+    while True:
+        ids = [i for (i,) in db.session.query(model.id).filter(date_col < cutoff).order_by(model.id).limit(chunk)]
+        if not ids:
+            return moved
+        db.session.execute(insert(dst).from_select(cols, select(*(src.c[c] for c in cols)).where(src.c.id.in_(ids))))
+        # The date bound lets a partitioned table prune the delete.
+        db.session.execute(delete(src).where(src.c.id.in_(ids), src.c[date_col.key] < cutoff))
+        db.session.commit()
+        moved += len(ids)
+
+@job("archive_logs", due=monthly)
+def archive_logs(today, keep_years=None, chunk=5000):
+    """Move meal/health rows of closed school years into the *_archive tables.
+
+    The current school year and ``ARCHIVE_KEEP_YEARS`` before it stay hot.
+    Rows move in id-ordered chunks, one transaction each, so the hot tables
+    are never locked for long and a failed run resumes where it stopped.
+    """
+    from flask import current_app
+    keep = current_app.config["ARCHIVE_KEEP_YEARS"] if keep_years is None else keep_years
+    start = school_year_start(today)
+    cutoff = start.replace(year=start.year - keep)
+    meals = _move(MealLog, MealLogArchive, MealLog.log_date, cutoff, chunk)
+    health = _move(HealthRecord, HealthRecordArchive, HealthRecord.record_date, cutoff, chunk)
+    if meals or health:
+        bump_all_classes()
+        db.session.commit()
+    return f"before {cutoff}: {meals} meal logs, {health} health records"
+
+@job("prune_change_log", due=monthly)
+def prune_change_log(today, days=None):
+    """Drop sync log entries older than ``CHANGE_LOG_RETENTION_DAYS``.
+
+    Clients whose cursor predates the oldest entry get a full snapshot.
+    """
+    from flask import current_app
+    days = current_app.config["CHANGE_LOG_RETENTION_DAYS"] if days is None else days
+    cutoff = dt.datetime.combine(today - dt.timedelta(days=days), dt.time())
+    last_id = db.session.query(func.max(ChangeLog.id)).filter(ChangeLog.changed_at < cutoff).scalar()
+    if last_id is None:
+        return "nothing to prune"
+    result = db.session.execute(delete(ChangeLog.__table__).where(ChangeLog.__table__.c.id <= last_id))
+    db.session.commit()
+    return f"{result.rowcount} entries before {cutoff:%Y-%m-%d}"
+
+@job("prune_audit_log", due=monthly)
+def prune_audit_log(today, days=None, chunk=5000):
+    """Drop audit events older than ``AUDIT_RETENTION_DAYS``."""
+    from flask import current_app
+    days = current_app.config["AUDIT_RETENTION_DAYS"] if days is None else days
+    cutoff = dt.datetime.combine(today - dt.timedelta(days=days), dt.time())
+    table = AuditLog.__table__
+    total = 0
+    while True:
+        ids = [i for (i,) in db.session.execute(
+            select(table.c.id).where(table.c.created_at < cutoff).order_by(table.c.id).limit(chunk))]
+        if not ids:
+            break
+        total += db.session.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+        db.session.commit()
+    return f"{total} events before {cutoff:%Y-%m-%d}"
+
+@job("partitions", due=monthly)
+def rolling_partitions(today):
+    """Keep monthly partitions created ahead of time (MySQL only)."""
+    if not partitions.supported():
+        return "skipped: not MySQL"
+    added = partitions.ensure_future(today)
+    return ", ".join(f"{t} +{n}" for t, n in added.items()) or "no partitioned tables"
+
+def run_job(name, today=None, **options):
+    """Run one job and record the outcome in job_runs. Re-raises failures."""
+    fn, _ = JOBS[name]
+    today = today or dt.date.today()
+    started = dt.datetime.now()
+    t0 = time.perf_counter()
+    # Stays set if a KeyboardInterrupt or SystemExit stops the job.
+    status, detail = "error", "interrupted"
+    try:
+        detail, status = fn(today, **options), "ok"
+    except Exception as e:
+        detail = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if status != "ok":
+            db.session.rollback()
+        record = db.session.get(JobRun, name) or JobRun(name=name)
+        record.last_run_at = started
+        record.last_status = status
+        record.last_detail = f"{detail} ({time.perf_counter() - t0:.1f}s)"[:255]
+        if status == "ok":
+            record.last_success_at = started
+        db.session.add(record)
+        db.session.commit()
+    return detail
+
+def due_jobs(today=None):
+    today = today or dt.date.today()
+    last = {r.name: r.last_success_at for r in JobRun.query.all()}
+    return [name for name, (_, due) in JOBS.items() if due(last.get(name), today)]
+
+cli = AppGroup("jobs", help="Scheduled maintenance jobs.")
+
+def _date_option(value):
+    return dt.date.fromisoformat(value) if value else None
+
+@cli.command("list")
+def list_command():
+    """Show every job with its last run."""
+    runs = {r.name: r for r in JobRun.query.all()}
+    for name in JOBS:
+        r = runs.get(name)
+        if r is None:
+            click.echo(f"{name:<20} never run")
+        else:
+            click.echo(f"{name:<20} {r.last_status:<6} {r.last_run_at:%Y-%m-%d %H:%M}  {r.last_detail}")
+
+@cli.command("run")
+@click.argument("name", type=click.Choice(sorted(JOBS)))
+@click.option("--date", "today", help="Run as if today were YYYY-MM-DD.")
+@click.option("--month", help="monthly_invoices: month to bill (YYYY-MM).")
+def run_command(name, today, month):
+    """Run one job now, whether or not it is due."""
+    options = {"month": month} if name == "monthly_invoices" and month else {}
+    click.echo(f"{name}: {run_job(name, _date_option(today), **options)}")
+
+@cli.command("due")
+@click.option("--date", "today", help="Run as if today were YYYY-MM-DD.")
+def due_command(today):
+    """Run every job that is due; meant for a daily cron entry."""
+    today = _date_option(today)
+    failed = False
+    for name in due_jobs(today):
+        try:
+            click.echo(f"{name}: {run_job(name, today)}")
+        except Exception as e:
+            failed = True
+            click.echo(f"{name}: FAILED {type(e).__name__}: {e}", err=True)
+    if failed:
+        raise SystemExit(1)
+
+def init_app(app):
+    app.config.setdefault("ARCHIVE_KEEP_YEARS", 1)
+    app.config.setdefault("CHANGE_LOG_RETENTION_DAYS", 90)
+    app.config.setdefault("AUDIT_RETENTION_DAYS", 365)
+    app.cli.add_command(cli)
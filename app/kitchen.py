@@ -0,0 +1,175 @@
+"""Today's headcount for the kitchen, from a counter table kept in step with meal_logs.
+
+``meal_counts`` holds (day, class) -> children eating / children logged.
+The flush hook below applies the delta of every MealLog the ORM writes, in
+the same transaction, so the kitchen page reads one row per class instead
+of aggregating meal_logs on every refresh. Students deleted or moved
+between classes are recounted for today. Bulk inserts skip the hook and
+must call ``recount`` (``flask rollups rebuild meal_counts`` rebuilds all).
+
+With ``MEAL_STORAGE=sparse`` (see app.meals) a new meal_days marker counts
+every enrolled child of the class as logged and eating, and each
+exception row takes one eater off.
+"""
+import datetime as dt
+
+from sqlalchemy import event, inspect, select, delete, insert, func, case
+
+from .extensions import db
+from .models import Class, Student, MealLog, MealDay, MealCount
+from .meals import sparse, enrolled_by
+
+def _upsert_add(conn, deltas):
+    table = MealCount.__table__
+    rows = [{"log_date": day, "class_id": cid, "eaters": e, "logged": n}
+            for (day, cid), (e, n) in sorted(deltas.items())]
+    if conn.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as upsert
+        stmt = upsert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(eaters=table.c.eaters + stmt.inserted.eaters,
+                                            logged=table.c.logged + stmt.inserted.logged)
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+        stmt = upsert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.log_date, table.c.class_id],
+            set_={"eaters": table.c.eaters + stmt.excluded.eaters,
+                  "logged": table.c.logged + stmt.excluded.logged},
+        )
+    conn.execute(stmt)
+
+def _old(state, attr):
+    hist = state.attrs[attr].history
+    return hist.deleted[0] if hist.deleted else getattr(state.obj(), attr)
+
+def _dense_weight(ate):
+    return int(bool(ate)), 1
+
+def _sparse_weight(ate):
+    # Logged children come from the day's marker; a row only marks a missed meal.
+    return -int(not ate), 0
+
+def _meal_changes(session):
+    """[(day, student_id, d_eaters, d_logged)] for the MealLogs in this flush."""
+    weight = _sparse_weight if sparse() else _dense_weight
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, MealLog):
+            changes.append((obj.log_date, obj.student_id) + weight(obj.ate))
+    for obj in session.deleted:
+        if isinstance(obj, MealLog):
+            state = inspect(obj)
+            e, n = weight(_old(state, "ate"))
+            changes.append((_old(state, "log_date"), _old(state, "student_id"), -e, -n))
+    for obj in session.dirty:
+        if isinstance(obj, MealLog) and session.is_modified(obj):
+            state = inspect(obj)
+            e, n = weight(_old(state, "ate"))
+            changes.append((_old(state, "log_date"), _old(state, "student_id"), -e, -n))
+            changes.append((obj.log_date, obj.student_id) + weight(obj.ate))
+    return changes
+
+def _new_days(session):
+    return [(obj.log_date, obj.class_id) for obj in session.new if isinstance(obj, MealDay)]
+
+def _moved_classes(session):
+    class_ids = set()
+    for obj in session.deleted:
+        if isinstance(obj, Student):
+            class_ids.add(obj.class_id)
+    for obj in session.dirty:
+        if isinstance(obj, Student):
+            hist = inspect(obj).attrs.class_id.history
+            if hist.deleted and hist.deleted[0] != obj.class_id:
+                class_ids.update((hist.deleted[0], obj.class_id))
+    class_ids.discard(None)
+    return class_ids
+
+def _count_on_flush(session, flush_context):
+    changes = _meal_changes(session)
+    days = _new_days(session) if sparse() else []
+    moved = _moved_classes(session)
+    if not changes and not days and not moved:
+        return
+    conn = session.connection()
+    if changes or days:
+        deltas = {}
+        for day, cid in days:
+            enrolled = conn.execute(select(func.count(Student.id)).where(
+                Student.class_id == cid, enrolled_by(day))).scalar()
+            deltas[(day, cid)] = (enrolled, enrolled)
+        student_ids = {sid for _, sid, _, _ in changes}
+        class_of = dict(conn.execute(select(Student.id, Student.class_id).where(Student.id.in_(student_ids))).all())
+        for day, sid, d_eaters, d_logged in changes:
+            cid = class_of.get(sid)
+            if cid is None:
+                continue
+            e, n = deltas.get((day, cid), (0, 0))
+            deltas[(day, cid)] = (e + d_eaters, n + d_logged)
+        deltas = {k: v for k, v in deltas.items() if v != (0, 0)}
+        if deltas:
+            _upsert_add(conn, deltas)
+    if moved:
+        recount(dt.date.today(), moved, conn=conn)
+
+def _sparse_source():
+    enrolled = (select(func.count(Student.id))
+                .where(Student.class_id == MealDay.class_id, enrolled_by(MealDay.log_date))
+                .scalar_subquery())
+    missed = (select(func.count(MealLog.id))
+              .join(Student, Student.id == MealLog.student_id)
+              .where(Student.class_id == MealDay.class_id, MealLog.log_date == MealDay.log_date,
+                     MealLog.ate == False, enrolled_by(MealDay.log_date))
+              .scalar_subquery())
+    return select(MealDay.log_date, MealDay.class_id, enrolled - missed, enrolled), MealDay.log_date, MealDay.class_id
+
+def recount(day=None, class_ids=None, conn=None):
+    """Rebuild meal_counts from meal_logs for one day (default: every day) and some classes."""
+    conn = conn or db.session.connection()
+    table = MealCount.__table__
+    stmt = delete(table)
+    if sparse():
+        source, day_col, class_col = _sparse_source()
+    else:
+        source = (
+            select(MealLog.log_date, Student.class_id,
+                   func.sum(case((MealLog.ate == True, 1), else_=0)), func.count(MealLog.id))
+            .join(Student, Student.id == MealLog.student_id)
+            .group_by(MealLog.log_date, Student.class_id)
+        )
+        day_col, class_col = MealLog.log_date, Student.class_id
+    if day is not None:
+        stmt = stmt.where(table.c.log_date == day)
+        source = source.where(day_col == day)
+    if class_ids is not None:
+        class_ids = list(class_ids)
+        stmt = stmt.where(table.c.class_id.in_(class_ids))
+        source = source.where(class_col.in_(class_ids))
+    conn.execute(stmt)
+    conn.execute(insert(table).from_select(["log_date", "class_id", "eaters", "logged"], source))
+
+def headcount(day):
+    """Per-class rows (id, name, student_count, eaters, logged) and the school totals."""
+    rows = (
+        db.session.query(Class.id, Class.name, Class.student_count,
+                         func.coalesce(MealCount.eaters, 0), func.coalesce(MealCount.logged, 0))
+        .outerjoin(MealCount, (MealCount.class_id == Class.id) & (MealCount.log_date == day))
+        .order_by(Class.name)
+        .all()
+    )
+    classes = [
+        {"id": cid, "name": name, "students": students, "eaters": eaters, "logged": logged,
+         "complete": logged >= students}
+        for cid, name, students, eaters, logged in rows
+    ]
+    totals = {
+        "students": sum(c["students"] for c in classes),
+        "eaters": sum(c["eaters"] for c in classes),
+        "logged": sum(c["logged"] for c in classes),
+        "classes_pending": sum(1 for c in classes if not c["complete"]),
+    }
+    return classes, totals
+
+def init_app(app):
+    if not event.contains(db.session, "after_flush", _count_on_flush):
+        event.listen(db.session, "after_flush", _count_on_flush)
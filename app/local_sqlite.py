@@ -0,0 +1,28 @@
+import os
+import sqlite3
+import threading
+
+class LocalSQLite:
+    """A small SQLite file on local disk shared by every worker on the host.
+
+    Used by the sqlite backends of app.ratelimit and app.fragment_cache.
+    Writes skip fsync (``synchronous=OFF``): the data is only a cache or a
+    limiter state, and losing the last writes in a crash is harmless.
+    """
+
+    def __init__(self, path, schema):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute(schema)
+
+    def _conn(self):
+        # SQLite connections must not cross a fork, so they are keyed by pid.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
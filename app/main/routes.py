@@ -1,6 +1,24 @@
-from flask import render_template
+from flask import render_template, request
+from flask_login import current_user
+
 from . import bp
+from ..models import Class
+from ..utils import role_required
+from ..search import search_students
 
 @bp.route("/")
 def home():
     return render_template("home.html")
+
+@bp.route("/search")
+@role_required("ADMIN", "TEACHER")
+def search():
+    q = request.args.get("q", "").strip()
+    class_id = None
+    if current_user.role == "TEACHER":
+        classroom = Class.query.filter_by(teacher_id=current_user.id).first()
+        if not classroom:
+            return render_template("teacher/no_class.html")
+        class_id = classroom.id
+    results = search_students(q, class_id=class_id, limit=50) if q else []
+    return render_template("search.html", q=q, results=results)
@@ -0,0 +1,260 @@
+"""How meal attendance is stored: every child every day, or only the exceptions.
+
+``MEAL_STORAGE = "dense"`` (the default) keeps one meal_logs row per child
+per school day. With ``"sparse"`` meal_logs keeps only the children who did
+not eat (``ate = false``), and a ``meal_days`` row marks each day a class's
+meals were recorded: a child ate on every recorded day of their class, from
+their ``enrolled_on``, that has no exception. Nearly every child eats, so
+sparse stores a small fraction of the rows, and billing counts a few
+hundred markers instead of a month of per-child rows.
+
+Read and write meals through this module so both modes behave the same.
+Switching an existing school is a one-off command; set ``MEAL_STORAGE`` to
+match right after it:
+
+    flask --app wsgi meals compact   # dense -> sparse
+    flask --app wsgi meals expand    # sparse -> dense
+
+In sparse mode a child is counted on their *current* class's recorded
+days, so a child moved mid-month is counted on the new class's days for the
+whole month. Days before a child's ``enrolled_on`` are not counted, as
+tuition already starts there; new and imported students get today when no
+date is given, and ``meals compact`` fills it in for older rows from their
+first meal. Any meal saved for a day records the whole class for it,
+including a single offline sync op.
+"""
+import datetime as dt
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, insert, delete, exists, func, literal, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import lazyload
+
+from .extensions import db
+from .models import Student, MealLog, MealDay
+
+MODES = ("dense", "sparse")
+
+def sparse():
+    return current_app.config["MEAL_STORAGE"] == "sparse"
+
+def enrolled_by(day):
+    """Students enrolled on or before ``day`` (a date or a date column)."""
+    return or_(Student.enrolled_on.is_(None), Student.enrolled_on <= day)
+
+def _class_logs(class_id, day):
+    return {
+        ml.student_id: ml
+        for ml in MealLog.query.options(lazyload(MealLog.student))
+        .join(Student, Student.id == MealLog.student_id)
+        .filter(Student.class_id == class_id, MealLog.log_date == day).all()
+    }
+
+def day_status(class_id, day, student_ids):
+    """{student_id: ate} for one class and day; children with no entry were not recorded."""
+    logs = {sid: ml.ate for sid, ml in _class_logs(class_id, day).items()}
+    if not sparse() or db.session.get(MealDay, (class_id, day)) is None:
+        return logs
+    return {sid: logs.get(sid, True) for sid in student_ids}
+
+def mark_day(class_id, day):
+    """Record that the class's meals for ``day`` were taken (sparse mode)."""
+    if db.session.get(MealDay, (class_id, day)) is not None:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(MealDay(class_id=class_id, log_date=day))
+    except IntegrityError:
+        pass  # another device recorded the day first
+
+def save_day(class_id, day, statuses):
+    """Store {student_id: ate} for one class and day; the caller commits.
+
+    Goes through the ORM so the flush hooks (kitchen counts, summaries,
+    change log, versions, audit) see every row.
+    """
+    existing = _class_logs(class_id, day)
+    if sparse():
+        mark_day(class_id, day)
+    for sid, ate in statuses.items():
+        ml = existing.get(sid)
+        if sparse() and ate:
+            if ml is not None:
+                db.session.delete(ml)
+        elif ml is not None:
+            ml.ate = ate
+        else:
+            db.session.add(MealLog(student_id=sid, log_date=day, ate=ate))
+    return len(statuses)
+
+def meal_day_counts(start, end, class_id=None):
+    """{student_id: days eaten between start and end}; children with no meals are absent."""
+    if not sparse():
+        q = (
+            db.session.query(MealLog.student_id, func.count(MealLog.id))
+            .join(Student, Student.id == MealLog.student_id)
+            .filter(MealLog.ate == True, MealLog.log_date >= start, MealLog.log_date <= end)
+        )
+        if class_id is not None:
+            q = q.filter(Student.class_id == class_id)
+        return {sid: int(c) for sid, c in q.group_by(MealLog.student_id).all()}
+
+    # Recorded days per class, then per child only for the few enrolled mid-period.
+    class_days = db.session.query(MealDay.class_id, func.count()).filter(
+        MealDay.log_date >= start, MealDay.log_date <= end)
+    students = db.session.query(Student.id, Student.class_id, Student.enrolled_on)
+    late = (
+        db.session.query(Student.id, func.count())
+        .join(MealDay, MealDay.class_id == Student.class_id)
+        .filter(Student.enrolled_on > start, MealDay.log_date >= Student.enrolled_on,
+                MealDay.log_date <= end)
+    )
+    missed = (
+        db.session.query(MealLog.student_id, func.count(MealLog.id))
+        .join(Student, Student.id == MealLog.student_id)
+        .join(MealDay, (MealDay.class_id == Student.class_id) & (MealDay.log_date == MealLog.log_date))
+        .filter(MealLog.ate == False, MealLog.log_date >= start, MealLog.log_date <= end,
+                enrolled_by(MealLog.log_date))
+    )
+    if class_id is not None:
+        class_days = class_days.filter(MealDay.class_id == class_id)
+        students = students.filter(Student.class_id == class_id)
+        late = late.filter(Student.class_id == class_id)
+        missed = missed.filter(Student.class_id == class_id)
+    class_days = dict(class_days.group_by(MealDay.class_id).all())
+    late = dict(late.group_by(Student.id).all())
+    counts = {
+        sid: late.get(sid, 0) if enrolled_on is not None and enrolled_on > start else class_days.get(cid, 0)
+        for sid, cid, enrolled_on in students.all()
+    }
+    for sid, c in missed.group_by(MealLog.student_id).all():
+        counts[sid] -= int(c)
+    return {sid: int(c) for sid, c in counts.items() if c}
+
+def student_days(conn, student_ids, start, end):
+    """{student_id: [(day, ate), ...]} in date order for the recorded days between start and end."""
+    logs = conn.execute(
+        select(MealLog.student_id, MealLog.log_date, MealLog.ate)
+        .where(MealLog.student_id.in_(student_ids), MealLog.log_date >= start, MealLog.log_date <= end)
+        .order_by(MealLog.log_date)
+    ).all()
+    days = {}
+    if not sparse():
+        for sid, day, ate in logs:
+            days.setdefault(sid, []).append((day, bool(ate)))
+        return days
+    missed = {(sid, day) for sid, day, ate in logs if not ate}
+    for sid, day in conn.execute(
+        select(Student.id, MealDay.log_date)
+        .join(MealDay, MealDay.class_id == Student.class_id)
+        .where(Student.id.in_(student_ids), MealDay.log_date >= start, MealDay.log_date <= end,
+               enrolled_by(MealDay.log_date))
+        .order_by(MealDay.log_date)
+    ):
+        days.setdefault(sid, []).append((day, (sid, day) not in missed))
+    return days
+
+# --- switching modes --------------------------------------------------------
+
+def _months(conn, column):
+    first, last = conn.execute(select(func.min(column), func.max(column))).one()
+    if first is None:
+        return
+    month = first.replace(day=1)
+    while month <= last:
+        following = (month + dt.timedelta(days=32)).replace(day=1)
+        yield month, following - dt.timedelta(days=1)
+        month = following
+
+def compact_month(conn, start, end):
+    """Turn one month of dense rows into markers plus exceptions; returns rows deleted."""
+    now = dt.datetime.now()
+    marked = exists().where(MealDay.class_id == Student.class_id, MealDay.log_date == MealLog.log_date)
+    conn.execute(insert(MealDay.__table__).from_select(
+        ["class_id", "log_date", "recorded_at"],
+        select(Student.class_id, MealLog.log_date, literal(now))
+        .join(Student, Student.id == MealLog.student_id)
+        .where(MealLog.log_date >= start, MealLog.log_date <= end, ~marked)
+        .group_by(Student.class_id, MealLog.log_date)))
+    # A child with no row on a recorded day was not counted in dense mode.
+    logged = exists().where(MealLog.student_id == Student.id, MealLog.log_date == MealDay.log_date)
+    conn.execute(insert(MealLog.__table__).from_select(
+        ["student_id", "log_date", "ate", "updated_at"],
+        select(Student.id, MealDay.log_date, literal(False), literal(now))
+        .join(MealDay, MealDay.class_id == Student.class_id)
+        .where(MealDay.log_date >= start, MealDay.log_date <= end, enrolled_by(MealDay.log_date), ~logged)))
+    return conn.execute(delete(MealLog.__table__).where(
+        MealLog.ate == True, MealLog.log_date >= start, MealLog.log_date <= end)).rowcount
+
+def expand_month(conn, start, end):
+    """Write back the implied ``ate = true`` rows of one month; returns rows inserted."""
+    logged = exists().where(MealLog.student_id == Student.id, MealLog.log_date == MealDay.log_date)
+    return conn.execute(insert(MealLog.__table__).from_select(
+        ["student_id", "log_date", "ate", "updated_at"],
+        select(Student.id, MealDay.log_date, literal(True), literal(dt.datetime.now()))
+        .join(MealDay, MealDay.class_id == Student.class_id)
+        .where(MealDay.log_date >= start, MealDay.log_date <= end, enrolled_by(MealDay.log_date),
+               ~logged))).rowcount
+
+def backfill_enrolled_on():
+    """Give students without ``enrolled_on`` the day of their first meal (today if none).
+
+    Sparse mode would otherwise count them on every recorded day of their
+    class. Goes through the ORM so the change log and versions see it.
+    """
+    today = dt.date.today()
+    missing = Student.query.options(lazyload(Student.classroom)).filter(Student.enrolled_on.is_(None)).all()
+    first = dict(
+        db.session.query(MealLog.student_id, func.min(MealLog.log_date))
+        .join(Student, Student.id == MealLog.student_id)
+        .filter(Student.enrolled_on.is_(None))
+        .group_by(MealLog.student_id).all()
+    )
+    for st in missing:
+        st.enrolled_on = first.get(st.id, today)
+    db.session.commit()
+    return len(missing)
+
+def _convert(mode, convert_month, column, verb):
+    from . import kitchen, summaries, audit
+    from .versioning import bump_all_classes
+
+    # The rebuilt counters and summaries must read the new layout.
+    current_app.config["MEAL_STORAGE"] = mode
+    total = months = 0
+    for start, end in list(_months(db.session.connection(), column)):
+        total += convert_month(db.session.connection(), start, end)
+        months += 1
+        db.session.commit()
+    # Bulk statements skip the flush hooks.
+    kitchen.recount()
+    summaries.refresh()
+    bump_all_classes()
+    audit.note(verb, "meal_logs", diff={"months": months, "rows": total})
+    db.session.commit()
+    return months, total
+
+cli = AppGroup("meals", help="Meal attendance storage.")
+
+@cli.command("compact")
+def compact_command():
+    """Keep only the meals not eaten, plus per-class day markers (for MEAL_STORAGE=sparse)."""
+    filled = backfill_enrolled_on()
+    if filled:
+        click.echo(f"Set enrolled_on for {filled} students from their first meal.")
+    months, deleted = _convert("sparse", compact_month, MealLog.log_date, "compact")
+    click.echo(f"Compacted {months} months, {deleted} rows removed. Now set MEAL_STORAGE=sparse.")
+
+@cli.command("expand")
+def expand_command():
+    """Write a row for every child on every recorded day again (for MEAL_STORAGE=dense)."""
+    months, inserted = _convert("dense", expand_month, MealDay.log_date, "expand")
+    click.echo(f"Expanded {months} months, {inserted} rows written. Now set MEAL_STORAGE=dense.")
+
+def init_app(app):
+    app.config.setdefault("MEAL_STORAGE", "dense")
+    if app.config["MEAL_STORAGE"] not in MODES:
+        raise ValueError(f"MEAL_STORAGE must be one of {MODES}, not {app.config['MEAL_STORAGE']!r}")
+    app.cli.add_command(cli)
@@ -1,31 +1,57 @@
 import datetime as dt
+from flask import current_app, has_app_context
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from .extensions import db
 
+DEFAULT_PASSWORD_HASH_METHOD = "scrypt:32768:8:1"
+
+def full_hash_method(method):
+    """The "name:params" prefix Werkzeug stores for ``method``: "scrypt" -> "scrypt:32768:8:1"."""
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+def password_hash_method():
+    # Full "name:params" form, as stored in the hash prefix (create_app
+    # expands short forms), so that a changed setting can be detected on login.
+    if has_app_context():
+        return current_app.config.get("PASSWORD_HASH_METHOD", DEFAULT_PASSWORD_HASH_METHOD)
+    return DEFAULT_PASSWORD_HASH_METHOD
+
 class User(UserMixin, db.Model):
     __tablename__ = "users"
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.Enum("ADMIN", "TEACHER"), nullable=False)
+    role = db.Column(db.Enum("ADMIN", "TEACHER", "PARENT"), nullable=False)
     full_name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20))
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=password_hash_method())
 
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
 
+    def rehash_password(self, password: str) -> bool:
+        """Re-hash with the current PASSWORD_HASH_METHOD if the stored hash used other
+        parameters. Call after a successful check_password; the caller commits."""
+        if self.password_hash.split("$", 1)[0] == password_hash_method():
+            return False
+        self.set_password(password)
+        return True
+
 class Class(db.Model):
     __tablename__ = "classes"
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     teacher_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), unique=True, nullable=True)
+    tuition_fee_override = db.Column(db.Integer)
+    meal_price_override = db.Column(db.Integer)
+    # Maintained by app.capacity; never assign it directly.
+    student_count = db.Column(db.Integer, nullable=False, default=0)
 
     teacher = db.relationship("User", foreign_keys=[teacher_id], lazy="joined")
 
@@ -40,6 +66,8 @@ class Student(db.Model):
     gender = db.Column(db.Enum("M", "F"), nullable=False)
     parent_name = db.Column(db.String(100), nullable=False)
     parent_phone = db.Column(db.String(20), nullable=False)
+    enrolled_on = db.Column(db.Date)
+    updated_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now, onupdate=dt.datetime.now, index=True)
 
     classroom = db.relationship("Class", foreign_keys=[class_id], lazy="joined")
 
@@ -55,6 +83,7 @@ class HealthRecord(db.Model):
     weight_kg = db.Column(db.Numeric(5, 2))
     temperature_c = db.Column(db.Numeric(4, 1), nullable=False)
     note = db.Column(db.String(255))
+    updated_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now, onupdate=dt.datetime.now, index=True)
 
     student = db.relationship("Student", foreign_keys=[student_id], lazy="joined")
 
@@ -68,9 +97,27 @@ class MealLog(db.Model):
     student_id = db.Column(db.Integer, db.ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
     log_date = db.Column(db.Date, nullable=False, index=True)
     ate = db.Column(db.Boolean, nullable=False, default=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now, onupdate=dt.datetime.now, index=True)
 
     student = db.relationship("Student", foreign_keys=[student_id], lazy="joined")
 
+class MealDay(db.Model):
+    """A class's meals were recorded for this day; with MEAL_STORAGE=sparse see app.meals."""
+    __tablename__ = "meal_days"
+
+    class_id = db.Column(db.Integer, db.ForeignKey("classes.id", ondelete="CASCADE"), primary_key=True)
+    log_date = db.Column(db.Date, primary_key=True, index=True)
+    recorded_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now)
+
+class MealCount(db.Model):
+    """Per-class, per-day meal totals for the kitchen, maintained by app.kitchen."""
+    __tablename__ = "meal_counts"
+
+    log_date = db.Column(db.Date, primary_key=True)
+    class_id = db.Column(db.Integer, primary_key=True)
+    eaters = db.Column(db.Integer, nullable=False, default=0)
+    logged = db.Column(db.Integer, nullable=False, default=0)
+
 class Invoice(db.Model):
     __tablename__ = "invoices"
     __table_args__ = (
@@ -83,10 +130,12 @@ class Invoice(db.Model):
     tuition_fee = db.Column(db.Integer, nullable=False)
     meal_unit_price = db.Column(db.Integer, nullable=False)
     meal_days = db.Column(db.Integer, nullable=False)
+    discount_amount = db.Column(db.Integer, nullable=False, default=0)
     total_amount = db.Column(db.Integer, nullable=False)
     status = db.Column(db.Enum("UNPAID", "PAID"), nullable=False, default="UNPAID")
     paid_at = db.Column(db.DateTime)
     collected_by = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"))
+    updated_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now, onupdate=dt.datetime.now, index=True)
 
     student = db.relationship("Student", foreign_keys=[student_id], lazy="joined")
     collector = db.relationship("User", foreign_keys=[collected_by], lazy="joined")
@@ -98,7 +147,121 @@ class Settings(db.Model):
     tuition_fee_monthly = db.Column(db.Integer, nullable=False)
     meal_price_per_day = db.Column(db.Integer, nullable=False)
     max_students_per_class = db.Column(db.Integer, nullable=False)
+    sibling_discount_percent = db.Column(db.Integer, nullable=False, default=0)
 
     @staticmethod
     def get_current():
         return Settings.query.get(1)
+
+class DataVersion(db.Model):
+    __tablename__ = "data_versions"
+
+    scope = db.Column(db.String(64), primary_key=True)  # "class:<id>", "settings"
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+class ChangeLog(db.Model):
+    __tablename__ = "change_log"
+    __table_args__ = (
+        db.Index("idx_change_log_class", "class_id", "id"),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    entity = db.Column(db.Enum("student", "meal", "health", "invoice"), nullable=False)
+    entity_id = db.Column(db.BigInteger, nullable=False)
+    class_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.Enum("U", "D"), nullable=False)  # upsert / delete
+    changed_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now)
+
+class MealLogArchive(db.Model):
+    """Meal logs of closed school years, moved out of the hot table by the archive job."""
+    __tablename__ = "meal_logs_archive"
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    student_id = db.Column(db.Integer, nullable=False, index=True)
+    log_date = db.Column(db.Date, nullable=False, index=True)
+    ate = db.Column(db.Boolean, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+class HealthRecordArchive(db.Model):
+    __tablename__ = "health_records_archive"
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    student_id = db.Column(db.Integer, nullable=False, index=True)
+    record_date = db.Column(db.Date, nullable=False, index=True)
+    weight_kg = db.Column(db.Numeric(5, 2))
+    temperature_c = db.Column(db.Numeric(4, 1), nullable=False)
+    note = db.Column(db.String(255))
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+class JobRun(db.Model):
+    __tablename__ = "job_runs"
+
+    name = db.Column(db.String(64), primary_key=True)
+    last_run_at = db.Column(db.DateTime)
+    last_success_at = db.Column(db.DateTime)
+    last_status = db.Column(db.Enum("ok", "error"))
+    last_detail = db.Column(db.String(255))
+
+class FeverAlert(db.Model):
+    """Outbox row written in the same transaction as a feverish HealthRecord; see app.alerts."""
+    __tablename__ = "fever_alerts"
+    __table_args__ = (
+        db.UniqueConstraint("student_id", "alert_date", name="uq_fever_student_date"),
+        db.Index("idx_fever_pending", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    student_id = db.Column(db.Integer, nullable=False)
+    alert_date = db.Column(db.Date, nullable=False)
+    temperature_c = db.Column(db.Numeric(4, 1), nullable=False)
+    status = db.Column(db.Enum("PENDING", "SENT", "FAILED"), nullable=False, default="PENDING")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now)
+    last_error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now)
+    sent_at = db.Column(db.DateTime)
+
+class ParentStudent(db.Model):
+    """Which students a PARENT account may see."""
+    __tablename__ = "parent_students"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("students.id", ondelete="CASCADE"), primary_key=True,
+                           index=True)
+
+class StudentSummary(db.Model):
+    """One denormalized row per student for the parent portal, maintained by app.summaries."""
+    __tablename__ = "student_summaries"
+
+    student_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    full_name = db.Column(db.String(100), nullable=False)
+    class_name = db.Column(db.String(100), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM the meal figures cover
+    meal_days = db.Column(db.Integer, nullable=False, default=0)
+    meals_logged = db.Column(db.Integer, nullable=False, default=0)
+    last_meal_date = db.Column(db.Date)
+    last_meal_ate = db.Column(db.Boolean)
+    unpaid_total = db.Column(db.Integer, nullable=False, default=0)
+    invoices = db.Column(db.JSON, nullable=False)  # latest months first
+    health = db.Column(db.JSON, nullable=False)    # latest readings first
+    updated_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now)
+
+class AuditLog(db.Model):
+    """Who changed what; written in batches by app.audit's background writer."""
+    __tablename__ = "audit_log"
+    __table_args__ = (
+        db.Index("idx_audit_entity", "entity", "entity_id"),
+        db.Index("idx_audit_actor", "actor_id", "id"),
+        db.Index("idx_audit_created", "created_at"),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.now)
+    actor_id = db.Column(db.Integer)  # users.id; no FK so deleting an account keeps its history
+    actor = db.Column(db.String(50))  # username at the time, "cli" for commands
+    action = db.Column(db.String(32), nullable=False)  # create | update | delete | generate | import | error
+    entity = db.Column(db.String(64))  # table name
+    entity_id = db.Column(db.BigInteger)
+    diff = db.Column(db.JSON)  # {"column": [old, new]}
+    endpoint = db.Column(db.String(64))
+    ip = db.Column(db.String(45))
@@ -0,0 +1,57 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy.orm import Session
+
+from .extensions import db
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+
+def _get_executor(workers):
+    # One pool per process; a pool inherited through gunicorn's fork has no threads.
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parallel-query")
+            _executor_pid = os.getpid()
+        return _executor
+
+def _run(engine, fn):
+    with Session(engine) as session:
+        return fn(session)
+
+def gather(**queries):
+    """Run independent read-only queries concurrently and return their results by name.
+
+    Each value is a function taking a session, e.g.::
+
+        r = gather(
+            students=lambda s: s.scalar(select(func.count(Student.id))),
+            sizes=lambda s: s.query(Class.name, Class.student_count).all(),
+        )
+        r["students"], r["sizes"]
+
+    Every function gets its own short-lived session and pooled connection, so
+    the total latency is that of the slowest query instead of the sum. The
+    queries do not share a transaction, so use this only for figures that may
+    come from slightly different moments (dashboards, reports). ORM objects
+    come back detached: only use attributes loaded by the query itself or its
+    eager relationships.
+
+    Falls back to running in order on the request's session when
+    PARALLEL_QUERY_WORKERS <= 1 or the database is in-memory SQLite.
+    """
+    engine = db.engine
+    workers = current_app.config["PARALLEL_QUERY_WORKERS"]
+    if workers <= 1 or len(queries) <= 1 or engine.url.database in (None, "", ":memory:"):
+        return {name: fn(db.session) for name, fn in queries.items()}
+    executor = _get_executor(workers)
+    futures = {name: executor.submit(_run, engine, fn) for name, fn in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+def init_app(app):
+    app.config.setdefault("PARALLEL_QUERY_WORKERS", 4)
@@ -0,0 +1,2 @@
+from flask import Blueprint
+bp = Blueprint('parent', __name__, url_prefix='/parent')
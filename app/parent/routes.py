@@ -0,0 +1,31 @@
+import datetime as dt
+from flask import render_template, abort
+from flask_login import current_user
+
+from . import bp
+from ..models import ParentStudent
+from ..utils import role_required
+from ..summaries import get_summaries
+
+# Parent pages read only student_summaries (see app.summaries), never the
+# joined meal/health/invoice tables.
+
+def _child_ids():
+    return [sid for (sid,) in ParentStudent.query.with_entities(ParentStudent.student_id)
+            .filter(ParentStudent.user_id == current_user.id).order_by(ParentStudent.student_id)]
+
+@bp.route("/")
+@role_required("PARENT")
+def dashboard():
+    children = get_summaries(_child_ids())
+    return render_template("parent/dashboard.html", children=children, today=dt.date.today())
+
+@bp.route("/students/<int:student_id>")
+@role_required("PARENT")
+def student_detail(student_id):
+    if student_id not in _child_ids():
+        abort(404)
+    summaries = get_summaries([student_id])
+    if not summaries:
+        abort(404)
+    return render_template("parent/student.html", child=summaries[0], today=dt.date.today())
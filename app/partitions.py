@@ -0,0 +1,146 @@
+"""Monthly RANGE COLUMNS partitions for the hot date-keyed tables (MySQL only).
+
+Every daily page filters meal_logs/health_records to one day or month and
+invoices to one billing month, so with one partition per month MySQL reads
+a single partition instead of the whole history. Each table has one
+partition per month (``pYYYYMM``), a ``p_old`` partition for everything
+before the first month, and an empty ``pmax`` catch-all. ``ensure_future``
+splits new months out of ``pmax`` ahead of time, so inserts never land in
+a large catch-all.
+
+    flask --app wsgi partitions init      # once, after migrations/007
+    flask --app wsgi partitions status
+    flask --app wsgi partitions ensure    # also run monthly by `jobs due`
+
+Queries only prune when they compare the partition column itself with
+constants (``log_date == day``, ``billing_month == "2026-09"``,
+``log_date BETWEEN start AND end``); wrapping it in a function such as
+``MONTH(log_date)`` reads every partition.
+"""
+import datetime as dt
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from .extensions import db
+
+# table -> (partition column, bound literal for the first day of a month)
+TABLES = {
+    "meal_logs": ("log_date", lambda d: d.isoformat()),
+    "health_records": ("record_date", lambda d: d.isoformat()),
+    "invoices": ("billing_month", lambda d: d.strftime("%Y-%m")),
+}
+MONTHS_AHEAD = 3
+
+def add_months(day, n):
+    index = day.year * 12 + day.month - 1 + n
+    return dt.date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return "p" + month.strftime("%Y%m")
+
+def _month_of(name):
+    try:
+        return dt.datetime.strptime(name[1:], "%Y%m").date()
+    except ValueError:
+        return None
+
+def _definition(table, month):
+    bound = TABLES[table][1](add_months(month, 1))
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{bound}')"
+
+def _months(first, last):
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+def supported():
+    return db.engine.dialect.name == "mysql"
+
+def list_partitions(table):
+    """[(name, estimated rows)] in order; empty when the table is not partitioned."""
+    rows = db.session.execute(text(
+        "SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"t": table}).all()
+    return [(name, int(n or 0)) for name, n in rows if name is not None]
+
+def init_table(table, today=None, months_ahead=MONTHS_AHEAD):
+    """Partition an unpartitioned table from its oldest month to ``months_ahead``."""
+    column, bound = TABLES[table]
+    today = today or dt.date.today()
+    oldest = db.session.execute(text(f"SELECT MIN(`{column}`) FROM `{table}`")).scalar()
+    if isinstance(oldest, str):  # invoices.billing_month
+        try:
+            oldest = dt.datetime.strptime(oldest[:7], "%Y-%m").date()
+        except ValueError:
+            oldest = None
+    first = (oldest or today).replace(day=1)
+    parts = [f"PARTITION p_old VALUES LESS THAN ('{bound(first)}')"]
+    parts += [_definition(table, m) for m in _months(first, add_months(today, months_ahead))]
+    parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    db.session.execute(text(
+        f"ALTER TABLE `{table}` PARTITION BY RANGE COLUMNS(`{column}`) (" + ", ".join(parts) + ")"
+    ))
+    return len(parts)
+
+def ensure_future(today=None, months_ahead=MONTHS_AHEAD):
+    """Split the months up to ``months_ahead`` out of ``pmax``. Returns {table: added}."""
+    today = today or dt.date.today()
+    added = {}
+    for table in TABLES:
+        existing = [_month_of(name) for name, _ in list_partitions(table)]
+        existing = [m for m in existing if m is not None]
+        if not existing:
+            continue
+        missing = list(_months(add_months(max(existing), 1), add_months(today, months_ahead)))
+        if missing:
+            # pmax is empty while this job keeps up, so the reorganise only
+            # rewrites metadata.
+            db.session.execute(text(
+                f"ALTER TABLE `{table}` REORGANIZE PARTITION pmax INTO ("
+                + ", ".join(_definition(table, m) for m in missing)
+                + ", PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+            ))
+        added[table] = len(missing)
+    return added
+
+cli = AppGroup("partitions", help="Monthly partitions of meal_logs, health_records and invoices.")
+
+def _require_mysql():
+    if not supported():
+        raise click.ClickException("partitioning needs MySQL; nothing to do on " + db.engine.dialect.name)
+
+@cli.command("init")
+@click.option("--months-ahead", default=MONTHS_AHEAD, show_default=True)
+def init_command(months_ahead):
+    """Partition the tables that are not partitioned yet (run after migration 007)."""
+    _require_mysql()
+    for table in TABLES:
+        if list_partitions(table):
+            click.echo(f"{table}: already partitioned")
+        else:
+            click.echo(f"{table}: {init_table(table, months_ahead=months_ahead)} partitions")
+
+@cli.command("ensure")
+@click.option("--months-ahead", default=MONTHS_AHEAD, show_default=True)
+def ensure_command(months_ahead):
+    """Create future monthly partitions."""
+    _require_mysql()
+    for table, n in ensure_future(months_ahead=months_ahead).items():
+        click.echo(f"{table}: {n} added")
+
+@cli.command("status")
+def status_command():
+    """List partitions with their estimated row counts."""
+    _require_mysql()
+    for table in TABLES:
+        parts = list_partitions(table)
+        click.echo(f"{table}: {len(parts) or 'not'} partitions")
+        for name, rows in parts:
+            click.echo(f"  {name:<10} {rows:>12,}")
+
+def init_app(app):
+    app.cli.add_command(cli)
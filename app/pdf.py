@@ -0,0 +1,336 @@
+import os
+import datetime as dt
+from io import BytesIO
+
+from flask import current_app
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+# ReportLab is heavy to import and PDFs are a rare action, so routes import
+# this module inside their export views instead of at module load.
+
+_fonts = None
+
+def register_fonts(font_dir=None):
+    """Register the DejaVu fonts once per process (Vietnamese glyphs)."""
+    global _fonts
+    if _fonts is not None:
+        return _fonts
+    try:
+        font_dir = font_dir or os.path.join(current_app.root_path, 'static', 'fonts')
+        pdfmetrics.registerFont(TTFont('DejaVuSans', os.path.join(font_dir, 'DejaVuSans.ttf')))
+        pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', os.path.join(font_dir, 'DejaVuSans-Bold.ttf')))
+        _fonts = ('DejaVuSans', 'DejaVuSans-Bold')
+    except Exception as e:
+        print(f"Font registration failed: {e}")
+        return 'Helvetica', 'Helvetica-Bold'
+    return _fonts
+
+def build_admin_report(total_students, total_classes, current_month_revenue, gender, class_sizes, revenue_rows):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    font_name, font_bold = register_fonts()
+    
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#0066cc'),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName=font_bold
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor('#333333'),
+        spaceAfter=12,
+        spaceBefore=20,
+        fontName=font_bold
+    )
+    
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontName=font_name,
+        fontSize=10
+    )
+    
+    elements.append(Paragraph("BÁO CÁO THỐNG KÊ HỆ THỐNG", title_style))
+    elements.append(Paragraph(f"Ngày xuất: {dt.date.today().strftime('%d/%m/%Y')}", normal_style))
+    elements.append(Spacer(1, 20))
+    
+    elements.append(Paragraph("TỔNG QUAN HỆ THỐNG", heading_style))
+    overview_data = [
+        ['Chỉ tiêu', 'Giá trị'],
+        ['Tổng số học sinh', str(total_students)],
+        ['Tổng số lớp học', str(total_classes)],
+        ['Doanh thu tháng này', f"{current_month_revenue:,} VND"],
+    ]
+    overview_table = Table(overview_data, colWidths=[10*cm, 6*cm])
+    overview_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), font_bold),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), font_name),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ]))
+    elements.append(overview_table)
+    elements.append(Spacer(1, 20))
+    
+    elements.append(Paragraph("TỶ LỆ GIỚI TÍNH", heading_style))
+    gender_data = [
+        ['Giới tính', 'Số lượng', 'Tỷ lệ %'],
+        ['Nam', str(gender['M']), f"{(gender['M']/total_students*100) if total_students > 0 else 0:.1f}%"],
+        ['Nữ', str(gender['F']), f"{(gender['F']/total_students*100) if total_students > 0 else 0:.1f}%"],
+    ]
+    gender_table = Table(gender_data, colWidths=[5*cm, 5*cm, 6*cm])
+    gender_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), font_bold),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), font_name),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ]))
+    elements.append(gender_table)
+    elements.append(Spacer(1, 20))
+    
+    elements.append(Paragraph("SĨ SỐ TỪNG LỚP", heading_style))
+    class_data = [['Lớp', 'Sĩ số']]
+    for cls_id, cls_name, count in class_sizes:
+        class_data.append([cls_name, str(count)])
+    class_table = Table(class_data, colWidths=[10*cm, 6*cm])
+    class_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), font_bold),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), font_name),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ]))
+    elements.append(class_table)
+    elements.append(Spacer(1, 20))
+    
+    elements.append(Paragraph("DOANH THU CÁC THÁNG", heading_style))
+    revenue_data = [['Tháng', 'Doanh thu (VND)']]
+    for month, total in revenue_rows:
+        revenue_data.append([month, f"{int(total or 0):,}"])
+    revenue_table = Table(revenue_data, colWidths=[8*cm, 8*cm])
+    revenue_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), font_bold),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), font_name),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ]))
+    elements.append(revenue_table)
+    
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+def build_teacher_report(classroom, teacher_name, month, student_count, gender, revenue, invs):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    font_name, font_bold = register_fonts()
+    
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#0066cc'),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName=font_bold
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor('#333333'),
+        spaceAfter=12,
+        spaceBefore=20,
+        fontName=font_bold
+    )
+    
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontName=font_name,
+        fontSize=10
+    )
+    
+    elements.append(Paragraph(f"BÁO CÁO THÁNG {month}", title_style))
+    elements.append(Paragraph(f"Lớp: {classroom.name}", normal_style))
+    elements.append(Paragraph(f"Giáo viên: {teacher_name}", normal_style))
+    elements.append(Paragraph(f"Ngày xuất: {dt.date.today().strftime('%d/%m/%Y')}", normal_style))
+    elements.append(Spacer(1, 20))
+    
+    elements.append(Paragraph("TỔNG QUAN LỚP HỌC", heading_style))
+    overview_data = [
+        ['Chỉ tiêu', 'Giá trị'],
+        ['Sĩ số lớp', str(student_count)],
+        ['Số học sinh nam', str(gender['M'])],
+        ['Số học sinh nữ', str(gender['F'])],
+        [f'Doanh thu tháng {month}', f"{revenue:,} VND"],
+    ]
+    overview_table = Table(overview_data, colWidths=[10*cm, 6*cm])
+    overview_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), font_bold),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), font_name),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ]))
+    elements.append(overview_table)
+    elements.append(Spacer(1, 20))
+    
+    elements.append(Paragraph(f"HÓA ĐƠN THÁNG {month}", heading_style))
+    invoice_data = [['Học sinh', 'Tổng tiền (VND)', 'Trạng thái', 'Ngày thu']]
+    for inv in invs:
+        status = "Đã thu" if inv.status == "PAID" else "Chưa thu"
+        paid_date = inv.paid_at.strftime('%d/%m/%Y %H:%M') if inv.paid_at else '-'
+        invoice_data.append([
+            inv.student.full_name,
+            f"{inv.total_amount:,}",
+            status,
+            paid_date
+        ])
+    
+    invoice_table = Table(invoice_data, colWidths=[5*cm, 4*cm, 3*cm, 4*cm])
+    invoice_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), font_bold),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), font_name),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ]))
+    elements.append(invoice_table)
+    
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+def init_worker(font_dir):
+    """ProcessPoolExecutor initializer: load the fonts once per worker process."""
+    register_fonts(font_dir)
+
+def build_invoice(data):
+    """One A4 receipt from a plain dict (see app.invoice_pdfs.invoice_rows); returns PDF bytes.
+
+    Takes no ORM objects and no app context, so it can run in a worker process.
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm,
+                            title=f"Hoa don {data['billing_month']} - {data['student_name']}")
+    elements = []
+    styles = getSampleStyleSheet()
+
+    font_name, font_bold = register_fonts()
+
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#0066cc'),
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        fontName=font_bold
+    )
+
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontName=font_name,
+        fontSize=10,
+        leading=16
+    )
+
+    elements.append(Paragraph(f"HÓA ĐƠN HỌC PHÍ THÁNG {data['billing_month']}", title_style))
+    elements.append(Paragraph(f"Số hóa đơn: {data['id']}", normal_style))
+    elements.append(Paragraph(f"Học sinh: {data['student_name']}", normal_style))
+    elements.append(Paragraph(f"Lớp: {data['class_name']}", normal_style))
+    elements.append(Paragraph(f"Phụ huynh: {data['parent_name']} - {data['parent_phone']}", normal_style))
+    elements.append(Spacer(1, 20))
+
+    amount_data = [
+        ['Khoản', 'Số tiền (VND)'],
+        ['Học phí tháng', f"{data['tuition_fee']:,}"],
+        [f"Tiền ăn ({data['meal_days']} ngày x {data['meal_unit_price']:,})",
+         f"{data['meal_days'] * data['meal_unit_price']:,}"],
+    ]
+    if data['discount_amount']:
+        amount_data.append(['Giảm trừ', f"-{data['discount_amount']:,}"])
+    amount_data.append(['Tổng tiền', f"{data['total_amount']:,}"])
+
+    amount_table = Table(amount_data, colWidths=[10*cm, 6*cm])
+    amount_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), font_bold),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), font_name),
+        ('FONTNAME', (0, -1), (-1, -1), font_bold),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.beige),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ]))
+    elements.append(amount_table)
+    elements.append(Spacer(1, 20))
+
+    if data['status'] == "PAID":
+        paid_at = data['paid_at'].strftime('%d/%m/%Y %H:%M') if data['paid_at'] else '-'
+        elements.append(Paragraph(f"Trạng thái: Đã thu ngày {paid_at}", normal_style))
+        elements.append(Paragraph(f"Người thu: {data['collector_name'] or '-'}", normal_style))
+    else:
+        elements.append(Paragraph("Trạng thái: Chưa thu", normal_style))
+    elements.append(Paragraph(f"Ngày in: {dt.date.today().strftime('%d/%m/%Y')}", normal_style))
+
+    doc.build(elements)
+    return buffer.getvalue()
@@ -0,0 +1,353 @@
+"""Sampling profiler for production requests.
+
+Slow pages in production rarely reproduce on the small ``db.sql`` data, so
+an admin can switch this on from /admin/profiler while the school is busy.
+Every N-th request (optionally only for some endpoints) runs under cProfile;
+the rest pay one clock read and a counter. At most one request per worker
+is profiled at a time, so a burst of traffic cannot multiply the overhead.
+
+Each worker adds its samples up per endpoint and, every
+PROFILER_FLUSH_SECONDS, writes them as one pstats file per endpoint into
+PROFILER_DIR. The directory is a ring: only the newest PROFILER_RING_SIZE
+files are kept. The admin page merges the ring and serves it as a pstats
+file (``python -m pstats``, snakeviz) or as collapsed stacks for
+flamegraph.pl / speedscope.
+
+The on/off switch is ``control.json`` in the same directory, re-read by
+each worker at most every CHECK_SECONDS; with several web hosts, each host
+has its own switch and ring. Work done on the ``parallel.gather`` threads
+is not profiled; it shows up as time waiting on their results.
+"""
+import os
+import json
+import time
+import atexit
+import marshal
+import pstats
+import cProfile
+import datetime as dt
+import itertools
+import threading
+
+from werkzeug.exceptions import HTTPException
+
+CONTROL_FILE = "control.json"
+CHECK_SECONDS = 2
+DEFAULT_SAMPLE_EVERY = 100
+MAX_BUFFERED = 200  # profiles held per worker before an early flush
+
+def _default_control():
+    return {"enabled": False, "sample_every": DEFAULT_SAMPLE_EVERY, "endpoints": [], "changed_at": None}
+
+class Profiler:
+    def __init__(self, directory, ring_size=200, flush_seconds=60):
+        self.directory = directory
+        self.ring_size = ring_size
+        self.flush_seconds = flush_seconds
+        self._control_path = os.path.join(directory, CONTROL_FILE)
+        self._control = _default_control()
+        self._control_mtime = None
+        self._control_checked = float("-inf")
+        self._counter = itertools.count()
+        self._active = threading.Lock()  # one profiled request per process
+        self._lock = threading.Lock()  # guards the buffer
+        self._flushing = threading.Lock()
+        self._buffer = {}  # endpoint -> [cProfile.Profile]
+        self._buffered = 0
+        self._buffer_started = time.monotonic()
+
+    # --- switch ---------------------------------------------------------
+
+    def control(self):
+        now = time.monotonic()
+        if now - self._control_checked >= CHECK_SECONDS:
+            self._control_checked = now
+            try:
+                mtime = os.stat(self._control_path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != self._control_mtime:
+                self._control_mtime = mtime
+                self._control = self._read_control()
+        return self._control
+
+    def _read_control(self):
+        control = _default_control()
+        try:
+            with open(self._control_path, encoding="utf-8") as f:
+                control.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        control["sample_every"] = max(1, int(control["sample_every"]))
+        return control
+
+    def set_control(self, enabled, sample_every, endpoints):
+        control = {"enabled": bool(enabled), "sample_every": max(1, int(sample_every)),
+                   "endpoints": sorted(set(endpoints)), "changed_at": dt.datetime.now().isoformat(timespec="seconds")}
+        # Created on first use, so CLI and cron runs of the app never touch it.
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self._control_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(control, f)
+        os.replace(tmp, self._control_path)
+        self._control_checked = float("-inf")
+        return control
+
+    def pick(self, endpoint):
+        """True if this request should be profiled."""
+        control = self.control()
+        if not control["enabled"] or endpoint in (None, "static"):
+            return False
+        if control["endpoints"] and endpoint not in control["endpoints"]:
+            return False
+        return next(self._counter) % control["sample_every"] == 0
+
+    # --- sampling -------------------------------------------------------
+
+    def start(self):
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except Exception:
+            # Another profiler (e.g. a debugger) owns the hook.
+            self._active.release()
+            return None
+        return profile
+
+    def stop(self, profile, endpoint):
+        profile.disable()
+        self._active.release()
+        # Converting to pstats costs about as much as profiling did; leave
+        # it to the flush, off the request.
+        with self._lock:
+            self._buffer.setdefault(endpoint, []).append(profile)
+            self._buffered += 1
+
+    def maybe_flush(self):
+        if not self._buffer or self._flushing.locked():
+            return
+        if self._buffered >= MAX_BUFFERED or time.monotonic() - self._buffer_started >= self.flush_seconds:
+            threading.Thread(target=self.flush, name="profiler-flush", daemon=True).start()
+
+    def flush(self):
+        with self._flushing:
+            with self._lock:
+                buffer, self._buffer, self._buffered = self._buffer, {}, 0
+                self._buffer_started = time.monotonic()
+            if not buffer:
+                return
+            stamp = int(time.time() * 1000)
+            for endpoint, profiles in buffer.items():
+                stats = {}
+                for profile in profiles:
+                    _accumulate(stats, profile)
+                path = os.path.join(self.directory, f"{stamp:013d}-{os.getpid()}-{len(profiles)}-{endpoint}.prof")
+                # Readers list *.prof; the rename makes the file appear whole.
+                with open(path + ".tmp", "wb") as f:
+                    f.write(_marshal(stats))
+                os.replace(path + ".tmp", path)
+            self._trim()
+
+    def _trim(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(".prof"))
+        for name in names[:max(0, len(names) - self.ring_size)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass  # another worker trimmed it first
+
+    # --- reading --------------------------------------------------------
+
+    def entries(self):
+        """Ring files, newest first, as dicts (path, time, pid, samples, endpoint)."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []  # never switched on
+        out = []
+        for name in names:
+            if not name.endswith(".prof"):
+                continue
+            stamp, pid, samples, endpoint = name[:-len(".prof")].split("-", 3)
+            out.append({"path": os.path.join(self.directory, name),
+                        "time": dt.datetime.fromtimestamp(int(stamp) / 1000),
+                        "pid": int(pid), "samples": int(samples), "endpoint": endpoint})
+        out.sort(key=lambda e: e["time"], reverse=True)
+        return out
+
+    def merged(self, endpoint=None):
+        """One pstats.Stats over the ring (or one endpoint's files); None if empty."""
+        stats = None
+        for entry in self.entries():
+            if endpoint and entry["endpoint"] != endpoint:
+                continue
+            try:
+                if stats is None:
+                    stats = pstats.Stats(entry["path"])
+                else:
+                    stats.add(entry["path"])
+            except (OSError, EOFError, ValueError, TypeError):
+                continue  # trimmed while we were reading
+        return stats
+
+    def clear(self):
+        with self._flushing:
+            with self._lock:
+                self._buffer, self._buffered = {}, 0
+            for entry in self.entries():
+                try:
+                    os.remove(entry["path"])
+                except OSError:
+                    pass
+
+# --- formats ------------------------------------------------------------
+
+def _func(code):
+    if isinstance(code, str):
+        return ("~", 0, code)  # built-in
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+def _accumulate(stats, profile):
+    """Add one finished run into a pstats-style dict,
+    ``func -> [cc, nc, tt, ct, {caller: [nc, cc, tt, ct]}]``.
+
+    The same numbers as ``pstats.Stats(profile)`` followed by ``Stats.add``,
+    without building and merging a Stats object per request (and generated
+    functions sharing a file/line/name are summed rather than overwritten).
+    """
+    entries = profile.getstats()
+    for entry in entries:
+        func = _func(entry.code)
+        row = stats.get(func)
+        if row is None:
+            stats[func] = row = [0, 0, 0.0, 0.0, {}]
+        row[0] += entry.callcount - entry.reccallcount
+        row[1] += entry.callcount
+        row[2] += entry.inlinetime
+        row[3] += entry.totaltime
+    for entry in entries:
+        if not entry.calls:
+            continue
+        caller = _func(entry.code)
+        for sub in entry.calls:
+            row = stats.get(_func(sub.code))
+            if row is None:
+                continue
+            edge = row[4].get(caller)
+            if edge is None:
+                row[4][caller] = edge = [0, 0, 0.0, 0.0]
+            edge[0] += sub.callcount
+            edge[1] += sub.callcount - sub.reccallcount
+            edge[2] += sub.inlinetime
+            edge[3] += sub.totaltime
+
+def _marshal(stats):
+    # The format Stats.dump_stats writes.
+    return marshal.dumps({func: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+                          for func, (cc, nc, tt, ct, callers) in stats.items()})
+
+def label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-in, e.g. <method 'execute' of 'sqlite3.Cursor' objects>
+    return f"{os.path.basename(filename)}:{name}:{line}"
+
+def top(stats, limit=20, sort="cumulative"):
+    """Rows (label, calls, tottime ms, cumtime ms) of the most expensive functions."""
+    rows = []
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append((label(func), nc, tt * 1000, ct * 1000))
+    rows.sort(key=lambda r: r[3] if sort == "cumulative" else r[2], reverse=True)
+    return rows[:limit]
+
+def pstats_bytes(stats):
+    return marshal.dumps(stats.stats)
+
+def collapsed(stats, min_fraction=0.0005):
+    """Collapsed stacks ("a;b;c <microseconds>" per line) for flamegraph tools.
+
+    cProfile keeps caller -> callee totals, not whole stacks, so each
+    function's time is split over its callers in proportion to what each
+    caller spent in it. That is exact for code reached by one path and an
+    estimate for shared helpers. Branches below ``min_fraction`` of the
+    total are dropped.
+    """
+    data = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in data.items():
+        for caller, edge in callers.items():
+            if isinstance(edge, tuple):
+                callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, value in data.items() if not value[4]]
+    total = sum(data[func][3] for func in roots)
+    if total <= 0:
+        return ""
+    floor = total * min_fraction
+    weights = {}
+
+    def walk(func, path, on_path, budget):
+        _, _, tt, ct, _ = data[func]
+        if ct <= 0:
+            return
+        path = path + (label(func),)
+        scale = min(1.0, budget / ct)
+        if tt * scale >= floor:
+            weights[path] = weights.get(path, 0) + tt * scale
+        for callee, edge_ct in callees.get(func, ()):
+            share = edge_ct * scale
+            if share >= floor and callee not in on_path and callee in data:
+                walk(callee, path, on_path | {callee}, share)
+
+    for root in roots:
+        walk(root, (), {root}, data[root][3])
+    return "".join(f"{';'.join(path)} {round(seconds * 1e6)}\n"
+                   for path, seconds in sorted(weights.items()) if round(seconds * 1e6) > 0)
+
+# --- WSGI ---------------------------------------------------------------
+
+class ProfilerMiddleware:
+    """Wraps ``app.wsgi_app`` so a sampled request is profiled end to end,
+    from routing through the teardown handlers, as one call tree."""
+
+    def __init__(self, app, wsgi_app, profiler):
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+
+    def _endpoint(self, environ):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        return endpoint
+
+    def __call__(self, environ, start_response):
+        profiler = self.profiler
+        if not profiler.control()["enabled"]:
+            profiler.maybe_flush()
+            return self.wsgi_app(environ, start_response)
+        endpoint = self._endpoint(environ)
+        profile = profiler.start() if profiler.pick(endpoint) else None
+        if profile is None:
+            profiler.maybe_flush()
+            return self.wsgi_app(environ, start_response)
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            profiler.stop(profile, endpoint)
+            profiler.maybe_flush()
+
+def init_app(app):
+    if app.config.get("PROFILER_DIR") is None:
+        app.config["PROFILER_DIR"] = os.path.join(app.instance_path, "profiles")
+    app.config.setdefault("PROFILER_RING_SIZE", 200)
+    app.config.setdefault("PROFILER_FLUSH_SECONDS", 60)
+
+    profiler = Profiler(app.config["PROFILER_DIR"], ring_size=app.config["PROFILER_RING_SIZE"],
+                        flush_seconds=app.config["PROFILER_FLUSH_SECONDS"])
+    app.extensions["profiler"] = profiler
+    app.wsgi_app = ProfilerMiddleware(app, app.wsgi_app, profiler)
+    # Workers exit on max_requests recycling and deploys; keep their last window.
+    atexit.register(profiler.flush)
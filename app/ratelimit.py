@@ -0,0 +1,143 @@
+import os
+import math
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from flask import current_app, request
+
+from .local_sqlite import LocalSQLite
+
+def parse_rule(rule):
+    """"30/60" -> (capacity 30, refill 0.5 token/s): 30 attempts burst, 30 per minute sustained."""
+    capacity, period = rule.split("/")
+    capacity, period = float(capacity), float(period)
+    return capacity, capacity / period
+
+def _take(tokens, stamp, now, capacity, rate):
+    """Token bucket step: returns (tokens, retry_after or 0)."""
+    tokens = capacity if tokens is None else min(capacity, tokens + (now - stamp) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, math.ceil((1 - tokens) / rate)
+
+class MemoryBackend:
+    """Per-worker buckets; an attacker spread over N workers gets N times the rate."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.pop(key, (None, now))
+            tokens, retry = _take(tokens, stamp, now, capacity, rate)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return retry
+
+    def give_back(self, key, capacity):
+        with self._lock:
+            if key in self._buckets:
+                tokens, stamp = self._buckets[key]
+                self._buckets[key] = (min(capacity, tokens + 1), stamp)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+class SQLiteBackend(LocalSQLite):
+    """Buckets in a local SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path):
+        super().__init__(
+            path, "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL)"
+        )
+        self._writes = 0
+
+    def hit(self, key, capacity, rate):
+        now = time.time()
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, stamp FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, retry = _take(row[0] if row else None, row[1] if row else now, now, capacity, rate)
+                conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, stamp) VALUES (?, ?, ?)",
+                             (key, tokens, now))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.OperationalError:
+            # A busy limiter file must not lock everyone out; fail open.
+            return 0
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            # Buckets untouched for a day are full again; drop them.
+            conn.execute("DELETE FROM buckets WHERE stamp < ?", (now - 86400,))
+        return retry
+
+    def give_back(self, key, capacity):
+        try:
+            self._conn().execute("UPDATE buckets SET tokens = MIN(?, tokens + 1) WHERE key = ?", (capacity, key))
+        except sqlite3.OperationalError:
+            pass  # busy: the attempt simply stays counted
+
+    def clear(self):
+        self._conn().execute("DELETE FROM buckets")
+
+def hit(key, rule):
+    """Take one token from ``key``'s bucket; returns seconds to wait, 0 if allowed."""
+    backend = current_app.extensions.get("ratelimit")
+    if backend is None:
+        return 0
+    capacity, rate = parse_rule(rule)
+    return backend.hit(key, capacity, rate)
+
+def give_back(key, rule):
+    """Return the token a request took from ``key``'s bucket."""
+    backend = current_app.extensions.get("ratelimit")
+    if backend is not None:
+        backend.give_back(key, parse_rule(rule)[0])
+
+def login_retry_after(username):
+    """Throttle a login attempt by client IP and by account, before any hashing.
+
+    Returns the seconds the client must wait, or 0. An IP that is already
+    blocked does not drain the account's bucket, so one noisy client cannot
+    lock a teacher out from every other address. Call ``login_succeeded``
+    after a correct password so only failed attempts count.
+    """
+    config = current_app.config
+    wait = hit(f"login-ip:{request.remote_addr}", config["RATELIMIT_LOGIN_IP"])
+    if wait or not username:
+        return wait
+    return hit(f"login-user:{username.lower()}", config["RATELIMIT_LOGIN_USER"])
+
+def login_succeeded(username):
+    """Give back the tokens ``login_retry_after`` took: a school's shared NAT
+    at drop-off time must not run out on logins that were right."""
+    config = current_app.config
+    give_back(f"login-ip:{request.remote_addr}", config["RATELIMIT_LOGIN_IP"])
+    if username:
+        give_back(f"login-user:{username.lower()}", config["RATELIMIT_LOGIN_USER"])
+
+def init_app(app):
+    app.config.setdefault("RATELIMIT_BACKEND", "memory")
+    app.config.setdefault("RATELIMIT_LOGIN_IP", "30/60")
+    app.config.setdefault("RATELIMIT_LOGIN_USER", "10/300")
+    app.config.setdefault("RATELIMIT_SQLITE_PATH", os.path.join(app.instance_path, "ratelimit.sqlite3"))
+
+    kind = app.config["RATELIMIT_BACKEND"]
+    if kind == "sqlite":
+        backend = SQLiteBackend(app.config["RATELIMIT_SQLITE_PATH"])
+    elif kind == "memory":
+        backend = MemoryBackend()
+    else:
+        backend = None
+    app.extensions["ratelimit"] = backend
@@ -0,0 +1,75 @@
+"""Per-class roster snapshots shared by the teacher's daily pages.
+
+The meals, health, tuition and report pages all start from the class's
+children, but need little more than their names. Loading ``Student``
+objects for that also loads each child's joined classroom and teacher rows.
+Each worker instead keeps, per class, a tuple of small ``Pupil`` records
+sorted by name. A snapshot is reloaded only when the class's ``roster:<id>``
+data version moves; app.versioning bumps it whenever a student of the class
+is created, edited, moved or deleted. Pages join their follow-up queries on
+``class_id`` rather than sending the roster's ids back as an ``IN`` list.
+"""
+import threading
+from collections import OrderedDict
+
+from flask import current_app, g
+
+from .extensions import db
+from .models import Student
+from .versioning import get_versions, roster_scope
+
+class Pupil:
+    __slots__ = ("id", "full_name", "gender", "dob")
+
+    def __init__(self, id, full_name, gender, dob):
+        self.id = id
+        self.full_name = full_name
+        self.gender = gender
+        self.dob = dob
+
+    def __repr__(self):
+        return f"<Pupil {self.id} {self.full_name!r}>"
+
+class RosterCache:
+    """Per-worker LRU of (version, pupils) by class id."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, class_id):
+        # Read the version before the rows: a write landing in between then
+        # only costs one extra reload.
+        (version,) = get_versions([roster_scope(class_id)])
+        with self._lock:
+            entry = self._data.get(class_id)
+            if entry is not None and entry[0] == version:
+                self._data.move_to_end(class_id)
+                return entry[1]
+        pupils = tuple(
+            Pupil(*row) for row in db.session.query(Student.id, Student.full_name, Student.gender, Student.dob)
+            .filter(Student.class_id == class_id)
+            .order_by(Student.full_name, Student.id)
+        )
+        with self._lock:
+            self._data[class_id] = (version, pupils)
+            self._data.move_to_end(class_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return pupils
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+def roster(class_id):
+    """The class's pupils sorted by name; checked against the data version once per request."""
+    snapshots = g.setdefault("rosters", {})
+    if class_id not in snapshots:
+        snapshots[class_id] = current_app.extensions["roster"].get(class_id)
+    return snapshots[class_id]
+
+def init_app(app):
+    app.config.setdefault("ROSTER_CACHE_SIZE", 256)
+    app.extensions["roster"] = RosterCache(app.config["ROSTER_CACHE_SIZE"])
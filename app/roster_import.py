@@ -0,0 +1,150 @@
+import io
+import csv
+import datetime as dt
+
+from sqlalchemy import func
+
+from .extensions import db
+from .models import Class, Student
+from .versioning import bump_classes
+from .changelog import log_bulk_students
+from .capacity import CapacityError, max_students, reserve
+from . import audit
+
+CHUNK_SIZE = 500
+REQUIRED_COLUMNS = ("full_name", "dob", "gender", "parent_name", "parent_phone")
+GENDERS = {"m": "M", "nam": "M", "f": "F", "nữ": "F", "nu": "F"}
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y")
+
+def _parse_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return dt.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(value)
+
+class RosterImport:
+    """One pass over a roster CSV: validate every row, insert the valid ones.
+
+    Rows are read straight from the uploaded stream and written with
+    ``bulk_insert_mappings`` every ``CHUNK_SIZE`` rows, so memory stays flat
+    whatever the file size. Rows are checked against the classes' maintained
+    ``student_count``, and each chunk reserves its seats atomically before it
+    is inserted. The caller owns the transaction.
+
+    ``class_id`` pins every row to one class (teachers); otherwise each row
+    names its class in a ``class`` column, by id or by name (admins).
+    """
+
+    def __init__(self, class_id=None):
+        self.class_id = class_id
+        self.errors = []  # (line, message)
+        self.created = 0
+        self.failed = False  # the file itself is unreadable; roll back
+        self.today = dt.date.today()  # enrolled_on when the row has none
+        self._chunk = []
+        self._touched = set()
+
+        self.max_students = max_students()
+
+        class_q = db.session.query(Class.id, Class.name, Class.student_count)
+        if class_id is not None:
+            class_q = class_q.filter(Class.id == class_id)
+        classes = class_q.all()
+        self.class_by_name = {name.strip().lower(): cid for cid, name, _ in classes}
+        self.class_ids = {cid for cid, _, _ in classes}
+        self.counts = {cid: n for cid, _, n in classes}
+        self.after_id = db.session.query(func.max(Student.id)).scalar() or 0
+
+    def _resolve_class(self, value):
+        if self.class_id is not None:
+            return self.class_id
+        if not value:
+            raise ValueError("Thiếu lớp.")
+        if value.isdigit() and int(value) in self.class_ids:
+            return int(value)
+        cid = self.class_by_name.get(value.lower())
+        if cid is None:
+            raise ValueError(f"Lớp không tồn tại: {value}.")
+        return cid
+
+    def _validate(self, row):
+        values = {k: (row.get(k) or "").strip() for k in REQUIRED_COLUMNS}
+        missing = [k for k, v in values.items() if not v]
+        if missing:
+            raise ValueError("Thiếu " + ", ".join(missing) + ".")
+        try:
+            dob = _parse_date(values["dob"])
+        except ValueError:
+            raise ValueError("Ngày sinh không hợp lệ.")
+        gender = GENDERS.get(values["gender"].lower())
+        if gender is None:
+            raise ValueError("Giới tính phải là M/F (Nam/Nữ).")
+        enrolled = (row.get("enrolled_on") or "").strip()
+        try:
+            enrolled_on = _parse_date(enrolled) if enrolled else self.today
+        except ValueError:
+            raise ValueError("Ngày nhập học không hợp lệ.")
+        class_id = self._resolve_class((row.get("class") or "").strip())
+        if self.counts.get(class_id, 0) >= self.max_students:
+            raise ValueError(f"Lớp đã đủ {self.max_students} trẻ.")
+
+        return dict(values, dob=dob, gender=gender, enrolled_on=enrolled_on, class_id=class_id)
+
+    def _flush(self):
+        if self._chunk:
+            # bulk_insert_mappings skips the capacity hook, so take the seats
+            # here; this only fails if another enrollment raced the import.
+            seats = {}
+            for m in self._chunk:
+                seats[m["class_id"]] = seats.get(m["class_id"], 0) + 1
+            conn = db.session.connection()
+            for cid in sorted(seats):
+                reserve(conn, cid, seats[cid], self.max_students)
+            db.session.bulk_insert_mappings(Student, self._chunk)
+            self.created += len(self._chunk)
+            self._chunk = []
+
+    def run(self, stream):
+        """Import from a binary stream (e.g. ``FileStorage.stream``)."""
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        try:
+            reader = csv.DictReader(text)
+            header = [h.strip() for h in (reader.fieldnames or [])]
+            reader.fieldnames = header
+            missing = [c for c in REQUIRED_COLUMNS if c not in header]
+            if self.class_id is None and "class" not in header:
+                missing.append("class")
+            if missing:
+                self.errors.append((1, "Thiếu cột: " + ", ".join(missing) + "."))
+                self.failed = True
+                return self
+
+            for row in reader:
+                try:
+                    mapping = self._validate(row)
+                except ValueError as e:
+                    self.errors.append((reader.line_num, str(e)))
+                    continue
+                self.counts[mapping["class_id"]] = self.counts.get(mapping["class_id"], 0) + 1
+                self._touched.add(mapping["class_id"])
+                self._chunk.append(mapping)
+                if len(self._chunk) >= CHUNK_SIZE:
+                    self._flush()
+            self._flush()
+        except (UnicodeDecodeError, csv.Error):
+            self.errors.append((0, "Tệp không phải CSV UTF-8 hợp lệ."))
+            self.failed = True
+        except CapacityError:
+            self.errors.append((0, "Sĩ số lớp vừa thay đổi trong lúc nhập, vui lòng thử lại."))
+            self.failed = True
+        finally:
+            text.detach()
+
+        if self.created and not self.failed:
+            # bulk_insert_mappings skips the flush hooks.
+            log_bulk_students(self._touched, self.after_id)
+            audit.note("import", "students", diff={"created": self.created, "class_ids": sorted(self._touched)})
+            bump_classes(self._touched)
+        return self
@@ -0,0 +1,168 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import func
+
+from .extensions import db
+from .models import Student, ChangeLog
+from .changelog import settled_id
+
+MIN_SCORE = 0.6
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def fold(text):
+    """Lower-case, strip Vietnamese diacritics and punctuation: "Đỗ Thị Ánh" -> "do thi anh"."""
+    text = (text or "").replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_NON_ALNUM.sub(" ", text.lower()).split())
+
+def word_grams(text):
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def digit_grams(digits):
+    return {"#" + digits[i:i + 3] for i in range(len(digits) - 2)}
+
+class StudentIndex:
+    """In-process trigram index over folded student and parent names and phones.
+
+    Built once per worker from one query, then kept current from change_log:
+    each search first reloads the students logged since the index's cursor,
+    so edits from any worker (and bulk imports) show up on the next search.
+    The cursor only moves past settled ids (changelog.settled_id), so the
+    students in the newer tail are reloaded on every refresh until it
+    settles. Queries run outside ``_lock``; one thread refreshes at a time
+    while the others search the current index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()        # guards _docs/_postings/cursor
+        self._refreshing = threading.Lock()
+        self._docs = {}      # sid -> (class_id, name, parent, phone, grams)
+        self._postings = {}  # gram -> set(sid)
+        self.cursor = None
+
+    def _add(self, sid, class_id, full_name, parent_name, parent_phone):
+        name, parent = fold(full_name), fold(parent_name)
+        phone = re.sub(r"\D", "", parent_phone or "")
+        grams = word_grams(name) | word_grams(parent) | digit_grams(phone)
+        self._docs[sid] = (class_id, name, parent, phone, grams)
+        for g in grams:
+            self._postings.setdefault(g, set()).add(sid)
+
+    def _remove(self, sid):
+        doc = self._docs.pop(sid, None)
+        if doc is None:
+            return
+        for g in doc[4]:
+            ids = self._postings.get(g)
+            if ids is not None:
+                ids.discard(sid)
+                if not ids:
+                    del self._postings[g]
+
+    def _rows(self, ids=None):
+        q = db.session.query(Student.id, Student.class_id, Student.full_name,
+                             Student.parent_name, Student.parent_phone)
+        if ids is not None:
+            q = q.filter(Student.id.in_(ids))
+        return q.all()
+
+    def rebuild(self):
+        # Taken before the rows: anything newer is in the tail re-read later.
+        cursor = settled_id()
+        rows = self._rows()
+        with self._lock:
+            self._docs, self._postings = {}, {}
+            for row in rows:
+                self._add(*row)
+            self.cursor = cursor
+
+    def refresh(self):
+        if not self._refreshing.acquire(blocking=self.cursor is None):
+            return
+        try:
+            self._refresh()
+        finally:
+            self._refreshing.release()
+
+    def _refresh(self):
+        if self.cursor is None:
+            return self.rebuild()
+        head, oldest = db.session.query(func.max(ChangeLog.id), func.min(ChangeLog.id)).one()
+        if (head or 0) <= self.cursor:
+            return
+        if oldest is not None and oldest > self.cursor + 1:
+            # Entries we never saw were purged; start over.
+            return self.rebuild()
+        settled = settled_id()
+        ids = {sid for (sid,) in db.session.query(ChangeLog.entity_id).filter(
+            ChangeLog.entity == "student", ChangeLog.id > self.cursor
+        ).distinct()}
+        rows = self._rows(list(ids)) if ids else []
+        with self._lock:
+            # A class move logs both U and D for one student, so reload the
+            # current row rather than trusting the op.
+            for sid in ids:
+                self._remove(sid)
+            for row in rows:
+                self._add(*row)
+            self.cursor = max(self.cursor, settled)
+
+    def search(self, query, class_id=None, limit=20):
+        """[(score, sid, class_id)] best first."""
+        folded = fold(query)
+        digits = re.sub(r"\D", "", query)
+        if not folded:
+            return []
+
+        self.refresh()
+        with self._lock:
+            phone_query = len(digits) >= 3 and len(digits) * 2 >= len(folded.replace(" ", ""))
+            grams = digit_grams(digits) if phone_query else word_grams(folded)
+            hits = Counter()
+            for g in grams:
+                hits.update(self._postings.get(g, ()))
+
+            results = []
+            for sid, n in hits.items():
+                score = n / len(grams)
+                if score < MIN_SCORE:
+                    continue
+                doc_class, name, parent, phone, _ = self._docs[sid]
+                if class_id is not None and doc_class != class_id:
+                    continue
+                if phone_query:
+                    if digits not in phone:
+                        continue
+                    score += 1.0
+                else:
+                    if folded in name:
+                        score += 1.0 if name.startswith(folded) or f" {folded}" in name else 0.5
+                    elif folded in parent:
+                        score += 0.5
+                results.append((round(score, 3), sid, doc_class))
+
+        results.sort(key=lambda r: (-r[0], r[1]))
+        return results[:limit]
+
+def get_index():
+    index = current_app.extensions.get("student_search")
+    if index is None:
+        index = current_app.extensions.setdefault("student_search", StudentIndex())
+    return index
+
+def search_students(query, class_id=None, limit=20):
+    """Ranked ``(score, Student)`` pairs; the student's class is joined in."""
+    hits = get_index().search(query, class_id=class_id, limit=limit)
+    if not hits:
+        return []
+    students = {s.id: s for s in Student.query.filter(Student.id.in_([sid for _, sid, _ in hits])).all()}
+    return [(score, students[sid]) for score, sid, _ in hits if sid in students]
@@ -0,0 +1,57 @@
+import os
+import hashlib
+
+from flask import request
+
+# filename -> (mtime, digest). Hashing happens once per file per worker; the
+# mtime check keeps it correct when a file is edited under the dev server.
+_digests = {}
+
+def static_digest(app, filename):
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    cached = _digests.get(filename)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    digest = h.hexdigest()[:12]
+    _digests[filename] = (mtime, digest)
+    return digest
+
+def init_app(app):
+    """Fingerprint ``url_for('static', ...)`` and cache fingerprinted files forever.
+
+    URLs get a ``?v=<content hash>`` query string, so a changed file gets a
+    new URL and browsers can keep the old one as ``immutable``.
+    """
+    app.config.setdefault("STATIC_IMMUTABLE_MAX_AGE", 31536000)
+
+    @app.url_defaults
+    def add_static_version(endpoint, values):
+        if endpoint != "static" or "v" in values:
+            return
+        filename = values.get("filename")
+        if filename:
+            digest = static_digest(app, filename)
+            if digest:
+                values["v"] = digest
+
+    @app.after_request
+    def static_cache_headers(response):
+        if request.endpoint != "static" or response.status_code not in (200, 304):
+            return response
+        version = request.args.get("v")
+        if version and version == static_digest(app, request.view_args.get("filename", "")):
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config["STATIC_IMMUTABLE_MAX_AGE"]
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
@@ -0,0 +1,147 @@
+"""Denormalized per-student rows for the parent portal.
+
+Parents outnumber staff about twenty to one, so their pages read a single
+``student_summaries`` row per child instead of the joined ORM loads behind
+the teacher pages. The row is rebuilt inside the writing transaction for
+every student whose meals, health records, invoices, name or class changed
+in a flush. Bulk writes skip the hook and call ``refresh`` themselves
+(``generate_invoices``, ``flask seed``); rows that are missing, or cover a
+past month, are rebuilt the first time a parent reads them.
+"""
+import datetime as dt
+
+from sqlalchemy import event, inspect, select, delete, insert
+
+from .extensions import db
+from .models import Class, Student, MealLog, MealDay, HealthRecord, Invoice, StudentSummary
+from .meals import student_days
+
+INVOICE_MONTHS = 6
+HEALTH_READINGS = 5
+HEALTH_DAYS = 90
+CHUNK = 500
+
+def _build(conn, student_ids, today):
+    month = today.strftime("%Y-%m")
+    start = today.replace(day=1)
+    students = conn.execute(
+        select(Student.id, Student.full_name, Class.name)
+        .join(Class, Class.id == Student.class_id)
+        .where(Student.id.in_(student_ids))
+    ).all()
+    if not students:
+        return []
+
+    meals = {}
+    for sid, logged in student_days(conn, student_ids, start, today).items():
+        last_day, last_ate = logged[-1]
+        meals[sid] = (sum(ate for _, ate in logged), len(logged), last_day, last_ate)
+
+    invoices, unpaid = {}, {}
+    for row in conn.execute(
+        select(Invoice.student_id, Invoice.billing_month, Invoice.total_amount, Invoice.status,
+               Invoice.paid_at, Invoice.meal_days)
+        .where(Invoice.student_id.in_(student_ids))
+        .order_by(Invoice.billing_month.desc())
+    ):
+        if row.status == "UNPAID":
+            unpaid[row.student_id] = unpaid.get(row.student_id, 0) + row.total_amount
+        items = invoices.setdefault(row.student_id, [])
+        if len(items) < INVOICE_MONTHS:
+            items.append({"month": row.billing_month, "total": row.total_amount, "status": row.status,
+                          "meal_days": row.meal_days,
+                          "paid_at": row.paid_at.isoformat(timespec="minutes") if row.paid_at else None})
+
+    health = {}
+    for row in conn.execute(
+        select(HealthRecord.student_id, HealthRecord.record_date, HealthRecord.temperature_c,
+               HealthRecord.weight_kg, HealthRecord.note)
+        .where(HealthRecord.student_id.in_(student_ids),
+               HealthRecord.record_date >= today - dt.timedelta(days=HEALTH_DAYS))
+        .order_by(HealthRecord.record_date.desc())
+    ):
+        items = health.setdefault(row.student_id, [])
+        if len(items) < HEALTH_READINGS:
+            items.append({"date": row.record_date.isoformat(),
+                          "temperature_c": float(row.temperature_c),
+                          "weight_kg": float(row.weight_kg) if row.weight_kg is not None else None,
+                          "note": row.note})
+
+    now = dt.datetime.now()
+    rows = []
+    for sid, full_name, class_name in students:
+        days, logged, last_day, last_ate = meals.get(sid, (0, 0, None, None))
+        rows.append({
+            "student_id": sid, "full_name": full_name, "class_name": class_name, "month": month,
+            "meal_days": days, "meals_logged": logged, "last_meal_date": last_day, "last_meal_ate": last_ate,
+            "unpaid_total": unpaid.get(sid, 0), "invoices": invoices.get(sid, []),
+            "health": health.get(sid, []), "updated_at": now,
+        })
+    return rows
+
+def refresh(student_ids=None, conn=None, today=None):
+    """Rebuild the summaries of some students (default: everyone), CHUNK at a time."""
+    conn = conn or db.session.connection()
+    today = today or dt.date.today()
+    if student_ids is None:
+        student_ids = [sid for (sid,) in conn.execute(select(Student.id).order_by(Student.id))]
+    student_ids = sorted(set(student_ids))
+    table = StudentSummary.__table__
+    for i in range(0, len(student_ids), CHUNK):
+        ids = student_ids[i:i + CHUNK]
+        # Also drops the rows of deleted students.
+        conn.execute(delete(table).where(table.c.student_id.in_(ids)))
+        rows = _build(conn, ids, today)
+        if rows:
+            conn.execute(insert(table), rows)
+
+def refresh_classes(class_ids, conn=None):
+    conn = conn or db.session.connection()
+    refresh([sid for (sid,) in conn.execute(select(Student.id).where(Student.class_id.in_(list(class_ids))))],
+            conn=conn)
+
+def get_summaries(student_ids):
+    """Summary rows for a parent's children, rebuilding missing or last-month rows first."""
+    month = dt.date.today().strftime("%Y-%m")
+    rows = {s.student_id: s for s in StudentSummary.query.filter(StudentSummary.student_id.in_(student_ids))}
+    stale = [sid for sid in student_ids if sid not in rows or rows[sid].month != month]
+    if stale:
+        refresh(stale)
+        db.session.commit()
+        rows = {s.student_id: s for s in StudentSummary.query.filter(StudentSummary.student_id.in_(student_ids))}
+    return [rows[sid] for sid in student_ids if sid in rows]
+
+def _affected(session):
+    student_ids, class_ids = set(), set()
+    for kind, objs in (("new", session.new), ("dirty", session.dirty), ("deleted", session.deleted)):
+        for obj in objs:
+            if kind == "dirty" and not session.is_modified(obj, include_collections=False):
+                continue
+            if isinstance(obj, Student):
+                if obj.id is not None:
+                    student_ids.add(obj.id)
+            elif isinstance(obj, (MealLog, HealthRecord, Invoice)):
+                if obj.student_id is not None:
+                    student_ids.add(obj.student_id)
+                for old in inspect(obj).attrs.student_id.history.deleted or ():
+                    if old is not None:
+                        student_ids.add(old)
+            elif isinstance(obj, Class) and kind == "dirty" and inspect(obj).attrs.name.history.deleted:
+                class_ids.add(obj.id)
+            elif isinstance(obj, MealDay):
+                class_ids.add(obj.class_id)
+    return student_ids, class_ids
+
+def _refresh_on_flush(session, flush_context):
+    student_ids, class_ids = _affected(session)
+    if not student_ids and not class_ids:
+        return
+    conn = session.connection()
+    if class_ids:
+        student_ids.update(sid for (sid,) in conn.execute(
+            select(Student.id).where(Student.class_id.in_(class_ids))))
+    refresh(student_ids, conn=conn)
+
+def init_app(app):
+    if not event.contains(db.session, "after_flush", _refresh_on_flush):
+        event.listen(db.session, "after_flush", _refresh_on_flush)
@@ -1,45 +1,34 @@
-import calendar
 import datetime as dt
 from io import BytesIO
 from sqlalchemy import func
-from flask import render_template, request, redirect, url_for, flash, send_file
+from sqlalchemy.orm import lazyload
+from flask import render_template, request, redirect, url_for, flash, send_file, g, Response, stream_with_context
 
 from . import bp
 from ..extensions import db
 from ..models import Class, Student, Settings, HealthRecord, MealLog, Invoice
 from ..utils import role_required
+from ..versioning import conditional, class_scope, SETTINGS_SCOPE
+from ..roster_import import RosterImport
+from ..changelog import log_bulk_deletes
+from ..capacity import CapacityError, max_students
+from ..parallel import gather
+from ..alerts import threshold as fever_threshold
+from ..billing import BillingRun, compute_invoices, generate_invoices, month_range as _month_range
+from .. import meals
+from ..roster import roster
 from flask_login import current_user
 
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-def register_fonts():
-    try:
-        import os
-        from flask import current_app
-        font_dir = os.path.join(current_app.root_path, 'static', 'fonts')
-        pdfmetrics.registerFont(TTFont('DejaVuSans', os.path.join(font_dir, 'DejaVuSans.ttf')))
-        pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', os.path.join(font_dir, 'DejaVuSans-Bold.ttf')))
-        return 'DejaVuSans', 'DejaVuSans-Bold'
-    except Exception as e:
-        print(f"Font registration failed: {e}")
-        return 'Helvetica', 'Helvetica-Bold'
-
 def _get_teacher_class():
-    return Class.query.filter_by(teacher_id=current_user.id).first()
+    if "teacher_class" not in g:
+        g.teacher_class = Class.query.filter_by(teacher_id=current_user.id).first()
+    return g.teacher_class
 
-def _month_range(yyyy_mm: str):
-    year, month = map(int, yyyy_mm.split("-"))
-    start = dt.date(year, month, 1)
-    last_day = calendar.monthrange(year, month)[1]
-    end = dt.date(year, month, last_day)
-    return start, end
+def _class_scopes():
+    classroom = _get_teacher_class()
+    if not classroom:
+        return None
+    return [class_scope(classroom.id), SETTINGS_SCOPE]
 
 @bp.route("/")
 @role_required("TEACHER")
@@ -48,8 +37,7 @@ def dashboard():
     if not classroom:
         return render_template("teacher/no_class.html")
 
-    student_count = Student.query.filter_by(class_id=classroom.id).count()
-    return render_template("teacher/dashboard.html", classroom=classroom, student_count=student_count)
+    return render_template("teacher/dashboard.html", classroom=classroom, student_count=classroom.student_count)
 
 @bp.route("/students")
 @role_required("TEACHER")
@@ -70,12 +58,12 @@ def students_create():
     if not classroom:
         return render_template("teacher/no_class.html")
 
-    settings = Settings.get_current()
-    max_students = settings.max_students_per_class if settings else 25
-    current_count = Student.query.filter_by(class_id=classroom.id).count()
     if request.method == "POST":
-        if current_count >= max_students:
-            flash(f"Lớp đã đủ {max_students} trẻ.", "danger")
+        # Cheap early exit; the authoritative check is the seat reservation
+        # made when the student is flushed (app.capacity).
+        limit = max_students()
+        if classroom.student_count >= limit:
+            flash(f"Lớp đã đủ {limit} trẻ.", "danger")
             return redirect(url_for("teacher.students_list"))
 
         full_name = request.form.get("full_name", "").strip()
@@ -83,6 +71,7 @@ def students_create():
         gender = request.form.get("gender", "").strip()
         parent_name = request.form.get("parent_name", "").strip()
         parent_phone = request.form.get("parent_phone", "").strip()
+        enrolled = request.form.get("enrolled_on", "").strip()
 
         if not all([full_name, dob, gender, parent_name, parent_phone]):
             flash("Vui lòng nhập đầy đủ thông tin.", "danger")
@@ -94,25 +83,65 @@ def students_create():
             flash("Ngày sinh không hợp lệ.", "danger")
             return render_template("teacher/students/form.html", mode="create", classroom=classroom)
 
+        try:
+            enrolled_on = dt.datetime.strptime(enrolled, "%Y-%m-%d").date() if enrolled else dt.date.today()
+        except Exception:
+            flash("Ngày nhập học không hợp lệ.", "danger")
+            return render_template("teacher/students/form.html", mode="create", classroom=classroom)
+
         st = Student(
             class_id=classroom.id,
             full_name=full_name,
             dob=dob_date,
             gender=gender,
             parent_name=parent_name,
-            parent_phone=parent_phone
+            parent_phone=parent_phone,
+            enrolled_on=enrolled_on
         )
         db.session.add(st)
         try:
             db.session.commit()
             flash("Thêm học sinh thành công.", "success")
             return redirect(url_for("teacher.students_list"))
+        except CapacityError as e:
+            db.session.rollback()
+            flash(f"Lớp đã đủ {e.max_students} trẻ.", "danger")
+            return redirect(url_for("teacher.students_list"))
         except Exception:
             db.session.rollback()
             flash("Không thể thêm học sinh.", "danger")
 
     return render_template("teacher/students/form.html", mode="create", classroom=classroom)
 
+@bp.route("/students/import", methods=["GET", "POST"])
+@role_required("TEACHER")
+def students_import():
+    classroom = _get_teacher_class()
+    if not classroom:
+        return render_template("teacher/no_class.html")
+
+    result = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("Vui lòng chọn tệp CSV.", "danger")
+            return render_template("teacher/students/import.html", classroom=classroom, result=None)
+
+        result = RosterImport(class_id=classroom.id).run(upload.stream)
+        if result.failed:
+            db.session.rollback()
+        else:
+            try:
+                db.session.commit()
+                if result.created:
+                    flash(f"Đã nhập {result.created} học sinh.", "success")
+            except Exception:
+                db.session.rollback()
+                result.created = 0
+                flash("Không thể nhập danh sách học sinh.", "danger")
+
+    return render_template("teacher/students/import.html", classroom=classroom, result=result)
+
 @bp.route("/students/<int:student_id>/edit", methods=["GET", "POST"])
 @role_required("TEACHER")
 def students_edit(student_id):
@@ -131,6 +160,7 @@ def students_edit(student_id):
         gender = request.form.get("gender", "").strip()
         parent_name = request.form.get("parent_name", "").strip()
         parent_phone = request.form.get("parent_phone", "").strip()
+        enrolled = request.form.get("enrolled_on", "").strip()
 
         if not all([full_name, dob, gender, parent_name, parent_phone]):
             flash("Vui lòng nhập đầy đủ thông tin.", "danger")
@@ -142,11 +172,18 @@ def students_edit(student_id):
             flash("Ngày sinh không hợp lệ.", "danger")
             return render_template("teacher/students/form.html", mode="edit", classroom=classroom, student=st)
 
+        try:
+            enrolled_on = dt.datetime.strptime(enrolled, "%Y-%m-%d").date() if enrolled else st.enrolled_on
+        except Exception:
+            flash("Ngày nhập học không hợp lệ.", "danger")
+            return render_template("teacher/students/form.html", mode="edit", classroom=classroom, student=st)
+
         st.full_name = full_name
         st.dob = dob_date
         st.gender = gender
         st.parent_name = parent_name
         st.parent_phone = parent_phone
+        st.enrolled_on = enrolled_on
         try:
             db.session.commit()
             flash("Cập nhật thành công.", "success")
@@ -170,6 +207,11 @@ def students_delete(student_id):
         return redirect(url_for("teacher.students_list"))
 
     try:
+        # Partitioned tables cannot carry the ON DELETE CASCADE foreign keys,
+        # and bulk deletes skip the change-log hook, so tombstone them first.
+        log_bulk_deletes(st.id, st.class_id)
+        for model in (MealLog, HealthRecord, Invoice):
+            model.query.filter(model.student_id == st.id).delete(synchronize_session=False)
         db.session.delete(st)
         db.session.commit()
         flash("Đã xóa học sinh.", "success")
@@ -180,6 +222,7 @@ def students_delete(student_id):
 
 @bp.route("/health")
 @role_required("TEACHER")
+@conditional(_class_scopes)
 def health_list():
     classroom = _get_teacher_class()
     if not classroom:
@@ -194,11 +237,13 @@ def health_list():
     else:
         record_date = dt.date.today()
 
-    students = Student.query.filter_by(class_id=classroom.id).order_by(Student.full_name).all()
-    records = HealthRecord.query.filter(
-        HealthRecord.record_date == record_date,
-        HealthRecord.student_id.in_([s.id for s in students]) if students else False
-    ).all()
+    students = roster(classroom.id)
+    records = (
+        HealthRecord.query.options(lazyload(HealthRecord.student))
+        .join(Student, Student.id == HealthRecord.student_id)
+        .filter(Student.class_id == classroom.id, HealthRecord.record_date == record_date)
+        .all()
+    )
     record_map = {r.student_id: r for r in records}
 
     return render_template("teacher/health/list.html",
@@ -250,6 +295,8 @@ def health_edit(student_id):
         try:
             db.session.commit()
             flash("Lưu ghi nhận sức khỏe thành công.", "success")
+            if temp_val >= fever_threshold():
+                flash("Trẻ bị sốt: hệ thống sẽ gửi thông báo cho phụ huynh.", "warning")
         except Exception:
             db.session.rollback()
             flash("Không thể lưu ghi nhận.", "danger")
@@ -260,6 +307,7 @@ def health_edit(student_id):
 
 @bp.route("/meals", methods=["GET", "POST"])
 @role_required("TEACHER")
+@conditional(_class_scopes)
 def meals_daily():
     classroom = _get_teacher_class()
     if not classroom:
@@ -274,22 +322,17 @@ def meals_daily():
     else:
         log_date = dt.date.today()
 
-    students = Student.query.filter_by(class_id=classroom.id).order_by(Student.full_name).all()
-
-    logs = MealLog.query.filter(
-        MealLog.log_date == log_date,
-        MealLog.student_id.in_([s.id for s in students]) if students else False
-    ).all()
-    log_map = {l.student_id: l for l in logs}
+    students = roster(classroom.id)
+    ate_map = meals.day_status(classroom.id, log_date, [s.id for s in students])
 
     billing_month = log_date.strftime("%Y-%m")
-    student_ids = [s.id for s in students]
     paid_rows = (
         db.session.query(Invoice.student_id)
+        .join(Student, Student.id == Invoice.student_id)
         .filter(
+            Student.class_id == classroom.id,
             Invoice.billing_month == billing_month,
-            Invoice.status == "PAID",
-            Invoice.student_id.in_(student_ids) if student_ids else False
+            Invoice.status == "PAID"
         )
         .all()
     )
@@ -298,15 +341,9 @@ def meals_daily():
 
     if request.method == "POST":
         try:
-            for st in students:
-                if st.id in locked_ids:
-                    continue
-                ate = request.form.get(f"ate_{st.id}") == "1"
-                ml = MealLog.query.filter_by(student_id=st.id, log_date=log_date).first()
-                if ml:
-                    ml.ate = ate
-                else:
-                    db.session.add(MealLog(student_id=st.id, log_date=log_date, ate=ate))
+            meals.save_day(classroom.id, log_date, {
+                st.id: request.form.get(f"ate_{st.id}") == "1" for st in students if st.id not in locked_ids
+            })
             db.session.commit()
             flash("Đã lưu ghi nhận ăn theo ngày.", "success")
         except Exception:
@@ -315,10 +352,11 @@ def meals_daily():
 
         return redirect(url_for("teacher.meals_daily", date=log_date.strftime("%Y-%m-%d")))
 
-    return render_template("teacher/meals/list.html", classroom=classroom, log_date=log_date, students=students, log_map=log_map, locked_ids=locked_ids)
+    return render_template("teacher/meals/list.html", classroom=classroom, log_date=log_date, students=students, ate_map=ate_map, locked_ids=locked_ids)
 
 @bp.route("/tuition")
 @role_required("TEACHER")
+@conditional(_class_scopes)
 def tuition():
     classroom = _get_teacher_class()
     if not classroom:
@@ -330,52 +368,46 @@ def tuition():
     except Exception:
         month = dt.date.today().strftime("%Y-%m")
 
-    students = Student.query.filter_by(class_id=classroom.id).order_by(Student.full_name).all()
-    settings = Settings.get_current()
-    tuition_fee = settings.tuition_fee_monthly if settings else 1500000
-    meal_price = settings.meal_price_per_day if settings else 25000
+    students = roster(classroom.id)
 
-    start, end = _month_range(month)
+    run = BillingRun(month, class_id=classroom.id)
+    draft_map = {d["student_id"]: d for d in compute_invoices(run)}
 
-    meal_counts = (
-        db.session.query(MealLog.student_id, func.count(MealLog.id))
-        .filter(
-            MealLog.ate == True,
-            MealLog.log_date >= start,
-            MealLog.log_date <= end,
-            MealLog.student_id.in_([s.id for s in students]) if students else False
-        )
-        .group_by(MealLog.student_id)
+    invoices = (
+        Invoice.query.options(lazyload(Invoice.student), lazyload(Invoice.collector))
+        .join(Student, Student.id == Invoice.student_id)
+        .filter(Student.class_id == classroom.id, Invoice.billing_month == month)
         .all()
     )
-    meal_map = {sid: int(c) for sid, c in meal_counts}
-
-    invoices = Invoice.query.filter(
-        Invoice.billing_month == month,
-        Invoice.student_id.in_([s.id for s in students]) if students else False
-    ).all()
     inv_map = {inv.student_id: inv for inv in invoices}
 
     rows = []
     for st in students:
         inv = inv_map.get(st.id)
+        draft = draft_map.get(st.id)
 
         if inv and inv.status == "PAID":
             meal_days = inv.meal_days
             tuition_val = inv.tuition_fee
             meal_price_val = inv.meal_unit_price
+            discount = inv.discount_amount
             total = inv.total_amount
+        elif draft:
+            meal_days = draft["meal_days"]
+            tuition_val = draft["tuition_fee"]
+            meal_price_val = draft["meal_unit_price"]
+            discount = draft["discount_amount"]
+            total = draft["total_amount"]
         else:
-            meal_days = meal_map.get(st.id, 0)
-            tuition_val = tuition_fee
-            meal_price_val = meal_price
-            total = tuition_val + meal_days * meal_price_val
+            # Enrolled after this month: listed, but nothing to bill yet.
+            meal_days = tuition_val = meal_price_val = discount = total = None
 
         rows.append({
             "student": st,
             "meal_days": meal_days,
             "tuition_fee": tuition_val,
             "meal_price": meal_price_val,
+            "discount": discount,
             "total": total,
             "invoice": inv
         })
@@ -394,50 +426,56 @@ def invoice_generate(student_id):
         flash("Bạn không có quyền.", "danger")
         return redirect(url_for("teacher.tuition", month=month))
 
-    settings = Settings.get_current()
-    tuition_fee = settings.tuition_fee_monthly if settings else 1500000
-    meal_price = settings.meal_price_per_day if settings else 25000
-
-    start, end = _month_range(month)
-    meal_days = MealLog.query.filter(
-        MealLog.student_id == st.id,
-        MealLog.ate == True,
-        MealLog.log_date >= start,
-        MealLog.log_date <= end
-    ).count()
-    total = tuition_fee + meal_days * meal_price
-
     inv = Invoice.query.filter_by(student_id=st.id, billing_month=month).first()
     if inv and inv.status == "PAID":
         flash("Hóa đơn đã thu, không thể cập nhật.", "warning")
         return redirect(url_for("teacher.tuition", month=month))
 
     try:
-        if inv:
-            inv.tuition_fee = tuition_fee
-            inv.meal_unit_price = meal_price
-            inv.meal_days = meal_days
-            inv.total_amount = total
+        created, updated = generate_invoices(month, class_id=classroom.id, student_ids={st.id})
+        db.session.commit()
+        if created or updated:
+            flash("Đã tạo/cập nhật hóa đơn.", "success")
         else:
-            inv = Invoice(
-                student_id=st.id,
-                billing_month=month,
-                tuition_fee=tuition_fee,
-                meal_unit_price=meal_price,
-                meal_days=meal_days,
-                total_amount=total,
-                status="UNPAID"
-            )
-            db.session.add(inv)
+            flash("Không có hóa đơn nào được tạo (học sinh chưa nhập học trong tháng này).", "warning")
+    except Exception:
+        db.session.rollback()
+        flash("Không thể tạo hóa đơn.", "danger")
+
+    return redirect(url_for("teacher.tuition", month=month))
+
+@bp.route("/tuition/generate-all", methods=["POST"])
+@role_required("TEACHER")
+def invoice_generate_all():
+    classroom = _get_teacher_class()
+    if not classroom:
+        return render_template("teacher/no_class.html")
+
+    month = request.form.get("month") or dt.date.today().strftime("%Y-%m")
+    try:
+        _month_range(month)
+    except Exception:
+        flash("Tháng không hợp lệ.", "danger")
+        return redirect(url_for("teacher.tuition"))
 
+    try:
+        created, updated = generate_invoices(month, class_id=classroom.id)
         db.session.commit()
-        flash("Đã tạo/cập nhật hóa đơn.", "success")
+        flash(f"Đã tạo {created} và cập nhật {updated} hóa đơn.", "success")
     except Exception:
         db.session.rollback()
         flash("Không thể tạo hóa đơn.", "danger")
 
     return redirect(url_for("teacher.tuition", month=month))
 
+def _get_invoice(invoice_id):
+    # Links carry ?month= so a partitioned invoices table reads one partition.
+    q = Invoice.query.filter(Invoice.id == invoice_id)
+    month = request.args.get("month")
+    if month:
+        q = q.filter(Invoice.billing_month == month)
+    return q.first_or_404()
+
 @bp.route("/invoices/<int:invoice_id>")
 @role_required("TEACHER")
 def invoice_detail(invoice_id):
@@ -445,13 +483,54 @@ def invoice_detail(invoice_id):
     if not classroom:
         return render_template("teacher/no_class.html")
 
-    inv = Invoice.query.get_or_404(invoice_id)
+    inv = _get_invoice(invoice_id)
     if inv.student.class_id != classroom.id:
         flash("Bạn không có quyền.", "danger")
         return redirect(url_for("teacher.tuition", month=inv.billing_month))
 
     return render_template("teacher/tuition/detail.html", classroom=classroom, inv=inv)
 
+@bp.route("/invoices/<int:invoice_id>/pdf")
+@role_required("TEACHER")
+def invoice_pdf(invoice_id):
+    classroom = _get_teacher_class()
+    if not classroom:
+        return render_template("teacher/no_class.html")
+
+    inv = _get_invoice(invoice_id)
+    if inv.student.class_id != classroom.id:
+        flash("Bạn không có quyền.", "danger")
+        return redirect(url_for("teacher.tuition", month=inv.billing_month))
+
+    from ..invoice_pdfs import invoice_rows
+    from ..pdf import build_invoice
+    data = next(invoice_rows(inv.billing_month, invoice_id=inv.id))
+
+    return send_file(
+        BytesIO(build_invoice(data)),
+        mimetype='application/pdf',
+        download_name=f'hoa_don_{inv.billing_month}_{inv.id}.pdf'
+    )
+
+@bp.route("/tuition/export-pdf")
+@role_required("TEACHER")
+def tuition_export_pdf():
+    classroom = _get_teacher_class()
+    if not classroom:
+        return redirect(url_for("teacher.dashboard"))
+
+    month = _report_month()
+    from ..invoice_pdfs import count_invoices, export_zip
+    if not count_invoices(month, classroom.id):
+        flash(f"Chưa có hóa đơn tháng {month}.", "warning")
+        return redirect(url_for("teacher.tuition", month=month))
+
+    return Response(
+        stream_with_context(export_zip(month, class_id=classroom.id)),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=hoa_don_lop{classroom.id}_{month}.zip"},
+    )
+
 @bp.route("/invoices/<int:invoice_id>/confirm", methods=["POST"])
 @role_required("TEACHER")
 def invoice_confirm(invoice_id):
@@ -459,14 +538,14 @@ def invoice_confirm(invoice_id):
     if not classroom:
         return render_template("teacher/no_class.html")
 
-    inv = Invoice.query.get_or_404(invoice_id)
+    inv = _get_invoice(invoice_id)
     if inv.student.class_id != classroom.id:
         flash("Bạn không có quyền.", "danger")
         return redirect(url_for("teacher.tuition", month=inv.billing_month))
 
     if inv.status == "PAID":
         flash("Hóa đơn đã thu trước đó.", "info")
-        return redirect(url_for("teacher.invoice_detail", invoice_id=inv.id))
+        return redirect(url_for("teacher.invoice_detail", invoice_id=inv.id, month=inv.billing_month))
 
     inv.status = "PAID"
     inv.paid_at = dt.datetime.now()
@@ -479,7 +558,45 @@ def invoice_confirm(invoice_id):
         db.session.rollback()
         flash("Không thể xác nhận.", "danger")
 
-    return redirect(url_for("teacher.invoice_detail", invoice_id=inv.id))
+    return redirect(url_for("teacher.invoice_detail", invoice_id=inv.id, month=inv.billing_month))
+
+def _class_report(classroom, month):
+    class_id = classroom.id
+    pupils = roster(class_id)
+    r = gather(
+        revenue=lambda s: (
+            s.query(func.sum(Invoice.total_amount))
+            .join(Student, Student.id == Invoice.student_id)
+            .filter(
+                Student.class_id == class_id,
+                Invoice.billing_month == month,
+                Invoice.status == "PAID"
+            )
+            .scalar()
+        ),
+        invs=lambda s: (
+            s.query(Invoice)
+            .join(Student, Student.id == Invoice.student_id)
+            .filter(Student.class_id == class_id, Invoice.billing_month == month)
+            .order_by(Invoice.status, Student.full_name)
+            .all()
+        ),
+    )
+    gender = {"M": 0, "F": 0}
+    for p in pupils:
+        gender[p.gender] += 1
+    r["student_count"] = len(pupils)
+    r["gender"] = gender
+    r["revenue"] = int(r["revenue"] or 0)
+    return r
+
+def _report_month():
+    month = request.args.get("month") or dt.date.today().strftime("%Y-%m")
+    try:
+        _month_range(month)
+    except Exception:
+        month = dt.date.today().strftime("%Y-%m")
+    return month
 
 @bp.route("/reports")
 @role_required("TEACHER")
@@ -488,53 +605,16 @@ def reports():
     if not classroom:
         return render_template("teacher/no_class.html")
 
-    month = request.args.get("month") or dt.date.today().strftime("%Y-%m")
-    try:
-        start, end = _month_range(month)
-    except Exception:
-        month = dt.date.today().strftime("%Y-%m")
-        start, end = _month_range(month)
-
-    students = Student.query.filter_by(class_id=classroom.id).all()
-    student_count = len(students)
-
-    gender_counts = (
-        db.session.query(Student.gender, func.count(Student.id))
-        .filter(Student.class_id == classroom.id)
-        .group_by(Student.gender)
-        .all()
-    )
-    gender = {"M": 0, "F": 0}
-    for g, c in gender_counts:
-        gender[g] = int(c)
-
-    revenue = (
-        db.session.query(func.sum(Invoice.total_amount))
-        .join(Student, Student.id == Invoice.student_id)
-        .filter(
-            Student.class_id == classroom.id,
-            Invoice.billing_month == month,
-            Invoice.status == "PAID"
-        )
-        .scalar()
-    )
-    revenue = int(revenue or 0)
-
-    invs = (
-        Invoice.query
-        .join(Student, Student.id == Invoice.student_id)
-        .filter(Student.class_id == classroom.id, Invoice.billing_month == month)
-        .order_by(Invoice.status, Student.full_name)
-        .all()
-    )
+    month = _report_month()
+    r = _class_report(classroom, month)
 
     return render_template("teacher/reports.html",
                            classroom=classroom,
                            month=month,
-                           student_count=student_count,
-                           gender=gender,
-                           revenue=revenue,
-                           invs=invs)
+                           student_count=r["student_count"],
+                           gender=r["gender"],
+                           revenue=r["revenue"],
+                           invs=r["invs"])
 
 @bp.route("/reports/export-pdf")
 @role_required("TEACHER")
@@ -543,139 +623,12 @@ def export_reports_pdf():
     if not classroom:
         return redirect(url_for("teacher.dashboard"))
 
-    month = request.args.get("month") or dt.date.today().strftime("%Y-%m")
-    try:
-        start, end = _month_range(month)
-    except Exception:
-        month = dt.date.today().strftime("%Y-%m")
-        start, end = _month_range(month)
-
-    students = Student.query.filter_by(class_id=classroom.id).all()
-    student_count = len(students)
-
-    gender_counts = (
-        db.session.query(Student.gender, func.count(Student.id))
-        .filter(Student.class_id == classroom.id)
-        .group_by(Student.gender)
-        .all()
-    )
-    gender = {"M": 0, "F": 0}
-    for g, c in gender_counts:
-        gender[g] = int(c)
-
-    revenue = (
-        db.session.query(func.sum(Invoice.total_amount))
-        .join(Student, Student.id == Invoice.student_id)
-        .filter(
-            Student.class_id == classroom.id,
-            Invoice.billing_month == month,
-            Invoice.status == "PAID"
-        )
-        .scalar()
-    )
-    revenue = int(revenue or 0)
-
-    invs = (
-        Invoice.query
-        .join(Student, Student.id == Invoice.student_id)
-        .filter(Student.class_id == classroom.id, Invoice.billing_month == month)
-        .order_by(Invoice.status, Student.full_name)
-        .all()
-    )
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    font_name, font_bold = register_fonts()
-    
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#0066cc'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName=font_bold
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#333333'),
-        spaceAfter=12,
-        spaceBefore=20,
-        fontName=font_bold
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontName=font_name,
-        fontSize=10
-    )
-    
-    elements.append(Paragraph(f"BÁO CÁO THÁNG {month}", title_style))
-    elements.append(Paragraph(f"Lớp: {classroom.name}", normal_style))
-    elements.append(Paragraph(f"Giáo viên: {current_user.full_name}", normal_style))
-    elements.append(Paragraph(f"Ngày xuất: {dt.date.today().strftime('%d/%m/%Y')}", normal_style))
-    elements.append(Spacer(1, 20))
-    
-    elements.append(Paragraph("TỔNG QUAN LỚP HỌC", heading_style))
-    overview_data = [
-        ['Chỉ tiêu', 'Giá trị'],
-        ['Sĩ số lớp', str(student_count)],
-        ['Số học sinh nam', str(gender['M'])],
-        ['Số học sinh nữ', str(gender['F'])],
-        [f'Doanh thu tháng {month}', f"{revenue:,} VND"],
-    ]
-    overview_table = Table(overview_data, colWidths=[10*cm, 6*cm])
-    overview_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), font_bold),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), font_name),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-    ]))
-    elements.append(overview_table)
-    elements.append(Spacer(1, 20))
-    
-    elements.append(Paragraph(f"HÓA ĐƠN THÁNG {month}", heading_style))
-    invoice_data = [['Học sinh', 'Tổng tiền (VND)', 'Trạng thái', 'Ngày thu']]
-    for inv in invs:
-        status = "Đã thu" if inv.status == "PAID" else "Chưa thu"
-        paid_date = inv.paid_at.strftime('%d/%m/%Y %H:%M') if inv.paid_at else '-'
-        invoice_data.append([
-            inv.student.full_name,
-            f"{inv.total_amount:,}",
-            status,
-            paid_date
-        ])
-    
-    invoice_table = Table(invoice_data, colWidths=[5*cm, 4*cm, 3*cm, 4*cm])
-    invoice_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), font_bold),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), font_name),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-    ]))
-    elements.append(invoice_table)
+    month = _report_month()
+    r = _class_report(classroom, month)
     
-    doc.build(elements)
-    buffer.seek(0)
+    from ..pdf import build_teacher_report
+    buffer = build_teacher_report(classroom, current_user.full_name, month, r["student_count"], r["gender"],
+                                  r["revenue"], r["invs"])
     
     return send_file(
         buffer,
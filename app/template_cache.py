@@ -0,0 +1,67 @@
+"""Compiled templates that survive worker restarts.
+
+Jinja compiles a template to Python on first use, per process, so every
+fresh gunicorn worker paid for compiling base.html and the page on its first
+hits. Two things remove that:
+
+* a FileSystemBytecodeCache shared by all workers and kept across deploys;
+  Jinja checks each entry against the template source, so an edited
+  template is recompiled once and never served stale;
+* ``warm_up`` loading every template at start-up when ``JINJA_WARM_UP`` is
+  set, which gunicorn.conf.py does for the web server only. With
+  ``preload_app`` it runs once in the master and forked workers inherit
+  the compiled templates; without it each worker loads them from the
+  bytecode cache.
+
+``flask templates compile`` fills the bytecode cache as a deploy step.
+"""
+import os
+import time
+
+import click
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache
+
+def warm_up(app):
+    """Compile (or load from the bytecode cache) every HTML template; returns the count."""
+    env = app.jinja_env
+    names = [n for n in env.list_templates() if n.endswith(".html")]
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+cli = AppGroup("templates", help="Jinja template cache.")
+
+@cli.command("compile")
+def compile_command():
+    """Precompile every template into the bytecode cache."""
+    from flask import current_app
+
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.ClickException("JINJA_BYTECODE_CACHE_DIR is empty; the bytecode cache is off")
+    # create_app may already have warmed the in-memory cache; start from source.
+    current_app.jinja_env.bytecode_cache.clear()
+    if current_app.jinja_env.cache is not None:
+        current_app.jinja_env.cache.clear()
+    t0 = time.perf_counter()
+    n = warm_up(current_app)
+    click.echo(f"{n} templates compiled into {current_app.config['JINJA_BYTECODE_CACHE_DIR']} "
+               f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+def init_app(app):
+    if app.config.get("JINJA_BYTECODE_CACHE_DIR") is None:
+        app.config["JINJA_BYTECODE_CACHE_DIR"] = os.path.join(app.instance_path, "jinja_cache")
+    app.config.setdefault("JINJA_WARM_UP", False)
+
+    cache_dir = app.config["JINJA_BYTECODE_CACHE_DIR"]
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError as e:
+            app.logger.warning("Jinja bytecode cache off, cannot create %s: %s", cache_dir, e)
+        else:
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    app.cli.add_command(cli)
+
+    if app.config["JINJA_WARM_UP"]:
+        warm_up(app)
@@ -2,6 +2,8 @@ from functools import wraps
 from flask import abort, flash, redirect, url_for, request, render_template
 from flask_login import current_user
 
+HOME_ENDPOINTS = {"ADMIN": "admin.dashboard", "TEACHER": "teacher.dashboard", "PARENT": "parent.dashboard"}
+
 def role_required(*roles):
     def decorator(f):
         @wraps(f)
@@ -25,4 +27,12 @@ def register_error_handlers(app):
 
     @app.errorhandler(500)
     def server_error(e):
+        # Flask has already logged the traceback; keep who hit it and where.
+        from .audit import record
+        original = getattr(e, "original_exception", None) or e
+        try:
+            record("error", diff={"error": f"{type(original).__name__}: {original}"[:500],
+                                  "method": request.method, "path": request.full_path[:255]})
+        except Exception:
+            app.logger.exception("audit: could not record the error")
         return render_template("errors/500.html"), 500
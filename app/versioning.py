@@ -0,0 +1,135 @@
+import hashlib
+import datetime as dt
+from functools import wraps
+
+from flask import request, session, make_response
+from flask_login import current_user
+from sqlalchemy import event, func, inspect, select
+
+from .extensions import db
+from .models import Class, Student, Settings, HealthRecord, MealLog, MealDay, Invoice, DataVersion
+
+SETTINGS_SCOPE = "settings"
+
+def class_scope(class_id):
+    return f"class:{class_id}"
+
+def roster_scope(class_id):
+    # Only student writes move it; see app.roster.
+    return f"roster:{class_id}"
+
+def _upsert_increment(conn, scopes):
+    table = DataVersion.__table__
+    rows = [{"scope": s, "version": 1} for s in sorted(scopes)]
+    if conn.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(version=table.c.version + 1)
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.scope], set_={"version": table.c.version + 1})
+    conn.execute(stmt)
+
+def bump(*scopes):
+    """Bump scopes inside the current transaction.
+
+    Needed after bulk writes (``bulk_*_mappings``, ``Query.update``) which
+    bypass the flush hook below.
+    """
+    if scopes:
+        _upsert_increment(db.session.connection(), scopes)
+
+def bump_classes(class_ids):
+    bump(*(scope for cid in set(class_ids) for scope in (class_scope(cid), roster_scope(cid))))
+
+def bump_all_classes():
+    bump_classes(cid for (cid,) in db.session.query(Class.id).all())
+
+def get_versions(scopes):
+    rows = db.session.query(DataVersion.scope, DataVersion.version).filter(DataVersion.scope.in_(list(scopes))).all()
+    found = dict(rows)
+    return tuple(found.get(s, 0) for s in scopes)
+
+def school_version():
+    """One value that changes whenever any scope changes."""
+    count, total = db.session.query(func.count(DataVersion.scope), func.sum(DataVersion.version)).one()
+    return int(count or 0), int(total or 0)
+
+def _changed_scopes(session):
+    scopes = set()
+    student_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Student):
+            if obj.class_id is not None:
+                scopes.update((class_scope(obj.class_id), roster_scope(obj.class_id)))
+            hist = inspect(obj).attrs.class_id.history
+            for old in hist.deleted or ():
+                if old is not None:
+                    scopes.update((class_scope(old), roster_scope(old)))
+        elif isinstance(obj, (MealLog, HealthRecord, Invoice)):
+            if obj.student_id is not None:
+                student_ids.add(obj.student_id)
+        elif isinstance(obj, Class):
+            if obj.id is not None:
+                scopes.add(class_scope(obj.id))
+        elif isinstance(obj, MealDay):
+            scopes.add(class_scope(obj.class_id))
+        elif isinstance(obj, Settings):
+            scopes.add(SETTINGS_SCOPE)
+
+    if student_ids:
+        rows = session.connection().execute(
+            select(Student.class_id).where(Student.id.in_(student_ids)).distinct()
+        )
+        scopes.update(class_scope(cid) for (cid,) in rows)
+    return scopes
+
+def _bump_on_flush(session, flush_context):
+    scopes = _changed_scopes(session)
+    if scopes:
+        _upsert_increment(session.connection(), scopes)
+
+def init_app(app):
+    if not event.contains(db.session, "after_flush", _bump_on_flush):
+        event.listen(db.session, "after_flush", _bump_on_flush)
+
+def conditional(scopes):
+    """Answer GET requests with 304 while the given data scopes are unchanged.
+
+    ``scopes`` is called before the view runs and returns a list of scope
+    names, ``"school"`` for the sum of every scope, or ``None`` to skip
+    conditional handling (e.g. a teacher without a class). The ETag also
+    covers the user, endpoint, query string and today's date, since several
+    pages default to today, and the scope names themselves: a teacher moved
+    to a class whose versions happen to match must not get the old page.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD") or "_flashes" in session:
+                return f(*args, **kwargs)
+
+            names = scopes()
+            if names is None:
+                return f(*args, **kwargs)
+            versions = school_version() if names == "school" else get_versions(names)
+
+            key = "|".join(map(str, (
+                request.endpoint, current_user.get_id(), sorted(request.args.items(multi=True)),
+                names, versions, dt.date.today(),
+            )))
+            etag = hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
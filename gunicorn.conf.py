@@ -0,0 +1,45 @@
+"""Gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every value can be tuned through an environment variable.
+"""
+import os
+import multiprocessing
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", "2"))
+worker_class = "gthread" if threads > 1 else "sync"
+
+# Import the app once in the master so workers share its memory pages
+# copy-on-write and boot faster.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+# Compile every template while the app loads (once in the master with
+# preload_app). CLI and cron runs of the app leave it off.
+os.environ.setdefault("JINJA_WARM_UP", "1")
+
+# Recycle workers periodically to bound slow memory growth; the jitter keeps
+# them from all restarting at once.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = os.environ.get("GUNICORN_ERROR_LOG", "-")
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+def post_fork(server, worker):
+    # Pooled DB connections opened in the master (e.g. during preload) must
+    # not be shared with the forked worker. close=False leaves the parent's
+    # sockets alone and only drops them from this process's pool.
+    from app.extensions import db
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,14 @@
+USE `kindergarten_db`;
+
+ALTER TABLE `students`
+  ADD COLUMN `enrolled_on` date DEFAULT NULL AFTER `parent_phone`;
+
+ALTER TABLE `classes`
+  ADD COLUMN `tuition_fee_override` int unsigned DEFAULT NULL,
+  ADD COLUMN `meal_price_override` int unsigned DEFAULT NULL;
+
+ALTER TABLE `settings`
+  ADD COLUMN `sibling_discount_percent` int unsigned NOT NULL DEFAULT '0';
+
+ALTER TABLE `invoices`
+  ADD COLUMN `discount_amount` int unsigned NOT NULL DEFAULT '0' AFTER `meal_days`;
@@ -0,0 +1,7 @@
+USE `kindergarten_db`;
+
+CREATE TABLE IF NOT EXISTS `data_versions` (
+  `scope` varchar(64) NOT NULL,
+  `version` bigint unsigned NOT NULL DEFAULT '0',
+  PRIMARY KEY (`scope`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,17 @@
+USE `kindergarten_db`;
+
+ALTER TABLE `students`
+  ADD COLUMN `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  ADD KEY `idx_students_updated_at` (`updated_at`);
+
+ALTER TABLE `health_records`
+  ADD COLUMN `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  ADD KEY `idx_health_updated_at` (`updated_at`);
+
+ALTER TABLE `meal_logs`
+  ADD COLUMN `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  ADD KEY `idx_meal_updated_at` (`updated_at`);
+
+ALTER TABLE `invoices`
+  ADD COLUMN `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  ADD KEY `idx_invoices_updated_at` (`updated_at`);
@@ -0,0 +1,12 @@
+USE `kindergarten_db`;
+
+CREATE TABLE IF NOT EXISTS `change_log` (
+  `id` bigint unsigned NOT NULL AUTO_INCREMENT,
+  `entity` enum('student','meal','health','invoice') NOT NULL,
+  `entity_id` bigint unsigned NOT NULL,
+  `class_id` int unsigned NOT NULL,
+  `op` enum('U','D') NOT NULL,
+  `changed_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `idx_change_log_class` (`class_id`,`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,7 @@
+USE `kindergarten_db`;
+
+ALTER TABLE `classes`
+  ADD COLUMN `student_count` int NOT NULL DEFAULT 0;
+
+UPDATE `classes` c
+  SET c.`student_count` = (SELECT COUNT(*) FROM `students` s WHERE s.`class_id` = c.`id`);
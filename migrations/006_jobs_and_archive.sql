@@ -0,0 +1,34 @@
+USE `kindergarten_db`;
+
+CREATE TABLE IF NOT EXISTS `meal_logs_archive` (
+  `id` bigint unsigned NOT NULL,
+  `student_id` int unsigned NOT NULL,
+  `log_date` date NOT NULL,
+  `ate` tinyint(1) NOT NULL,
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_meal_archive_student` (`student_id`),
+  KEY `idx_meal_archive_date` (`log_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `health_records_archive` (
+  `id` bigint unsigned NOT NULL,
+  `student_id` int unsigned NOT NULL,
+  `record_date` date NOT NULL,
+  `weight_kg` decimal(5,2) DEFAULT NULL,
+  `temperature_c` decimal(4,1) NOT NULL,
+  `note` varchar(255) DEFAULT NULL,
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_health_archive_student` (`student_id`),
+  KEY `idx_health_archive_date` (`record_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `job_runs` (
+  `name` varchar(64) NOT NULL,
+  `last_run_at` datetime DEFAULT NULL,
+  `last_success_at` datetime DEFAULT NULL,
+  `last_status` enum('ok','error') DEFAULT NULL,
+  `last_detail` varchar(255) DEFAULT NULL,
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,31 @@
+USE `kindergarten_db`;
+
+-- MySQL requires every unique key of a partitioned table to contain the
+-- partitioning column, and does not allow foreign keys on partitioned
+-- tables. The app now deletes a student's meals, health records and
+-- invoices itself, and clears invoices.collected_by when a teacher is
+-- removed.
+--
+-- After this file, create the monthly partitions with:
+--   flask --app wsgi partitions init
+-- The daily `jobs due` cron entry then keeps three months of future
+-- partitions in place.
+
+ALTER TABLE `meal_logs`
+  DROP FOREIGN KEY `fk_meal_student`,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`id`, `log_date`),
+  ADD KEY `idx_meal_student` (`student_id`);
+
+ALTER TABLE `health_records`
+  DROP FOREIGN KEY `fk_health_student`,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`id`, `record_date`),
+  ADD KEY `idx_health_student` (`student_id`);
+
+ALTER TABLE `invoices`
+  DROP FOREIGN KEY `fk_invoice_student`,
+  DROP FOREIGN KEY `fk_invoices_collected_by`,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`id`, `billing_month`),
+  DROP KEY `idx_invoices_month_status`;
@@ -0,0 +1,15 @@
+USE `kindergarten_db`;
+
+CREATE TABLE IF NOT EXISTS `meal_counts` (
+  `log_date` date NOT NULL,
+  `class_id` int unsigned NOT NULL,
+  `eaters` int NOT NULL DEFAULT 0,
+  `logged` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`log_date`, `class_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT INTO `meal_counts` (`log_date`, `class_id`, `eaters`, `logged`)
+SELECT m.`log_date`, s.`class_id`, SUM(m.`ate`), COUNT(*)
+  FROM `meal_logs` m JOIN `students` s ON s.`id` = m.`student_id`
+ GROUP BY m.`log_date`, s.`class_id`
+ON DUPLICATE KEY UPDATE `eaters` = VALUES(`eaters`), `logged` = VALUES(`logged`);
@@ -0,0 +1,17 @@
+USE `kindergarten_db`;
+
+CREATE TABLE IF NOT EXISTS `fever_alerts` (
+  `id` bigint unsigned NOT NULL AUTO_INCREMENT,
+  `student_id` int unsigned NOT NULL,
+  `alert_date` date NOT NULL,
+  `temperature_c` decimal(4,1) NOT NULL,
+  `status` enum('PENDING','SENT','FAILED') NOT NULL DEFAULT 'PENDING',
+  `attempts` int NOT NULL DEFAULT 0,
+  `next_attempt_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `last_error` varchar(255) DEFAULT NULL,
+  `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `sent_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_fever_student_date` (`student_id`, `alert_date`),
+  KEY `idx_fever_pending` (`status`, `next_attempt_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,30 @@
+USE `kindergarten_db`;
+
+ALTER TABLE `users`
+  MODIFY `role` enum('ADMIN','TEACHER','PARENT') NOT NULL;
+
+CREATE TABLE IF NOT EXISTS `parent_students` (
+  `user_id` int unsigned NOT NULL,
+  `student_id` int unsigned NOT NULL,
+  PRIMARY KEY (`user_id`, `student_id`),
+  KEY `idx_parent_students_student` (`student_id`),
+  CONSTRAINT `fk_parent_students_user` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `fk_parent_students_student` FOREIGN KEY (`student_id`) REFERENCES `students` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Filled by `flask rollups rebuild student_summaries` (and kept current on writes).
+CREATE TABLE IF NOT EXISTS `student_summaries` (
+  `student_id` int unsigned NOT NULL,
+  `full_name` varchar(100) NOT NULL,
+  `class_name` varchar(100) NOT NULL,
+  `month` char(7) NOT NULL,
+  `meal_days` int NOT NULL DEFAULT 0,
+  `meals_logged` int NOT NULL DEFAULT 0,
+  `last_meal_date` date DEFAULT NULL,
+  `last_meal_ate` tinyint(1) DEFAULT NULL,
+  `unpaid_total` int NOT NULL DEFAULT 0,
+  `invoices` json NOT NULL,
+  `health` json NOT NULL,
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`student_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
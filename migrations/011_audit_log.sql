@@ -0,0 +1,18 @@
+USE `kindergarten_db`;
+
+CREATE TABLE IF NOT EXISTS `audit_log` (
+  `id` bigint unsigned NOT NULL AUTO_INCREMENT,
+  `created_at` datetime NOT NULL,
+  `actor_id` int unsigned DEFAULT NULL,
+  `actor` varchar(50) DEFAULT NULL,
+  `action` varchar(32) NOT NULL,
+  `entity` varchar(64) DEFAULT NULL,
+  `entity_id` bigint unsigned DEFAULT NULL,
+  `diff` json DEFAULT NULL,
+  `endpoint` varchar(64) DEFAULT NULL,
+  `ip` varchar(45) DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_audit_entity` (`entity`, `entity_id`),
+  KEY `idx_audit_actor` (`actor_id`, `id`),
+  KEY `idx_audit_created` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,17 @@
+USE `kindergarten_db`;
+
+-- Per-class "meals recorded for this day" markers for MEAL_STORAGE=sparse,
+-- where meal_logs keeps only the children who did not eat. Creating the
+-- table is harmless in the default dense mode. To switch an existing
+-- school, run (in a quiet hour) and then set MEAL_STORAGE=sparse:
+--   flask --app wsgi meals compact
+-- `flask --app wsgi meals expand` converts back before setting it to dense.
+
+CREATE TABLE IF NOT EXISTS `meal_days` (
+  `class_id` int unsigned NOT NULL,
+  `log_date` date NOT NULL,
+  `recorded_at` datetime NOT NULL,
+  PRIMARY KEY (`class_id`, `log_date`),
+  KEY `idx_meal_days_date` (`log_date`),
+  CONSTRAINT `fk_meal_days_class` FOREIGN KEY (`class_id`) REFERENCES `classes` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,109 @@
+"""Shared helpers for the benchmark scripts in this folder.
+
+Benchmarks run against a throwaway SQLite file unless ``DATABASE_URL`` is
+set, so they can be run on a laptop without the school's MySQL server.
+"""
+import os
+import sys
+import time
+import atexit
+import random
+import datetime as dt
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+if "DATABASE_URL" not in os.environ:
+    _fd, _path = tempfile.mkstemp(suffix=".db", prefix="kg_bench_")
+    os.close(_fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{_path}"
+    atexit.register(os.remove, _path)
+
+    from sqlalchemy import BigInteger
+    from sqlalchemy.ext.compiler import compiles
+
+    # SQLite only auto-increments INTEGER PRIMARY KEY columns.
+    @compiles(BigInteger, "sqlite")
+    def _bigint_as_integer(type_, compiler, **kw):
+        return "INTEGER"
+
+def make_app(create_all=True):
+    """The app for ``DATABASE_URL``; ``create_all=False`` leaves its schema untouched."""
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app()
+    if create_all:
+        with app.app_context():
+            db.create_all()
+    return app
+
+def seed_school(classes=40, per_class=25, month=None, seed=1, meals=True):
+    """Insert a synthetic school: classes, teachers, students and a month of meals."""
+    from app.extensions import db
+    from app.models import User, Class, Student, Settings, MealLog
+    from app.billing import month_range
+    from app.capacity import recount
+    from app.kitchen import recount as kitchen_recount
+
+    rnd = random.Random(seed)
+    month = month or dt.date.today().strftime("%Y-%m")
+    start, end = month_range(month)
+
+    if not Settings.get_current():
+        db.session.add(Settings(id=1, tuition_fee_monthly=1500000, meal_price_per_day=25000,
+                                max_students_per_class=per_class + 5, sibling_discount_percent=10))
+
+    teachers = []
+    for i in range(classes):
+        t = User(username=f"bench_teacher{i}", role="TEACHER", full_name=f"Giáo viên {i}",
+                 password_hash="x")
+        teachers.append(t)
+    db.session.add_all(teachers)
+    db.session.flush()
+
+    class_rows = [Class(name=f"Lớp {i}", teacher_id=t.id) for i, t in enumerate(teachers)]
+    db.session.add_all(class_rows)
+    db.session.flush()
+
+    students = []
+    for c in class_rows:
+        for j in range(per_class):
+            phone = f"09{rnd.randrange(10 ** 8):08d}" if rnd.random() > 0.1 else "0900000001"
+            enrolled = start + dt.timedelta(days=rnd.randrange(28)) if rnd.random() < 0.05 else None
+            students.append(dict(class_id=c.id, full_name=f"Học sinh {c.id}-{j}", dob=dt.date(2021, 1, 1),
+                                 gender=rnd.choice("MF"), parent_name="Phụ huynh", parent_phone=phone,
+                                 enrolled_on=enrolled))
+    db.session.bulk_insert_mappings(Student, students)
+    recount([c.id for c in class_rows])
+    db.session.flush()
+
+    if not meals:
+        db.session.commit()
+        return month
+
+    ids = [sid for (sid,) in db.session.query(Student.id).all()]
+    day = start
+    logs = []
+    while day <= end:
+        if day.weekday() < 5:
+            for sid in ids:
+                logs.append(dict(student_id=sid, log_date=day, ate=rnd.random() > 0.08))
+        day += dt.timedelta(days=1)
+    db.session.bulk_insert_mappings(MealLog, logs)
+    kitchen_recount()
+    db.session.commit()
+    return month
+
+class Timer:
+    def __init__(self, label):
+        self.label = label
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.t0
+        print(f"{self.label:<40} {self.elapsed * 1000:10.1f} ms")
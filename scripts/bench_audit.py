@@ -0,0 +1,61 @@
+"""Benchmark: cost of auditing a write, queued vs. an INSERT in the request.
+
+    python scripts/bench_audit.py [writes] [latency_ms]
+
+Each write renames a student and commits, as the teacher edit page does.
+``latency_ms`` (default 1) sleeps before each statement to stand in for
+the round trip to MySQL, which a local SQLite file does not have.
+"""
+import sys
+import time
+import statistics
+
+from sqlalchemy import event
+
+from _bench import make_app, seed_school
+
+def main(writes=500, latency_ms=1):
+    app = make_app()
+    from app import audit
+    from app.extensions import db
+    from app.models import Student, AuditLog
+
+    with app.app_context():
+        seed_school(classes=2, per_class=25, meals=False)
+        ids = [sid for (sid,) in db.session.query(Student.id)]
+        if latency_ms:
+            @event.listens_for(db.engine, "before_cursor_execute")
+            def _latency(*args):
+                time.sleep(latency_ms / 1000)
+        queued = app.extensions["audit"]
+
+        def run(label):
+            times = []
+            for i in range(writes):
+                t0 = time.perf_counter()
+                student = db.session.get(Student, ids[i % len(ids)])
+                student.full_name = f"Học sinh {label} {i}"
+                db.session.commit()
+                times.append((time.perf_counter() - t0) * 1000)
+            print(f"{label:<28} {statistics.fmean(times):7.3f} ms mean, p95 {statistics.quantiles(times, n=20)[18]:.3f} ms")
+            return statistics.fmean(times)
+
+        hooks = [("after_flush", audit._collect_on_flush), ("after_commit", audit._submit_on_commit),
+                 ("after_rollback", audit._discard_on_rollback)]
+        for name, fn in hooks:
+            event.remove(db.session, name, fn)
+        base = run("no audit")
+        for name, fn in hooks:
+            event.listen(db.session, name, fn)
+
+        app.extensions["audit"] = audit._SyncWriter(app)
+        inline = run("audit, INSERT per commit")
+        app.extensions["audit"] = queued
+        before = AuditLog.query.count()
+        background = run("audit, background writer")
+        queued.close()
+        print(f"added per write: inline {(inline - base) * 1000:.0f} us, queued {(background - base) * 1000:.0f} us; "
+              f"{AuditLog.query.count() - before} events written by the background writer")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
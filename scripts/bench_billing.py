@@ -0,0 +1,62 @@
+"""Benchmark: batch invoice generation vs. the old per-student loop.
+
+    python scripts/bench_billing.py [classes] [students_per_class]
+"""
+import sys
+
+from _bench import make_app, seed_school, Timer
+
+def per_student(month):
+    from app.extensions import db
+    from app.models import Student, Settings, MealLog, Invoice
+    from app.billing import month_range
+
+    start, end = month_range(month)
+    for st in Student.query.all():
+        settings = Settings.get_current()
+        meal_days = MealLog.query.filter(
+            MealLog.student_id == st.id,
+            MealLog.ate == True,
+            MealLog.log_date >= start,
+            MealLog.log_date <= end
+        ).count()
+        total = settings.tuition_fee_monthly + meal_days * settings.meal_price_per_day
+        inv = Invoice.query.filter_by(student_id=st.id, billing_month=month).first()
+        if not inv:
+            db.session.add(Invoice(student_id=st.id, billing_month=month,
+                                   tuition_fee=settings.tuition_fee_monthly,
+                                   meal_unit_price=settings.meal_price_per_day,
+                                   meal_days=meal_days, total_amount=total, status="UNPAID"))
+    db.session.commit()
+
+def main():
+    classes = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    per_class = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    from app.extensions import db
+    from app.models import Invoice
+    from app.billing import generate_invoices
+
+    app = make_app()
+    with app.app_context():
+        month = seed_school(classes, per_class)
+        print(f"{classes} classes x {per_class} students, month {month}")
+
+        with Timer("per-student loop (legacy)"):
+            per_student(month)
+        Invoice.query.delete()
+        db.session.commit()
+
+        with Timer("batch engine, insert"):
+            generate_invoices(month)
+            db.session.commit()
+        with Timer("batch engine, refresh"):
+            generate_invoices(month)
+            db.session.commit()
+
+        with Timer("batch engine, one class"):
+            generate_invoices(month, class_id=1)
+            db.session.commit()
+
+if __name__ == "__main__":
+    main()
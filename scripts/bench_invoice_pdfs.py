@@ -0,0 +1,33 @@
+"""Benchmark: month-end receipt ZIP rendered in-process vs. on the process pool.
+
+    python scripts/bench_invoice_pdfs.py [classes] [workers]
+"""
+import os
+import sys
+import resource
+
+from _bench import make_app, seed_school, Timer
+
+def main(classes=40, workers=4):
+    app = make_app()
+    from app.extensions import db
+    from app.billing import generate_invoices
+    from app.invoice_pdfs import export_zip
+
+    with app.app_context():
+        month = seed_school(classes=classes, per_class=25)
+        generate_invoices(month)
+        db.session.commit()
+
+    for n in (1, workers):
+        with app.test_request_context():
+            size = 0
+            with Timer(f"{classes * 25} receipts, {n} worker(s)"):
+                for chunk in export_zip(month, workers=n):
+                    size += len(chunk)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+        print(f"{'':<40} {size / 1e6:10.1f} MB zip, peak web-process RSS {rss} MB")
+    print(f"({os.cpu_count()} CPUs)")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
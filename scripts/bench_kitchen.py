@@ -0,0 +1,54 @@
+"""Benchmark: kitchen headcount from meal_counts vs. aggregating meal_logs per refresh.
+
+    python scripts/bench_kitchen.py [classes]
+"""
+import sys
+import time
+import statistics
+import datetime as dt
+
+from _bench import make_app, seed_school
+
+RUNS = 50
+
+def main(classes=40):
+    app = make_app()
+    from app.extensions import db
+    from app.models import Class, Student, MealLog
+    from app.kitchen import headcount
+    from sqlalchemy import func, case
+
+    with app.app_context():
+        month = seed_school(classes=classes, per_class=25)
+        # A school day inside the seeded month.
+        day = dt.date.fromisoformat(f"{month}-01")
+        while day.weekday() >= 5:
+            day += dt.timedelta(days=1)
+
+        def aggregate():
+            return (
+                db.session.query(Class.id, Class.name, func.count(MealLog.id),
+                                 func.sum(case((MealLog.ate == True, 1), else_=0)))
+                .outerjoin(Student, Student.class_id == Class.id)
+                .outerjoin(MealLog, (MealLog.student_id == Student.id) & (MealLog.log_date == day))
+                .group_by(Class.id, Class.name)
+                .all()
+            )
+
+        def run(label, fn):
+            times = []
+            for _ in range(RUNS):
+                t0 = time.perf_counter()
+                fn()
+                times.append((time.perf_counter() - t0) * 1000)
+            print(f"{label:<40} {statistics.median(times):10.2f} ms median, {max(times):.2f} ms max")
+
+        meals = db.session.query(func.count(MealLog.id)).scalar()
+        print(f"{classes} classes, {meals} meal_logs rows")
+        run("aggregate meal_logs", aggregate)
+        run("meal_counts (headcount)", lambda: headcount(day))
+        agg = {cid: int(e or 0) for cid, _, _, e in aggregate()}
+        assert agg == {c["id"]: c["eaters"] for c in headcount(day)[0]}
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,53 @@
+"""Benchmark: login cost per hash method, and a credential-stuffing burst
+with and without the login rate limiter.
+
+    python scripts/bench_login.py [burst_attempts]
+"""
+import sys
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from _bench import make_app, Timer
+
+METHODS = ["scrypt:32768:8:1", "pbkdf2:sha256:600000", "pbkdf2:sha256:260000", "scrypt:16384:8:1"]
+
+def main(burst=200):
+    print("check_password_hash cost per method (one core):")
+    for method in METHODS:
+        stored = generate_password_hash("secret", method=method)
+        n = 10
+        t0 = time.perf_counter()
+        for _ in range(n):
+            check_password_hash(stored, "secret")
+        ms = (time.perf_counter() - t0) * 1000 / n
+        print(f"  {method:<24} {ms:8.1f} ms/login  {1000 / ms:8.1f} logins/s")
+
+    app = make_app()
+    app.config["TESTING"] = True
+    from app.extensions import db
+    from app.models import User
+
+    with app.app_context():
+        victim = User(username="victim", role="TEACHER", full_name="Giáo viên")
+        victim.set_password("correct horse")
+        db.session.add(victim)
+        db.session.commit()
+
+    print(f"\n{burst} wrong-password POSTs /login from one IP:")
+    for backend in ("none", "memory"):
+        from app import ratelimit
+        app.config["RATELIMIT_BACKEND"] = backend
+        ratelimit.init_app(app)
+        client = app.test_client()
+        blocked = 0
+        cpu0 = time.process_time()
+        with Timer(f"  limiter={backend}") as t:
+            for i in range(burst):
+                r = client.post("/login", data={"username": "victim", "password": f"guess{i}"})
+                blocked += r.status_code == 429
+        cpu = time.process_time() - cpu0
+        print(f"  {'':<40} {blocked} blocked, {cpu:.2f}s CPU, {burst / t.elapsed:.0f} attempts/s served")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,100 @@
+"""Benchmark: meal_logs size and billing query time, dense vs. sparse storage.
+
+    python scripts/bench_meal_storage.py [classes] [students_per_class] [months]
+
+Seeds ``months`` of dense meal logs (about 8% missed meals), measures, then
+runs ``flask meals compact`` and measures again in MEAL_STORAGE=sparse.
+Billing is timed as the meal-day query it runs (``meal_day_counts``) and as
+a whole ``BillingRun`` for the latest month.
+"""
+import sys
+import time
+import random
+import statistics
+import datetime as dt
+
+from sqlalchemy import text
+
+from _bench import make_app, seed_school
+
+def table_bytes(conn, table):
+    if conn.dialect.name == "mysql":
+        conn.execute(text(f"ANALYZE TABLE `{table}`"))
+        return conn.execute(text(
+            "SELECT data_length + index_length FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = :t"), {"t": table}).scalar()
+    try:
+        return conn.execute(text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE tbl_name = :t)"), {"t": table}).scalar()
+    except Exception:
+        return None  # SQLite built without dbstat
+
+def add_past_months(months, start, seed=2):
+    from app.extensions import db
+    from app.models import Student, MealLog
+
+    rnd = random.Random(seed)
+    ids = [sid for (sid,) in db.session.query(Student.id)]
+    day = start
+    for _ in range(months - 1):
+        day = (day - dt.timedelta(days=1)).replace(day=1)
+        month_end = (day + dt.timedelta(days=32)).replace(day=1)
+        logs, d = [], day
+        while d < month_end:
+            if d.weekday() < 5:
+                logs += [dict(student_id=sid, log_date=d, ate=rnd.random() > 0.08) for sid in ids]
+            d += dt.timedelta(days=1)
+        db.session.bulk_insert_mappings(MealLog, logs)
+    db.session.commit()
+
+def timed(fn, repeat=20):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), result
+
+def measure(label, month):
+    from app.extensions import db
+    from app.models import MealLog, MealDay
+    from app.meals import meal_day_counts
+    from app.billing import BillingRun, month_range
+
+    conn = db.session.connection()
+    start, end = month_range(month)
+    size = table_bytes(conn, "meal_logs")
+    marker_size = table_bytes(conn, "meal_days")
+    counts_ms, counts = timed(lambda: meal_day_counts(start, end))
+    one_class_ms, _ = timed(lambda: meal_day_counts(start, end, class_id=1))
+    run_ms, _ = timed(lambda: BillingRun(month), repeat=5)
+    print(f"{label:<8} meal_logs {MealLog.query.count():>8} rows"
+          f"{f' {size / 1024:>8.0f} KiB' if size else ''}, meal_days {MealDay.query.count():>6} rows"
+          f"{f' {marker_size / 1024:>6.0f} KiB' if marker_size else ''}")
+    print(f"{'':<8} meal_day_counts {counts_ms:7.1f} ms school, {one_class_ms:6.2f} ms one class; "
+          f"BillingRun {run_ms:7.1f} ms")
+    return counts
+
+def main(classes=40, per_class=25, months=6):
+    app = make_app()
+    from app.extensions import db
+    from app.meals import _convert, compact_month
+    from app.models import MealLog, Student
+    from app.billing import month_range
+
+    with app.app_context():
+        month = seed_school(classes, per_class)
+        add_past_months(months, month_range(month)[0])
+        print(f"{classes} classes x {per_class} students, {months} months of meals up to {month}")
+        dense = measure("dense", month)
+        _convert("sparse", compact_month, MealLog.log_date, "compact")
+        sparse = measure("sparse", month)
+        # Sparse does not count meals before enrolled_on; seed_school logs them for everyone.
+        late = {sid for (sid,) in db.session.query(Student.id).filter(Student.enrolled_on > month_range(month)[0])}
+        differ = {sid for sid in set(dense) | set(sparse) if dense.get(sid) != sparse.get(sid)}
+        print(f"meal-day counts match for all but {len(differ)} children, "
+              f"{len(differ - late)} of them enrolled before the month")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:4]))
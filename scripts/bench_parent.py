@@ -0,0 +1,60 @@
+"""Benchmark: parent page data from student_summaries vs. the joined ORM loads teachers use.
+
+    python scripts/bench_parent.py [classes]
+"""
+import sys
+import time
+import random
+import statistics
+import datetime as dt
+
+from _bench import make_app, seed_school
+
+RUNS = 200
+
+def main(classes=40):
+    app = make_app()
+    from app.extensions import db
+    from app.models import Student, MealLog, HealthRecord, Invoice
+    from app.billing import generate_invoices
+    from app.summaries import get_summaries, refresh
+
+    with app.app_context():
+        month = seed_school(classes=classes, per_class=25)
+        generate_invoices(month)
+        refresh()
+        db.session.commit()
+        ids = [sid for (sid,) in db.session.query(Student.id)]
+        today = dt.date.fromisoformat(f"{month}-01")
+
+    rnd = random.Random(3)
+    families = [rnd.sample(ids, 2) for _ in range(RUNS)]
+
+    def orm(children):
+        # What a parent page would cost through the teacher-style queries.
+        start = today.replace(day=1)
+        out = []
+        for sid in children:
+            st = db.session.get(Student, sid)
+            invs = Invoice.query.filter(Invoice.student_id == sid).order_by(Invoice.billing_month.desc()).limit(6).all()
+            meals = MealLog.query.filter(MealLog.student_id == sid, MealLog.log_date >= start).all()
+            health = (HealthRecord.query.filter(HealthRecord.student_id == sid)
+                      .order_by(HealthRecord.record_date.desc()).limit(5).all())
+            out.append((st.classroom.name, [i.total_amount for i in invs], sum(m.ate for m in meals), health))
+        return out
+
+    def run(label, fn):
+        times = []
+        for children in families:
+            with app.app_context():
+                t0 = time.perf_counter()
+                fn(children)
+                times.append((time.perf_counter() - t0) * 1000)
+        print(f"{label:<40} {statistics.median(times):10.2f} ms median, {max(times):.2f} ms max")
+
+    print(f"{len(ids)} students, 2 children per parent")
+    run("joined ORM loads", orm)
+    run("student_summaries", get_summaries)
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
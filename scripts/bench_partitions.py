@@ -0,0 +1,122 @@
+"""Benchmark: monthly partitions vs. one flat table for meal_logs-shaped data.
+
+    DATABASE_URL=mysql+pymysql://... python scripts/bench_partitions.py [students] [years]
+
+MySQL only. Builds two scratch copies of a multi-year meal log, one flat and
+one partitioned like migrations/007 + ``flask partitions init``, then times
+the query shapes of the hot routes against both and prints which partitions
+EXPLAIN reads. The scratch tables are dropped at the end; the school's own
+tables are not created or touched.
+"""
+import sys
+import time
+import random
+import statistics
+import datetime as dt
+
+from _bench import make_app
+
+FLAT, PART = "bench_meals_flat", "bench_meals_part"
+CLASS_SIZE = 25
+RUNS = 20
+
+DDL = """CREATE TABLE `{name}` (
+  `id` bigint unsigned NOT NULL AUTO_INCREMENT,
+  `student_id` int unsigned NOT NULL,
+  `log_date` date NOT NULL,
+  `ate` tinyint(1) NOT NULL DEFAULT '1',
+  PRIMARY KEY ({pk}),
+  UNIQUE KEY `uq_{name}` (`student_id`, `log_date`),
+  KEY `idx_{name}_date` (`log_date`)
+) ENGINE=InnoDB"""
+
+def school_days(first, last):
+    day = first
+    while day <= last:
+        if day.weekday() < 5:
+            yield day
+        day += dt.timedelta(days=1)
+
+def main(students=500, years=3):
+    app = make_app(create_all=False)
+    from sqlalchemy import text
+    from app.extensions import db
+    from app.partitions import add_months, partition_name
+
+    with app.app_context():
+        if db.engine.dialect.name != "mysql":
+            print("bench_partitions needs DATABASE_URL pointing at MySQL")
+            return 1
+
+        today = dt.date.today()
+        first = add_months(today.replace(day=1), -12 * years)
+        conn = db.session.connection()
+        for name in (FLAT, PART):
+            conn.execute(text(f"DROP TABLE IF EXISTS `{name}`"))
+        conn.execute(text(DDL.format(name=FLAT, pk="`id`")))
+        parts, month = [], first
+        while month <= add_months(today, 3):
+            bound = add_months(month, 1).isoformat()
+            parts.append(f"PARTITION {partition_name(month)} VALUES LESS THAN ('{bound}')")
+            month = add_months(month, 1)
+        parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+        conn.execute(text(DDL.format(name=PART, pk="`id`, `log_date`")
+                          + " PARTITION BY RANGE COLUMNS(`log_date`) (" + ", ".join(parts) + ")"))
+
+        rnd = random.Random(3)
+        days = list(school_days(first, today))
+        t0 = time.perf_counter()
+        for name in (FLAT, PART):
+            insert = text(f"INSERT INTO `{name}` (student_id, log_date, ate) VALUES (:s, :d, :a)")
+            batch = []
+            for day in days:
+                for sid in range(1, students + 1):
+                    batch.append({"s": sid, "d": day, "a": rnd.random() > 0.08})
+                if len(batch) >= 20000:
+                    conn.execute(insert, batch)
+                    batch = []
+            if batch:
+                conn.execute(insert, batch)
+        db.session.commit()
+        print(f"loaded {len(days) * students:,} rows per table in {time.perf_counter() - t0:.1f}s "
+              f"({years} years, {students} students, {len(parts)} partitions)")
+
+        day = days[-1]
+        month_start = day.replace(day=1)
+        month_end = add_months(month_start, 1) - dt.timedelta(days=1)
+        class_ids = ",".join(str(i) for i in range(1, CLASS_SIZE + 1))
+        shapes = [
+            ("meals_daily: one day, one class",
+             f"SELECT student_id, ate FROM `{{t}}` WHERE log_date = '{day}' AND student_id IN ({class_ids})"),
+            ("billing: month meal days per student",
+             f"SELECT student_id, COUNT(*) FROM `{{t}}` WHERE ate = 1 AND log_date >= '{month_start}' "
+             f"AND log_date <= '{month_end}' GROUP BY student_id"),
+            ("kitchen: school headcount for a day",
+             f"SELECT COUNT(*) FROM `{{t}}` WHERE log_date = '{day}' AND ate = 1"),
+            ("anti-pattern: MONTH()/YEAR() filter",
+             f"SELECT COUNT(*) FROM `{{t}}` WHERE YEAR(log_date) = {day.year} AND MONTH(log_date) = {day.month}"),
+        ]
+
+        print(f"\n{'query':<40} {'flat ms':>10} {'part ms':>10}  partitions read")
+        for label, sql in shapes:
+            timings = {}
+            for name in (FLAT, PART):
+                stmt = text(sql.format(t=name))
+                samples = []
+                for _ in range(RUNS):
+                    t0 = time.perf_counter()
+                    conn.execute(stmt).all()
+                    samples.append((time.perf_counter() - t0) * 1000)
+                timings[name] = statistics.median(samples)
+            plan = conn.execute(text("EXPLAIN " + sql.format(t=PART))).mappings().first()
+            read = (plan.get("partitions") or "") if plan else ""
+            read = read if len(read) < 30 else f"{read.count(',') + 1} partitions"
+            print(f"{label:<40} {timings[FLAT]:10.2f} {timings[PART]:10.2f}  {read}")
+
+        for name in (FLAT, PART):
+            conn.execute(text(f"DROP TABLE IF EXISTS `{name}`"))
+        db.session.commit()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:3])))
@@ -0,0 +1,58 @@
+"""Benchmark: request latency with the sampling profiler off and at several rates.
+
+    python scripts/bench_profiler.py [requests]
+
+Replays a teacher's morning (class list, meals, health) through the test
+client; the mean includes the profiled requests and the periodic flushes.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import statistics
+
+from _bench import make_app, seed_school
+
+PAGES = ["/teacher/", "/teacher/students", "/teacher/meals", "/teacher/health"]
+
+def main(requests=2000):
+    profile_dir = tempfile.mkdtemp(prefix="kg_profiles_")
+    os.environ["PROFILER_DIR"] = profile_dir
+    os.environ["PROFILER_FLUSH_SECONDS"] = "5"
+    try:
+        app = make_app()
+        from app.extensions import db
+        from app.models import User
+
+        with app.app_context():
+            seed_school(classes=4, per_class=25)
+            User.query.filter_by(username="bench_teacher0").one().set_password("bench")
+            db.session.commit()
+        profiler = app.extensions["profiler"]
+        client = app.test_client()
+        client.post("/login", data={"username": "bench_teacher0", "password": "bench"})
+        for i in range(requests // 4):
+            client.get(PAGES[i % len(PAGES)])
+
+        baseline = None
+        for label, sample_every in (("off", None), ("1 in 100", 100), ("1 in 10", 10), ("every request", 1)):
+            profiler.set_control(sample_every is not None, sample_every or 100, [])
+            times = []
+            for i in range(requests):
+                t0 = time.perf_counter()
+                response = client.get(PAGES[i % len(PAGES)])
+                times.append((time.perf_counter() - t0) * 1000)
+                assert response.status_code == 200, response.status_code
+            profiler.flush()
+            mean = statistics.fmean(times)
+            baseline = baseline or mean
+            print(f"profiler {label:<14} {mean:8.2f} ms mean, p95 {statistics.quantiles(times, n=20)[18]:7.2f} ms"
+                  f"  ({(mean / baseline - 1) * 100:+5.1f}%)")
+        entries = profiler.entries()
+        print(f"{len(entries)} profile files, {sum(e['samples'] for e in entries)} samples in the ring")
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
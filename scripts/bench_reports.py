@@ -0,0 +1,58 @@
+"""Benchmark: report pages with their queries run one after another vs. gathered in parallel.
+
+    python scripts/bench_reports.py [classes] [latency_ms]
+
+On a local SQLite file every round trip is nearly free, so ``latency_ms``
+(default 2) adds a sleep before each statement to stand in for the network
+hop to MySQL; run it with DATABASE_URL pointing at the real server to
+measure without the simulation.
+"""
+import sys
+import time
+import statistics
+
+from sqlalchemy import event
+
+from _bench import make_app, seed_school
+
+RUNS = 20
+
+def main(classes=40, latency_ms=2):
+    app = make_app()
+    from app.extensions import db
+    from app.models import Class, Invoice
+    from app.billing import generate_invoices
+    from app.admin.routes import _school_report
+    from app.teacher.routes import _class_report
+
+    with app.app_context():
+        month = seed_school(classes=classes, per_class=25)
+        generate_invoices(month)
+        db.session.query(Invoice).filter(Invoice.id % 2 == 0).update({"status": "PAID"}, synchronize_session=False)
+        db.session.commit()
+
+        if latency_ms:
+            @event.listens_for(db.engine, "before_cursor_execute")
+            def _latency(*args):
+                time.sleep(latency_ms / 1000)
+
+    def run(label, fn):
+        times = []
+        for _ in range(RUNS):
+            with app.test_request_context():
+                t0 = time.perf_counter()
+                fn()
+                times.append((time.perf_counter() - t0) * 1000)
+        print(f"{label:<40} {statistics.median(times):10.2f} ms median, {max(times):.2f} ms max")
+
+    print(f"{classes} classes, {latency_ms} ms simulated latency per statement")
+    for workers in (1, 4):
+        app.config["PARALLEL_QUERY_WORKERS"] = workers
+        mode = "serial" if workers == 1 else f"parallel ({workers} workers)"
+        run(f"admin report, {mode}", lambda: _school_report())
+        def teacher():
+            _class_report(db.session.get(Class, 1), month)
+        run(f"teacher report, {mode}", teacher)
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,57 @@
+"""Benchmark: loading a class roster as Student objects vs. the cached snapshot.
+
+    python scripts/bench_roster.py [students_per_class] [repeat]
+
+Times what the teacher's meals/health/tuition pages used to do on every
+request (``Student.query...all()`` with its joined classroom and teacher)
+against ``roster()`` on a warm cache (one data-version lookup), and a cold
+snapshot load after a student edit.
+"""
+import sys
+import time
+import statistics
+
+from _bench import make_app, seed_school
+
+def timed(label, fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    print(f"{label:<36} {statistics.median(times):7.3f} ms median")
+
+def main(per_class=25, repeat=200):
+    app = make_app()
+    from app.extensions import db
+    from app.models import Student
+    from app.roster import roster
+
+    with app.app_context():
+        seed_school(classes=4, per_class=per_class, meals=False)
+    cache = app.extensions["roster"]
+
+    def orm():
+        with app.test_request_context():
+            Student.query.filter_by(class_id=1).order_by(Student.full_name).all()
+            db.session.remove()
+
+    def warm():
+        with app.test_request_context():
+            roster(1)
+            db.session.remove()
+
+    def cold():
+        with app.test_request_context():
+            cache.clear()
+            roster(1)
+            db.session.remove()
+
+    print(f"one class of {per_class} students")
+    timed("Student.query (before)", orm, repeat)
+    warm()
+    timed("roster(), cached", warm, repeat)
+    timed("roster(), reload", cold, repeat)
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
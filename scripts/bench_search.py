@@ -0,0 +1,70 @@
+"""Benchmark: trigram student search vs. LIKE scans over the students table.
+
+    python scripts/bench_search.py [students]
+"""
+import sys
+import random
+import datetime as dt
+import statistics
+import time
+
+from _bench import make_app, seed_school, Timer
+
+HO = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ", "Hồ", "Ngô", "Dương"]
+DEM = ["Văn", "Thị", "Minh", "Ngọc", "Gia", "Bảo", "Thanh", "Hoài", "Đức", "Quỳnh", "Khánh", "Anh"]
+TEN = ["An", "Bình", "Châu", "Dũng", "Giang", "Hà", "Hải", "Hùng", "Khoa", "Linh", "Long", "Mai", "Nam",
+       "Nhi", "Phúc", "Quân", "Sơn", "Tâm", "Thảo", "Trang", "Tú", "Uyên", "Việt", "Vy", "Yến", "Ánh"]
+QUERIES = ["nguyen van an", "thao", "do thi", "quynh nhi", "ngoc anh", "0912", "tran minh khoa", "yen", "hoang"]
+
+def name(rnd):
+    return f"{rnd.choice(HO)} {rnd.choice(DEM)} {rnd.choice(TEN)}"
+
+def main(total=20000):
+    app = make_app()
+    from app.extensions import db
+    from app.models import Class, Student
+    from app.search import get_index, search_students, fold
+
+    rnd = random.Random(7)
+    with app.app_context():
+        seed_school(classes=max(1, total // 25), per_class=0, meals=False)
+        class_ids = [cid for (cid,) in db.session.query(Class.id).all()]
+        db.session.bulk_insert_mappings(Student, [
+            dict(class_id=rnd.choice(class_ids), full_name=name(rnd), dob=dt.date(2021, 1, 1), gender="M",
+                 parent_name=name(rnd), parent_phone=f"09{rnd.randrange(10 ** 8):08d}")
+            for _ in range(total)
+        ])
+        db.session.commit()
+
+    with app.test_request_context():
+        with Timer(f"build index ({total} students)"):
+            get_index().rebuild()
+
+        def run(label, fn):
+            times = []
+            for q in QUERIES:
+                t0 = time.perf_counter()
+                fn(q)
+                times.append((time.perf_counter() - t0) * 1000)
+            print(f"{label:<40} {statistics.median(times):10.2f} ms median, {max(times):.2f} ms max")
+
+        run("trigram search", lambda q: search_students(q, limit=20))
+
+        def like(q):
+            # The naive alternative: LIKE cannot fold accents, so it misses
+            # "Nguyễn" for "nguyen" and always scans the whole table.
+            pattern = f"%{q}%"
+            return (Student.query.filter(db.or_(Student.full_name.like(pattern), Student.parent_name.like(pattern),
+                                                Student.parent_phone.like(pattern)))
+                    .limit(20).all())
+
+        def scan(q):
+            folded = fold(q)
+            return [s for s in db.session.query(Student.id, Student.full_name, Student.parent_name).all()
+                    if folded in fold(s.full_name) or folded in fold(s.parent_name)][:20]
+
+        run("LIKE %q%", like)
+        run("load + fold + substring scan", scan)
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
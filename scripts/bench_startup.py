@@ -0,0 +1,196 @@
+"""Benchmark: gunicorn time-to-first-request, per-worker RSS and per-route cold latency (Linux).
+
+    python scripts/bench_startup.py [workers]
+
+Runs the production config twice, with and without preload_app, then
+starts a single worker three ways -- no template cache, a bytecode cache
+filled by ``flask templates compile``, and warm-up in create_app -- and
+times the first and second hit of each route.
+"""
+import os
+import sys
+import time
+import shutil
+import socket
+import signal
+import tempfile
+import subprocess
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from _bench import ROOT, make_app, seed_school
+
+ROUTES = [
+    ("anon", "/login"),
+    ("anon", "/khong-co-trang-nay"),
+    ("admin", "/"),
+    ("admin", "/admin/"),
+    ("admin", "/admin/classes"),
+    ("admin", "/admin/teachers"),
+    ("admin", "/admin/settings"),
+    ("admin", "/admin/reports"),
+    ("admin", "/admin/kitchen"),
+    ("teacher", "/teacher/"),
+    ("teacher", "/teacher/students"),
+    ("teacher", "/teacher/meals"),
+    ("teacher", "/teacher/health"),
+    ("teacher", "/teacher/tuition"),
+]
+PASSWORD = "bench-password"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def children(pid):
+    out = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            out.append(int(entry))
+    return out
+
+def rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if r.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.02)
+    return False
+
+def start(port, workers, preload, **extra_env):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_PRELOAD="1" if preload else "0",
+               GUNICORN_BIND=f"127.0.0.1:{port}", GUNICORN_ACCESS_LOG="/dev/null", **extra_env)
+    return subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def run(workers, preload):
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = start(port, workers, preload)
+    try:
+        ok = wait_for(f"http://127.0.0.1:{port}/", t0 + 30)
+        ttfr = time.perf_counter() - t0
+        time.sleep(1)
+        worker_pids = children(proc.pid)
+        rss = [rss_kb(p) for p in worker_pids]
+        label = f"preload={'on ' if preload else 'off'} workers={workers}"
+        if not ok:
+            print(f"{label}: server did not answer")
+            return
+        print(f"{label}: first request {ttfr * 1000:7.0f} ms, master RSS {rss_kb(proc.pid) / 1024:6.1f} MB, "
+              f"worker RSS avg {sum(rss) / max(len(rss), 1) / 1024:6.1f} MB ({len(rss)} workers)")
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+def seed_users():
+    from app.extensions import db
+    from app.models import User
+
+    app = make_app()
+    with app.app_context():
+        seed_school(classes=4, per_class=25)
+        db.session.add(User(username="bench_admin", role="ADMIN", full_name="Quản trị", password_hash="x"))
+        db.session.flush()
+        for username in ("bench_admin", "bench_teacher0"):
+            User.query.filter_by(username=username).one().set_password(PASSWORD)
+        db.session.commit()
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+def session_opener(base, username):
+    """A cookie-carrying opener, logged in without following the redirect
+    (which would render, and so warm, the role's home page)."""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), _NoRedirect())
+    body = urllib.parse.urlencode({"username": username, "password": PASSWORD}).encode()
+    try:
+        opener.open(f"{base}/login", data=body, timeout=10).read()
+    except urllib.error.HTTPError as e:
+        if e.code != 302:
+            raise
+    return opener
+
+def fetch_ms(opener, url):
+    t0 = time.perf_counter()
+    try:
+        with opener.open(url, timeout=30) as r:
+            r.read()
+    except urllib.error.HTTPError as e:
+        if e.code != 404:
+            raise  # e.g. 302 to /login: the session was lost
+        e.read()
+    return (time.perf_counter() - t0) * 1000
+
+def first_requests(label, **extra_env):
+    """{path: (first_ms, second_ms)} from a single freshly started worker."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = start(port, 1, True, **extra_env)
+    try:
+        # A static file, so no template is rendered before the timed requests.
+        if not wait_for(f"{base}/static/css/styles.css", time.perf_counter() + 30):
+            print(f"{label}: server did not answer")
+            return {}
+        openers = {"anon": urllib.request.build_opener(),
+                   "admin": session_opener(base, "bench_admin"),
+                   "teacher": session_opener(base, "bench_teacher0")}
+        results = {}
+        for role, path in ROUTES:
+            first = fetch_ms(openers[role], base + path)
+            results[path] = (first, fetch_ms(openers[role], base + path))
+        return results
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seed_users()
+    run(n, preload=True)
+    run(n, preload=False)
+
+    cache_dir = tempfile.mkdtemp(prefix="kg_jinja_")
+    try:
+        modes = [("no cache", first_requests("no cache", JINJA_BYTECODE_CACHE_DIR="", JINJA_WARM_UP="0"))]
+        # What a deploy does: fill the cache once, then start the server.
+        subprocess.run([sys.executable, "-m", "flask", "--app", "wsgi", "templates", "compile"], cwd=ROOT,
+                       env=dict(os.environ, JINJA_BYTECODE_CACHE_DIR=cache_dir, JINJA_WARM_UP="0"),
+                       check=True, stdout=subprocess.DEVNULL)
+        modes.append(("bytecode", first_requests("bytecode", JINJA_BYTECODE_CACHE_DIR=cache_dir,
+                                                 JINJA_WARM_UP="0")))
+        modes.append(("warm-up", first_requests("warm-up", JINJA_BYTECODE_CACHE_DIR=cache_dir,
+                                                JINJA_WARM_UP="1")))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print()
+    print(f"{'first / second request, ms':<28}" + "".join(f"{label:>20}" for label, _ in modes))
+    for _, path in ROUTES:
+        print(f"{path:<28}" + "".join(
+            f"{results[path][0]:>11.1f} / {results[path][1]:>5.1f}" if path in results else f"{'-':>20}"
+            for _, results in modes))
+    for label, results in modes:
+        if results:
+            print(f"{label}: sum of first requests {sum(f for f, _ in results.values()):.0f} ms")
@@ -0,0 +1,88 @@
+"""Concurrency check: many teachers' browsers enrolling into one class at once.
+
+    python scripts/check_capacity.py [threads] [free_seats]
+
+Fires ``threads`` simultaneous POSTs at /teacher/students/create against a
+class with ``free_seats`` seats left and fails unless exactly that many
+succeed and ``classes.student_count`` matches the real row count. Point
+``DATABASE_URL`` at MySQL for a realistic run; on the SQLite fallback some
+requests lose on the database lock instead, which is reported separately.
+"""
+import sys
+import threading
+import datetime as dt
+
+from _bench import make_app
+
+def main(threads=40, free_seats=5):
+    app = make_app()
+
+    from app.extensions import db
+    from app.models import User, Class, Student, Settings
+
+    with app.app_context():
+        limit = 25
+        settings = Settings.get_current()
+        if settings:
+            settings.max_students_per_class = limit
+        else:
+            db.session.add(Settings(id=1, tuition_fee_monthly=1500000, meal_price_per_day=25000,
+                                    max_students_per_class=limit))
+        teacher = User(username="capacity_teacher", role="TEACHER", full_name="Giáo viên")
+        teacher.set_password("capacity")
+        db.session.add(teacher)
+        db.session.flush()
+        classroom = Class(name="Lớp kiểm tra sĩ số", teacher_id=teacher.id)
+        db.session.add(classroom)
+        db.session.flush()
+        for i in range(limit - free_seats):
+            db.session.add(Student(class_id=classroom.id, full_name=f"Trẻ {i}", dob=dt.date(2021, 1, 1),
+                                   gender="M", parent_name="PH", parent_phone=f"09{i:08d}"))
+        db.session.commit()
+        class_id = classroom.id
+
+    clients = []
+    for _ in range(threads):
+        c = app.test_client()
+        c.post("/login", data={"username": "capacity_teacher", "password": "capacity"})
+        clients.append(c)
+
+    barrier = threading.Barrier(threads)
+    results = []
+
+    def enroll(i, client):
+        barrier.wait()
+        r = client.post("/teacher/students/create", follow_redirects=True, data={
+            "full_name": f"Trẻ mới {i}", "dob": "2021-06-01", "gender": "F",
+            "parent_name": "PH", "parent_phone": f"08{i:08d}",
+        })
+        body = r.get_data(as_text=True)
+        if "Thêm học sinh thành công" in body:
+            results.append("ok")
+        elif "Lớp đã đủ" in body:
+            results.append("full")
+        else:
+            results.append("error")
+
+    workers = [threading.Thread(target=enroll, args=(i, c)) for i, c in enumerate(clients)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    with app.app_context():
+        actual = Student.query.filter_by(class_id=class_id).count()
+        counter = db.session.get(Class, class_id).student_count
+
+    print(f"ok={results.count('ok')} full={results.count('full')} error={results.count('error')}")
+    print(f"students={actual} student_count={counter} limit={limit}")
+    if actual > limit or counter != actual:
+        print("FAIL: capacity exceeded or counter out of sync")
+        return 1
+    if results.count("ok") != free_seats and not results.count("error"):
+        print("FAIL: free seats were not all taken")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:3])))
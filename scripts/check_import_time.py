@@ -0,0 +1,64 @@
+"""Cold-start import budget check; exits non-zero on regression.
+
+    python scripts/check_import_time.py [budget_ms]
+
+Runs ``create_app()`` in a fresh interpreter under ``-X importtime`` and
+fails if the total import time exceeds the budget or if a module that
+must stay lazy (ReportLab) was imported at startup.
+"""
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = 1200
+FORBIDDEN_PREFIXES = ("reportlab",)
+
+def measure():
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "from app import create_app; create_app()"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit("create_app() failed")
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header row
+        name = parts[2]
+        modules.append((name.strip(), self_us, cumulative_us, len(name) - len(name.lstrip())))
+    return modules
+
+def main():
+    budget_ms = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get("IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS))
+    modules = measure()
+
+    total_ms = sum(self_us for _, self_us, _, _ in modules) / 1000
+    top_level = sorted((m for m in modules if m[3] == 1), key=lambda m: m[2], reverse=True)
+
+    print(f"total import time: {total_ms:.0f} ms (budget {budget_ms} ms)")
+    for name, _, cumulative_us, _ in top_level[:10]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    forbidden = sorted({m[0] for m in modules if m[0].startswith(FORBIDDEN_PREFIXES)})
+    if forbidden:
+        print(f"FAIL: imported at startup but must stay lazy: {', '.join(forbidden[:5])}")
+        failed = True
+    if total_ms > budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())